@@ -0,0 +1,358 @@
+"""
+Headless JSON API over the model layer, so feeders can push entries in bulk
+without driving the Streamlit UI
+
+    python api.py
+
+Every request works on one ledger, named by the X-Ledger header or the
+?ledger= parameter (DEFAULT_LEDGER_ID otherwise). Dates are YYYY-MM-DD.
+API_TOKEN is an operator credential: it opens every ledger, whoever owns it.
+
+    GET  /health
+    GET  /categories                    expense and investment categories
+    POST /categories                    {"kind": "expenses"|"investments", "name": ...}
+    POST /expenses, /investments        {"entries": [{"date", "category", "description", "amount",
+                                                      "idempotency_key"?}, ...]}
+    GET  /expenses, /investments        ?start=&end=&category=&limit=&cursor=
+    GET  /expenses/categories           ?start=&end=  total per category
+    GET  /expenses/totals               ?start=&end=&unit=day|week|month|quarter
+    GET  /events                        recurring payments
+    POST /events/run                    {"force": false}  posts the due payments
+"""
+import base64
+import hmac
+import json
+from datetime import date, datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from database.backend import DatabaseUnavailable
+from database.category_model import CategoryModel
+from database.event_model import EventModel
+from database.investment_category_model import InvestmentCategoryModel
+from database.investment_model import InvestmentModel
+from database.ledger import ledger_scope
+from database.ledger_model import LedgerModel
+from database.models import ExpenseModel
+from utils.helpers import PERIOD_UNITS
+from utils.validators import validate_entry_rows
+import config
+
+
+# Model methods behind each entry kind's routes
+_KINDS = {
+    "expenses": {
+        "create": ExpenseModel.create_expenses,
+        "list": ExpenseModel.get_expenses,
+        "category_totals": ExpenseModel.get_category_breakdown,
+        "period_totals": ExpenseModel.get_period_totals,
+        "categories": CategoryModel,
+    },
+    "investments": {
+        "create": InvestmentModel.create_investments,
+        "list": InvestmentModel.get_investments,
+        "category_totals": InvestmentModel.get_category_breakdown,
+        "period_totals": InvestmentModel.get_period_totals,
+        "categories": InvestmentCategoryModel,
+    },
+}
+
+_DEFAULT_PAGE_SIZE = 100
+
+# Longest idempotency key a feeder may send with an entry
+_MAX_KEY_LENGTH = 200
+
+
+class ApiError(Exception):
+    def __init__(self, status: HTTPStatus, message: str, **details):
+        super().__init__(message)
+        self.status = status
+        self.body = {"error": message, **details}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)  # ObjectId
+
+
+def _parse_date(value, name: str) -> Optional[date]:
+    if value is None or value == "":
+        return None
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be a YYYY-MM-DD date")
+
+
+def _date_range(query: Dict[str, str], required: bool = False) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """Start of the first day and end of the last day of ?start=&end="""
+    start, end = _parse_date(query.get("start"), "start"), _parse_date(query.get("end"), "end")
+    if required and (start is None or end is None):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "start and end are required")
+    if start and end and start > end:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "start must not be after end")
+    return (
+        datetime.combine(start, datetime.min.time()) if start else None,
+        datetime(end.year, end.month, end.day, 23, 59, 59) if end else None,
+    )
+
+
+def _int_param(query: Dict[str, str], name: str, default: int, low: int, high: Optional[int] = None) -> int:
+    try:
+        value = int(query.get(name, default))
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer")
+    if value < low or (high is not None and value > high):
+        bounds = f"between {low} and {high}" if high is not None else f"at least {low}"
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be {bounds}")
+    return value
+
+
+def _cursor(entry: Dict) -> str:
+    """Opaque position after `entry` in newest-first order"""
+    position = json.dumps([entry["date"].isoformat(), str(entry["_id"])])
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def _parse_cursor(value: Optional[str]) -> Optional[Tuple[datetime, str]]:
+    if not value:
+        return None
+    try:
+        day, entry_id = json.loads(base64.urlsafe_b64decode(value.encode()))
+        return datetime.fromisoformat(day), str(entry_id)
+    except (TypeError, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "cursor is invalid")
+
+
+def _entry_json(entry: Dict) -> Dict:
+    item = {
+        "id": str(entry["_id"]),
+        "date": entry["date"],
+        "category": entry["category"],
+        "description": entry.get("description") or "",
+        "amount": entry["amount"],
+    }
+    if entry.get("event_id"):
+        item["event_id"] = str(entry["event_id"])
+    return item
+
+
+# ── Handlers ─────────────────────────────────────────────────────────────────
+
+def _create_entries(spec: Dict, body) -> Tuple[HTTPStatus, Dict]:
+    """Validate the whole batch first and save nothing if any row is invalid.
+    A row whose idempotency_key was already used (a retried request) isn't
+    saved again and counts as a duplicate."""
+    rows = body.get("entries") if isinstance(body, dict) else None
+    if not isinstance(rows, list) or not rows:
+        raise ApiError(HTTPStatus.BAD_REQUEST, 'Expected {"entries": [...]} with at least one entry')
+    if len(rows) > config.API_MAX_BATCH:
+        raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"At most {config.API_MAX_BATCH} entries per request")
+
+    parsed, errors = [], []
+    for row_no, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append(f"Row {row_no}: Must be an object")
+            continue
+        amount = row.get("amount")
+        if amount is not None and (isinstance(amount, bool) or not isinstance(amount, (int, float))):
+            errors.append(f"Row {row_no}: Amount must be a number")
+            continue
+        description = row.get("description")
+        if description is not None and not isinstance(description, str):
+            errors.append(f"Row {row_no}: Description must be a string")
+            continue
+        key = row.get("idempotency_key")
+        if key is not None and (not isinstance(key, str) or not key or len(key) > _MAX_KEY_LENGTH):
+            errors.append(f"Row {row_no}: Idempotency key must be a string of 1 to {_MAX_KEY_LENGTH} characters")
+            continue
+        try:
+            entry_date = _parse_date(row.get("date"), "date")
+        except ApiError:
+            errors.append(f"Row {row_no}: Date must be a YYYY-MM-DD date")
+            continue
+        # Kept apart from the keys the app generates for its own entries
+        parsed.append({**row, "date": entry_date, "idempotency_key": f"api:{key}" if key else None})
+    if errors:
+        raise ApiError(HTTPStatus.UNPROCESSABLE_ENTITY, "Invalid entries, nothing was saved", errors=errors)
+
+    entries, errors = validate_entry_rows(parsed, spec["categories"].get_all_categories(), skip_blank=False)
+    if errors:
+        raise ApiError(HTTPStatus.UNPROCESSABLE_ENTITY, "Invalid entries, nothing was saved", errors=errors)
+
+    # DatabaseUnavailable propagates and is answered with 503
+    created = spec["create"](entries)
+    if created is None:
+        raise ApiError(HTTPStatus.INTERNAL_SERVER_ERROR, "Failed to save entries")
+    return HTTPStatus.CREATED, {
+        "created": len(created),
+        "duplicates": len(entries) - len(created),
+    }
+
+
+def _list_entries(spec: Dict, query: Dict[str, str]) -> Tuple[HTTPStatus, Dict]:
+    """Newest first, one page per request. next_cursor (null on the last
+    page) goes in ?cursor= for the next one, which starts right after this
+    page in the index, however deep; one row past the page tells whether
+    another follows."""
+    limit = _int_param(query, "limit", _DEFAULT_PAGE_SIZE, 1, config.API_MAX_PAGE_SIZE)
+    before = _parse_cursor(query.get("cursor"))
+    start, end = _date_range(query)
+    entries = spec["list"](start, end, query.get("category") or None, limit=limit + 1, before=before)
+    page = entries[:limit]
+    return HTTPStatus.OK, {
+        "items": [_entry_json(e) for e in page],
+        "limit": limit,
+        "next_cursor": _cursor(page[-1]) if len(entries) > limit else None,
+    }
+
+
+def _period_totals(spec: Dict, query: Dict[str, str]) -> Tuple[HTTPStatus, Dict]:
+    start, end = _date_range(query, required=True)
+    unit = query.get("unit", "month")
+    if unit not in PERIOD_UNITS:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"unit must be one of: {', '.join(PERIOD_UNITS)}")
+    totals = spec["period_totals"](start, end, unit)
+    return HTTPStatus.OK, {
+        "unit": unit,
+        "totals": [
+            {"period": period.date(), "amount": float(amount)}
+            for period, amount in zip(totals["period"], totals["amount"])
+        ],
+    }
+
+
+def _add_category(body) -> Tuple[HTTPStatus, Dict]:
+    kind = body.get("kind") if isinstance(body, dict) else None
+    name = body.get("name") if isinstance(body, dict) else None
+    if kind not in _KINDS:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"kind must be one of: {', '.join(_KINDS)}")
+    if not isinstance(name, str) or not name.strip():
+        raise ApiError(HTTPStatus.BAD_REQUEST, "name is required")
+    model = _KINDS[kind]["categories"]
+    if not model.add_category(name.strip()):
+        raise ApiError(HTTPStatus.INTERNAL_SERVER_ERROR, "Failed to add category")
+    return HTTPStatus.CREATED, {"kind": kind, "categories": model.get_all_categories()}
+
+
+def _run_events(body) -> Tuple[HTTPStatus, Dict]:
+    force = bool(body.get("force")) if isinstance(body, dict) else False
+    results = EventModel.run_due_events(force=force)
+    return HTTPStatus.OK, {
+        "results": [
+            {
+                "event_id": str(r["event"]["_id"]),
+                "title": r["event"].get("title"),
+                "status": r["status"],
+                "reason": r["reason"],
+                "next_due": r.get("next_due"),
+            }
+            for r in results
+        ],
+    }
+
+
+def route(method: str, path: str, query: Dict[str, str], body) -> Tuple[HTTPStatus, Dict]:
+    """Dispatch one request within the current ledger"""
+    parts = path.strip("/").split("/")
+    if path == "/health" and method == "GET":
+        return HTTPStatus.OK, {"status": "ok"}
+    if path == "/categories":
+        if method == "GET":
+            return HTTPStatus.OK, {kind: spec["categories"].get_all_categories() for kind, spec in _KINDS.items()}
+        return _add_category(body)
+    if parts[0] in _KINDS and len(parts) <= 2:
+        spec = _KINDS[parts[0]]
+        if len(parts) == 1:
+            return _create_entries(spec, body) if method == "POST" else _list_entries(spec, query)
+        if parts[1] == "categories" and method == "GET":
+            start, end = _date_range(query, required=True)
+            return HTTPStatus.OK, {"totals": spec["category_totals"](start, end)}
+        if parts[1] == "totals" and method == "GET":
+            return _period_totals(spec, query)
+    if path == "/events" and method == "GET":
+        return HTTPStatus.OK, {"events": EventModel.get_all_events()}
+    if path == "/events/run" and method == "POST":
+        return _run_events(body)
+    raise ApiError(HTTPStatus.NOT_FOUND, f"No route for {method} {path}")
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "BudgetTrackerAPI/1.0"
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method: str):
+        url = urlparse(self.path)
+        path = url.path.rstrip("/") or "/"
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            self._authorize()
+            body = self._read_json() if method == "POST" else None
+            ledger = self.headers.get("X-Ledger") or query.get("ledger") or config.DEFAULT_LEDGER_ID
+            if not any(l["_id"] == ledger for l in LedgerModel.get_ledgers()):
+                raise ApiError(HTTPStatus.NOT_FOUND, f"Unknown ledger: {ledger}")
+            with ledger_scope(ledger):
+                status, payload = route(method, path, query, body)
+        except ApiError as e:
+            status, payload = e.status, e.body
+        except DatabaseUnavailable:
+            status, payload = HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Database unavailable"}
+        except Exception as e:
+            print(f"Error handling {method} {path}: {e}")
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal error"}
+        self._send(status, payload)
+
+    def _authorize(self):
+        if config.API_TOKEN is None:
+            return
+        supplied = self.headers.get("Authorization", "")
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {config.API_TOKEN}".encode()):
+            raise ApiError(HTTPStatus.UNAUTHORIZED, "Missing or invalid token")
+
+    def _read_json(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length < 0:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > config.API_MAX_BODY_BYTES:
+            raise ApiError(
+                HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body must be at most {config.API_MAX_BODY_BYTES} bytes"
+            )
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Body must be JSON")
+
+    def _send(self, status: HTTPStatus, payload: Dict):
+        data = json.dumps(payload, default=_json_default).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main():
+    server = ThreadingHTTPServer((config.API_HOST, config.API_PORT), ApiHandler)
+    print(f"Budget Tracker API listening on http://{config.API_HOST}:{config.API_PORT}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,16 @@ from components.settings import render_settings
 from components.transactions import render_transactions
 from components.payments import render_payments
 from components.investments import render_investments
+from components.auth import sign_out, signed_in_user
+from database.backend import DatabaseUnavailable, database_available
+from database.cache import clear_served_stale, rerun_scope, served_stale
 from database.event_model import EventModel
+from database.ledger import set_current_ledger
+from database.ledger_model import LedgerModel
+from database.read_routing import analytics_reads
+from database.tiers import LedgerTiers
+from database.change_watcher import start_change_watcher
+from database.write_queue import pending_count, start_queue_replayer
 
 
 st.set_page_config(
@@ -43,6 +52,10 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Filled in once the page has run, when it had to show cached data
+stale_banner = st.empty()
+clear_served_stale()
+
 VALID_PAGES = {"Dashboard", "Transactions", "Investments", "Settings", "Payments"}
 
 if "page" not in st.session_state:
@@ -51,10 +64,58 @@ if "page" not in st.session_state:
 
 st.query_params["page"] = st.session_state.page
 
-try:
-    EventModel.run_due_events()
-except Exception:
-    pass
+start_change_watcher()
+start_queue_replayer()
+
+
+def load_ledgers(user_id: str) -> dict:
+    """The ledgers the user owns, by id; a new user gets one of their own"""
+    try:
+        ledgers = LedgerModel.get_ledgers(user_id)
+        if not ledgers and LedgerModel.create_personal_ledger(user_id):
+            ledgers = LedgerModel.get_ledgers(user_id)
+    except DatabaseUnavailable:
+        st.error("🔌 The database can't be reached right now. Try again shortly.")
+        st.stop()
+    if not ledgers:
+        st.error("Your ledger couldn't be created. Try again shortly.")
+        st.stop()
+    return {l["_id"]: l["name"] for l in ledgers}
+
+
+def select_ledger(ledgers: dict):
+    """Open the ledger of the session or the link, only if the user owns it"""
+    fallback = config.DEFAULT_LEDGER_ID if config.DEFAULT_LEDGER_ID in ledgers else next(iter(ledgers))
+    if "ledger" not in st.session_state:
+        requested = st.query_params.get("ledger")
+        if requested and requested not in ledgers:
+            st.warning("The ledger in the link isn't one of yours; opened your own instead.")
+        st.session_state.ledger = requested if requested in ledgers else fallback
+    elif st.session_state.ledger not in ledgers:
+        st.session_state.ledger = fallback
+
+    st.query_params["ledger"] = st.session_state.ledger
+    set_current_ledger(st.session_state.ledger)
+
+
+def run_background_jobs():
+    try:
+        EventModel.run_due_events()
+    except Exception:
+        pass
+
+    try:
+        LedgerTiers.archive_closed_years()
+    except Exception:
+        pass
+
+
+def switch_ledger(ledger_id: str):
+    st.session_state.ledger = ledger_id
+    st.query_params["ledger"] = ledger_id
+    if "editing_expense" in st.session_state:
+        del st.session_state.editing_expense
+    st.rerun()
 
 
 def navigate(page: str):
@@ -65,42 +126,98 @@ def navigate(page: str):
     st.rerun()
 
 
-with st.sidebar:
-    st.title(f"{config.PAGE_ICON} Expense Tracker")
-    st.markdown("---")
-
-    current = st.session_state.page
-
-    if st.button("📊 Dashboard", use_container_width=True,
-                 type="primary" if current == "Dashboard" else "secondary"):
-        navigate("Dashboard")
-    if st.button("💳 Transactions", use_container_width=True,
-                 type="primary" if current == "Transactions" else "secondary"):
-        navigate("Transactions")
-    if st.button("📈 Investments", use_container_width=True,
-                 type="primary" if current == "Investments" else "secondary"):
-        navigate("Investments")
-    if st.button("🗓️ Payments", use_container_width=True,
-                 type="primary" if current == "Payments" else "secondary"):
-        navigate("Payments")
-    if st.button("⚙️ Settings", use_container_width=True,
-                 type="primary" if current == "Settings" else "secondary"):
-        navigate("Settings")
-
-    st.markdown("---")
-
-try:
-    if st.session_state.page == "Dashboard":
-        render_dashboard()
-    elif st.session_state.page == "Transactions":
-        render_transactions()
-    elif st.session_state.page == "Investments":
-        render_investments()
-    elif st.session_state.page == "Payments":
-        render_payments()
-    elif st.session_state.page == "Settings":
-        render_settings()
-except Exception as e:
-    st.error(f"An error occurred: {str(e)}")
-    st.exception(e)
-    st.stop()
+def render_sidebar(user_id: str, ledgers: dict):
+    with st.sidebar:
+        st.title(f"{config.PAGE_ICON} Expense Tracker")
+
+        if config.AUTH_ENABLED:
+            st.caption(f"Signed in as **{user_id}**")
+            if st.button("Sign out", use_container_width=True):
+                sign_out()
+
+        ledger_ids = list(ledgers)
+        selected = st.selectbox(
+            "📒 Ledger",
+            ledger_ids,
+            index=ledger_ids.index(st.session_state.ledger),
+            format_func=lambda ledger_id: ledgers[ledger_id],
+        )
+        if selected != st.session_state.ledger:
+            switch_ledger(selected)
+
+        with st.expander("➕ New ledger"):
+            new_ledger = st.text_input("Name", key="new_ledger_name")
+            if st.button("Create", use_container_width=True):
+                ledger_id = LedgerModel.create_ledger(new_ledger, user_id) if new_ledger.strip() else None
+                if ledger_id:
+                    switch_ledger(ledger_id)
+                else:
+                    st.error("Enter a name that isn't already used by another ledger")
+
+        st.markdown("---")
+
+        current = st.session_state.page
+
+        if st.button("📊 Dashboard", use_container_width=True,
+                     type="primary" if current == "Dashboard" else "secondary"):
+            navigate("Dashboard")
+        if st.button("💳 Transactions", use_container_width=True,
+                     type="primary" if current == "Transactions" else "secondary"):
+            navigate("Transactions")
+        if st.button("📈 Investments", use_container_width=True,
+                     type="primary" if current == "Investments" else "secondary"):
+            navigate("Investments")
+        if st.button("🗓️ Payments", use_container_width=True,
+                     type="primary" if current == "Payments" else "secondary"):
+            navigate("Payments")
+        if st.button("⚙️ Settings", use_container_width=True,
+                     type="primary" if current == "Settings" else "secondary"):
+            navigate("Settings")
+
+        st.markdown("---")
+
+
+def render_page():
+    try:
+        if st.session_state.page == "Dashboard":
+            # Its aggregations may be served by a replica-set secondary
+            with analytics_reads():
+                render_dashboard()
+        elif st.session_state.page == "Transactions":
+            render_transactions()
+        elif st.session_state.page == "Investments":
+            render_investments()
+        elif st.session_state.page == "Payments":
+            render_payments()
+        elif st.session_state.page == "Settings":
+            render_settings()
+    except DatabaseUnavailable:
+        st.error("🔌 The database can't be reached right now, and this page has no saved copy to show. Try again shortly.")
+    except Exception as e:
+        st.error(f"An error occurred: {str(e)}")
+        st.exception(e)
+        st.stop()
+
+
+def render_stale_banner():
+    pending = pending_count()
+    if served_stale() or not database_available():
+        stale_banner.warning(
+            "⚠️ The database is unavailable. You are seeing the last data loaded, which may be out of date. "
+            "New entries are kept on this device and saved when it is back; edits and deletes can't be saved until then."
+            + (f" {pending} entries are waiting." if pending else "")
+        )
+    elif pending:
+        stale_banner.info(f"⏳ Saving {pending} entries added while the database was unavailable...")
+
+
+# Each distinct cached read runs once per script run; the scope also ends
+# when st.rerun() or st.stop() cut the run short
+with rerun_scope():
+    user_id = signed_in_user()
+    ledgers = load_ledgers(user_id)
+    select_ledger(ledgers)
+    run_background_jobs()
+    render_sidebar(user_id, ledgers)
+    render_page()
+    render_stale_banner()
@@ -0,0 +1,250 @@
+"""
+Command-line entry point for batch jobs (cron, maintenance), without the UI
+
+    python -m budget_tracker run-scheduler [--force] [--all-ledgers]
+    python -m budget_tracker export expenses [--start YYYY-MM-DD] [--end YYYY-MM-DD] [-o FILE]
+    python -m budget_tracker import investments FILE
+    python -m budget_tracker rebuild-indexes
+    python -m budget_tracker rebuild-rollups [--all-ledgers] [--workers N]
+    python -m budget_tracker migrate-categories [--dry-run]
+    python -m budget_tracker replay-queue
+    python -m budget_tracker add-user USERNAME [--owns LEDGER ...]
+
+Works on the ledger given by --ledger (DEFAULT_LEDGER_ID otherwise). Only the
+database layer is imported, never Streamlit.
+"""
+import argparse
+import getpass
+import sys
+from datetime import date, datetime
+from typing import List
+import pandas as pd
+from database.backend import DatabaseUnavailable, get_backend
+from database.category_model import CategoryModel
+from database.event_model import EventModel
+from database.investment_category_model import InvestmentCategoryModel
+from database.investment_model import InvestmentModel
+from database.ledger import ledger_scope
+from database.ledger_model import LedgerModel
+from database.models import ExpenseModel
+from database.user_model import MIN_PASSWORD_LENGTH, UserModel
+from database.read_routing import analytics_reads
+from database.rebuild import rebuild_ledgers
+from database.write_queue import pending_count, replay
+from utils.validators import validate_entry_rows
+import config
+
+
+_KINDS = {
+    "expenses": (ExpenseModel.get_expenses, ExpenseModel.create_expenses, CategoryModel),
+    "investments": (InvestmentModel.get_investments, InvestmentModel.create_investments, InvestmentCategoryModel),
+}
+
+# Same layout as the CSV export in Settings
+_CSV_COLUMNS = ["Date", "Category", "Description", "Amount"]
+
+
+def _date(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}")
+
+
+def _ledgers(args) -> List[str]:
+    known = [l["_id"] for l in LedgerModel.get_ledgers()]
+    if getattr(args, "all_ledgers", False):
+        return known
+    if args.ledger not in known:
+        raise SystemExit(f"Unknown ledger: {args.ledger}")
+    return [args.ledger]
+
+
+# ── Commands ─────────────────────────────────────────────────────────────────
+
+def run_scheduler(args) -> int:
+    failed = 0
+    for ledger in _ledgers(args):
+        with ledger_scope(ledger):
+            results = EventModel.run_due_events(force=args.force)
+        for result in results:
+            print(f"[{ledger}] {result['status']:<10} {result['event'].get('title', '')}: {result['reason']}")
+            failed += result["status"] == "failed"
+        if not results:
+            print(f"[{ledger}] No payments due")
+    return 1 if failed else 0
+
+
+def export_entries(args) -> int:
+    get_entries = _KINDS[args.kind][0]
+    start = datetime.combine(args.start, datetime.min.time()) if args.start else None
+    end = datetime(args.end.year, args.end.month, args.end.day, 23, 59, 59) if args.end else None
+    with ledger_scope(_ledgers(args)[0]), analytics_reads():
+        entries = get_entries(start, end)
+    df = pd.DataFrame(entries, columns=["date", "category", "description", "amount"])
+    df["date"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
+    df.columns = _CSV_COLUMNS
+    df.to_csv(args.output or sys.stdout, index=False)
+    print(f"Exported {len(df)} {args.kind}", file=sys.stderr)
+    return 0
+
+
+def import_entries(args) -> int:
+    """All rows or none: any invalid row aborts the import. Rows identical to
+    stored entries are skipped, so re-importing a file adds nothing."""
+    _, create, category_model = _KINDS[args.kind]
+    df = pd.read_csv(args.file, dtype={"Description": str})
+    df.columns = [str(c).strip().title() for c in df.columns]
+    missing = set(_CSV_COLUMNS) - set(df.columns)
+    if missing:
+        print(f"Error importing {args.file}: missing column(s) {', '.join(sorted(missing))}", file=sys.stderr)
+        return 1
+    df["Date"] = pd.to_datetime(df["Date"], format="%Y-%m-%d", errors="coerce")
+    df["Amount"] = pd.to_numeric(df["Amount"], errors="coerce")
+    rows = [
+        {
+            "date": None if pd.isna(r.Date) else r.Date.to_pydatetime(),
+            "category": None if pd.isna(r.Category) else str(r.Category).strip(),
+            "description": None if pd.isna(r.Description) else r.Description,
+            "amount": None if pd.isna(r.Amount) else float(r.Amount),
+        }
+        for r in df.itertuples(index=False)
+    ]
+
+    with ledger_scope(_ledgers(args)[0]):
+        entries, errors = validate_entry_rows(rows, category_model.get_all_categories(), skip_blank=False)
+        if errors:
+            for error in errors:
+                print(error, file=sys.stderr)
+            print(f"Nothing imported: {len(errors)} error(s)", file=sys.stderr)
+            return 1
+        try:
+            created = create(entries, skip_duplicates=True) if entries else []
+        except DatabaseUnavailable:
+            print(f"Error importing {args.file}: the database is unavailable", file=sys.stderr)
+            return 1
+    if created is None:
+        print(f"Error importing {args.file}", file=sys.stderr)
+        return 1
+    print(f"Imported {len(created)} {args.kind}, skipped {len(entries) - len(created)} duplicate(s)")
+    return 0
+
+
+def rebuild_indexes(args) -> int:
+    get_backend().ensure_schema()
+    print("Indexes are up to date")
+    return 0
+
+
+def rebuild_rollups(args) -> int:
+    """Archives, fingerprints, budget totals and dashboard snapshots, years in parallel"""
+    failed = 0
+    for ledger, result in rebuild_ledgers(_ledgers(args), args.workers).items():
+        print(
+            f"[{ledger}] {result['years']} year(s) rebuilt: {result['archived']} entries archived, "
+            f"{result['fingerprints']} fingerprint(s) updated, {result['snapshot_months']} snapshot month(s) written"
+        )
+        if result["failed_years"]:
+            print(f"[{ledger}] Budget totals failed for {result['failed_years']} year(s)", file=sys.stderr)
+        failed += result["failed_years"]
+    return 1 if failed else 0
+
+
+def migrate_categories(args) -> int:
+    """Move expenses filed under investment categories to investments"""
+    with ledger_scope(_ledgers(args)[0]):
+        candidates = ExpenseModel.get_expenses_by_categories(config.INVESTMENT_CATEGORIES)
+        print(f"Found {len(candidates)} expense(s) that look like investments")
+        if args.dry_run or not candidates:
+            return 0
+        migrated, failed = InvestmentModel.migrate_from_expenses(candidates)
+    print(f"Migrated {migrated}, failed {failed} (left in expenses)")
+    return 1 if failed else 0
+
+
+def replay_queue(args) -> int:
+    """Save the entries queued while the database was unavailable"""
+    created = replay()
+    left = pending_count()
+    print(f"Saved {created} queued entries, {left} still queued")
+    return 1 if left else 0
+
+
+def add_user(args) -> int:
+    """Create an account that signs in to the app. The password is prompted
+    for, or read from the first line of stdin when it isn't a terminal."""
+    user_id = args.username.strip().lower()
+    if not UserModel.valid_user_id(user_id):
+        print("Error: usernames are letters, digits, '.', '_' and '-', at most 64", file=sys.stderr)
+        return 1
+    known = {l["_id"] for l in LedgerModel.get_ledgers()}
+    unknown = [ledger for ledger in args.owns if ledger not in known]
+    if unknown:
+        print(f"Error: unknown ledger(s) {', '.join(unknown)}", file=sys.stderr)
+        return 1
+    password = getpass.getpass() if sys.stdin.isatty() else sys.stdin.readline().rstrip("\n")
+    if len(password) < MIN_PASSWORD_LENGTH:
+        print(f"Error: the password needs at least {MIN_PASSWORD_LENGTH} characters", file=sys.stderr)
+        return 1
+    if not UserModel.create_user(user_id, password):
+        print(f"Error: couldn't create {user_id}; is the name taken?", file=sys.stderr)
+        return 1
+    for ledger in args.owns:
+        LedgerModel.set_owner(ledger, user_id)
+    print(f"Created {user_id}" + (f", owner of {', '.join(args.owns)}" if args.owns else ""))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="budget_tracker", description="Budget Tracker batch operations")
+    parser.add_argument("--ledger", default=config.DEFAULT_LEDGER_ID, help="ledger to work on")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser("run-scheduler", help="post the recurring payments that are due")
+    cmd.add_argument("--force", action="store_true", help="re-run this period for every active payment")
+    cmd.add_argument("--all-ledgers", action="store_true")
+    cmd.set_defaults(func=run_scheduler)
+
+    cmd = commands.add_parser("export", help="write entries as CSV")
+    cmd.add_argument("kind", choices=list(_KINDS))
+    cmd.add_argument("--start", type=_date)
+    cmd.add_argument("--end", type=_date)
+    cmd.add_argument("-o", "--output", help="file to write (default: stdout)")
+    cmd.set_defaults(func=export_entries)
+
+    cmd = commands.add_parser("import", help="add entries from a CSV in the export layout")
+    cmd.add_argument("kind", choices=list(_KINDS))
+    cmd.add_argument("file")
+    cmd.set_defaults(func=import_entries)
+
+    cmd = commands.add_parser("rebuild-indexes", help="create missing tables and indexes")
+    cmd.set_defaults(func=rebuild_indexes)
+
+    cmd = commands.add_parser(
+        "rebuild-rollups", help="archive, then recompute fingerprints, budget totals and dashboard snapshots"
+    )
+    cmd.add_argument("--all-ledgers", action="store_true")
+    cmd.add_argument("--workers", type=int, help="worker processes (default: REBUILD_WORKERS, else every core)")
+    cmd.set_defaults(func=rebuild_rollups)
+
+    cmd = commands.add_parser("migrate-categories", help="move expenses filed under investment categories")
+    cmd.add_argument("--dry-run", action="store_true", help="only report what would move")
+    cmd.set_defaults(func=migrate_categories)
+
+    cmd = commands.add_parser("replay-queue", help="save entries queued while the database was unavailable")
+    cmd.set_defaults(func=replay_queue)
+
+    cmd = commands.add_parser("add-user", help="create an account that signs in to the app")
+    cmd.add_argument("username")
+    cmd.add_argument("--owns", nargs="*", default=[], metavar="LEDGER", help="ledgers to hand to this user")
+    cmd.set_defaults(func=add_user)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+import streamlit as st
+import config
+from database.user_model import UserModel
+
+
+def signed_in_user() -> str:
+    """The user of this session. Shows the sign-in form and stops the run
+    until someone signs in; everyone is DEFAULT_USER_ID without AUTH_ENABLED."""
+    if not config.AUTH_ENABLED:
+        return config.DEFAULT_USER_ID
+    if st.session_state.get("user_id"):
+        return st.session_state.user_id
+
+    st.title(f"{config.PAGE_ICON} Expense Tracker")
+    with st.form("sign_in"):
+        user_id = st.text_input("Username")
+        password = st.text_input("Password", type="password")
+        submitted = st.form_submit_button("Sign in", type="primary")
+    if submitted:
+        if UserModel.authenticate(user_id, password):
+            st.session_state.user_id = user_id.strip().lower()
+            st.rerun()
+        st.error("Wrong username or password")
+    st.caption("Accounts are created with `python -m budget_tracker add-user NAME`.")
+    st.stop()
+
+
+def sign_out():
+    for key in ("user_id", "ledger", "editing_expense"):
+        if key in st.session_state:
+            del st.session_state[key]
+    st.query_params.pop("ledger", None)
+    st.rerun()
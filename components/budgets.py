@@ -0,0 +1,32 @@
+import streamlit as st
+from database.budget_model import BudgetModel
+from utils.helpers import format_currency
+
+
+def render_budget_status(year, month, filter_label, category=None):
+    status = BudgetModel.get_budget_status(year, month)
+    if category:
+        status = [s for s in status if s["category"] == category]
+    if not status:
+        return
+
+    for s in status:
+        if s["over_budget"]:
+            st.error(
+                f"🚨 **{s['category']}** is over budget for {filter_label}: "
+                f"{format_currency(s['spent'])} of {format_currency(s['budget'])} "
+                f"({format_currency(-s['remaining'])} over)"
+            )
+        elif s["warning"]:
+            st.warning(
+                f"⚠️ **{s['category']}** has used {s['utilization']:.0%} of its budget for {filter_label}: "
+                f"{format_currency(s['remaining'])} left"
+            )
+
+    with st.expander(f"🎯 Budgets ({filter_label})"):
+        for s in status:
+            st.progress(
+                min(s["utilization"], 1.0),
+                text=f"{s['category']}: {format_currency(s['spent'])} / {format_currency(s['budget'])} "
+                f"({s['utilization']:.0%})",
+            )
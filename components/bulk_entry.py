@@ -0,0 +1,93 @@
+import streamlit as st
+from datetime import date
+from typing import Callable, Dict, List, Optional
+import pandas as pd
+import config
+from components.idempotency import submission_key
+from database.backend import DatabaseUnavailable
+from utils.fingerprint import entry_fingerprint
+from utils.validators import validate_entry_rows
+
+
+def render_bulk_entry_form(
+    form_key: str,
+    categories: List[str],
+    on_save: Callable[[List[Dict]], Optional[List[Dict]]],
+    amount_step: float = 10.0,
+) -> List[Dict]:
+    """Editable grid of rows validated together and saved in one batch.
+
+    Every row gets an idempotency key, the same for a repeated submission
+    of the same rows (a double click). `on_save` returns the entries it
+    created, leaving out rows whose key was already used, or None on
+    failure, and raises DatabaseUnavailable during an outage. Returns the saved entries (empty if nothing was saved this run).
+    """
+    version_key = f"{form_key}_version"
+    skipped_key = f"{form_key}_skipped"
+    st.session_state.setdefault(version_key, 0)
+    # Shown after the rerun that follows a save
+    if st.session_state.get(skipped_key):
+        st.warning(f"⚠️ {st.session_state.pop(skipped_key)} row(s) were already saved and were skipped.")
+
+    blank = pd.DataFrame({
+        "date": [date.today()] * config.BULK_ENTRY_ROWS,
+        "category": pd.Series([None] * config.BULK_ENTRY_ROWS, dtype="object"),
+        "description": [""] * config.BULK_ENTRY_ROWS,
+        "amount": pd.Series([None] * config.BULK_ENTRY_ROWS, dtype="float64"),
+    })
+
+    # Edits inside the form don't rerun the script; the grid is sent once on submit
+    with st.form(form_key):
+        edited = st.data_editor(
+            blank,
+            key=f"{form_key}_grid_{st.session_state[version_key]}",
+            num_rows="dynamic",
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "date": st.column_config.DateColumn("📅 Date", max_value=date.today(), default=date.today()),
+                "category": st.column_config.SelectboxColumn("🏷️ Category", options=categories),
+                "description": st.column_config.TextColumn("📝 Description", max_chars=200),
+                "amount": st.column_config.NumberColumn(
+                    f"💰 Amount ({config.CURRENCY_SYMBOL})", min_value=0.0, step=amount_step, format="%.2f",
+                ),
+            },
+        )
+        submitted = st.form_submit_button("💾 Save All", use_container_width=True, type="primary")
+
+    if not submitted:
+        return []
+
+    rows = edited.astype(object).where(edited.notna(), None).to_dict("records")
+    entries, errors = validate_entry_rows(rows, categories)
+    if errors:
+        for error in errors:
+            st.error(error)
+        return []
+    if not entries:
+        st.warning("Fill in at least one row before saving.")
+        return []
+    batch_key = submission_key(form_key, "|".join(
+        entry_fingerprint(e["date"], e["category"], e["description"], e["amount"]) for e in entries
+    ))
+    for row_no, entry in enumerate(entries):
+        entry["idempotency_key"] = f"{batch_key}:{row_no}"
+    try:
+        saved = on_save(entries)
+    except DatabaseUnavailable:
+        st.error("🔌 The database can't be reached right now, so nothing was saved. Try again shortly.")
+        return []
+    if saved is None:
+        st.error("❌ Failed to save entries. Please try again.")
+        return []
+
+    skipped = len(entries) - len(saved)
+    if not saved:
+        st.warning(f"⚠️ All {skipped} row(s) were already saved; nothing was added.")
+        return []
+
+    # A fresh widget key clears the grid for the next batch
+    st.session_state[version_key] += 1
+    if skipped:
+        st.session_state[skipped_key] = skipped
+    return saved
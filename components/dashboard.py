@@ -1,17 +1,118 @@
 import streamlit as st
-from datetime import datetime
+from datetime import date, datetime, timedelta
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import config
+from components.budgets import render_budget_status
 from database.models import ExpenseModel
 from database.investment_model import InvestmentModel
-from utils.helpers import format_currency, get_month_name, get_month_start_end
+from database.event_model import EventModel
+from utils.anomalies import daily_category_totals, score_days, score_transactions
+from utils.downsample import lttb
+from utils.forecast import project_totals, quarter_start
+from utils.helpers import PERIOD_UNITS, format_currency, get_month_name, get_month_start_end
+
+
+# Daily trend ranges, in months ending with the selected month (None: all time)
+TREND_RANGES = {"Month": 1, "3 Months": 3, "12 Months": 12, "All Time": None}
+
+
+_UNIT_ADJECTIVES = {"day": "Daily", "week": "Weekly", "month": "Monthly", "quarter": "Quarterly"}
+
+
+def _period_label(period: datetime, unit: str) -> str:
+    if unit == "day":
+        return period.strftime("%d %b %Y")
+    if unit == "week":
+        return f"Week of {period.strftime('%d %b %Y')}"
+    if unit == "quarter":
+        return f"Q{(period.month - 1) // 3 + 1} {period.year}"
+    return f"{get_month_name(period.month)} {period.year}"
 
 
 def render_dashboard():
     st.header("📊 Dashboard & Analytics")
 
+    period_mode = st.radio(
+        "Period",
+        options=["Month", "Custom range"],
+        horizontal=True,
+        key="dashboard_period_mode",
+        label_visibility="collapsed",
+    )
+    if period_mode == "Month":
+        selected_year, selected_month = render_month_selectors()
+        start_date, end_date = get_month_start_end(selected_year, selected_month)
+        filter_label = f"{get_month_name(selected_month)} {selected_year}"
+    else:
+        today = date.today()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            start_day = st.date_input("📅 From", value=date(today.year - 1, today.month, 1), key="dashboard_range_start")
+        with col2:
+            end_day = st.date_input("📅 To", value=today, key="dashboard_range_end")
+        with col3:
+            unit = st.selectbox(
+                "🗓️ Group by",
+                options=PERIOD_UNITS,
+                index=PERIOD_UNITS.index("month"),
+                format_func=str.capitalize,
+                key="dashboard_range_unit",
+            )
+        if start_day > end_day:
+            st.error("The start date must be on or before the end date.")
+            return
+        start_date = datetime(start_day.year, start_day.month, start_day.day)
+        end_date = datetime(end_day.year, end_day.month, end_day.day, 23, 59, 59)
+        filter_label = f"{start_day:%d %b %Y} – {end_day:%d %b %Y}"
+
+    st.divider()
+    render_kpi_cards(start_date, end_date, filter_label)
+    if period_mode == "Month":
+        render_budget_status(selected_year, selected_month, filter_label)
+    st.divider()
+
+    if period_mode == "Month":
+        views = ["📈 Daily Trend", "📊 Monthly Comparison"]
+    else:
+        views = ["📈 Trend", "📊 Expenses vs Investments"]
+    chart_tab = st.radio(
+        "View",
+        options=views + ["📅 Yearly Overview", "🗺️ Category Heatmap", "🥧 Category Breakdown", "💼 Investment Breakdown", "🚨 Anomalies", "🔮 Forecast"],
+        horizontal=True,
+        key=f"dashboard_chart_tab_{period_mode}",
+        label_visibility="collapsed",
+    )
+
+    st.markdown("<div style='margin-top: 1rem;'></div>", unsafe_allow_html=True)
+
+    if chart_tab == "📈 Daily Trend":
+        render_daily_trend(start_date, end_date, filter_label)
+    elif chart_tab == "📊 Monthly Comparison":
+        render_monthly_comparison()
+    elif chart_tab == "📈 Trend":
+        render_period_trend(start_date, end_date, unit, filter_label)
+    elif chart_tab == "📊 Expenses vs Investments":
+        render_period_comparison(start_date, end_date, unit, filter_label)
+    elif chart_tab == "📅 Yearly Overview":
+        render_yearly_overview()
+    elif chart_tab == "🗺️ Category Heatmap":
+        render_category_heatmap()
+    elif chart_tab == "🥧 Category Breakdown":
+        render_category_breakdown(start_date, end_date, filter_label)
+    elif chart_tab == "💼 Investment Breakdown":
+        render_investment_breakdown(start_date, end_date, filter_label)
+    elif chart_tab == "🚨 Anomalies":
+        render_anomalies(start_date, end_date, filter_label)
+    elif chart_tab == "🔮 Forecast":
+        render_forecast()
+
+    st.divider()
+
+
+def render_month_selectors():
     available_years = ExpenseModel.get_available_years()
     available_year_months = ExpenseModel.get_available_year_months()
     current_year = datetime.now().year
@@ -51,114 +152,156 @@ def render_dashboard():
             selected_month = current_month
             st.info(f"No data available for {selected_year}. Showing current month.")
 
-    start_date, end_date = get_month_start_end(selected_year, selected_month)
-    filter_label = f"{get_month_name(selected_month)} {selected_year}"
-
-    st.divider()
-    render_kpi_cards(start_date, end_date, filter_label)
-    st.divider()
-
-    chart_tab = st.radio(
-        "View",
-        options=["📈 Daily Trend", "📊 Monthly Comparison", "📅 Yearly Overview", "🥧 Category Breakdown", "💼 Investment Breakdown"],
-        horizontal=True,
-        key="dashboard_chart_tab",
-        label_visibility="collapsed",
-    )
-
-    st.markdown("<div style='margin-top: 1rem;'></div>", unsafe_allow_html=True)
-
-    if chart_tab == "📈 Daily Trend":
-        render_daily_trend(start_date, end_date, filter_label)
-    elif chart_tab == "📊 Monthly Comparison":
-        render_monthly_comparison()
-    elif chart_tab == "📅 Yearly Overview":
-        render_yearly_overview()
-    elif chart_tab == "🥧 Category Breakdown":
-        render_category_breakdown(start_date, end_date, filter_label)
-    elif chart_tab == "💼 Investment Breakdown":
-        render_investment_breakdown(start_date, end_date, filter_label)
-
-    st.divider()
+    return selected_year, selected_month
 
 
 def render_kpi_cards(start_date, end_date, filter_label):
-    expenses = ExpenseModel.get_expenses(start_date, end_date) if (start_date and end_date) else ExpenseModel.get_expenses()
-    investments = InvestmentModel.get_investments(start_date, end_date) if (start_date and end_date) else InvestmentModel.get_investments()
-    total_expenses = sum(e["amount"] for e in expenses)
-    total_investments = sum(i["amount"] for i in investments)
+    expenses = ExpenseModel.get_category_summary(start_date, end_date).values()
+    investments = InvestmentModel.get_category_summary(start_date, end_date).values()
+    total_expenses = sum(total for total, _ in expenses)
+    total_investments = sum(total for total, _ in investments)
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         st.metric("💸 Total Expenses", format_currency(total_expenses))
     with col2:
-        st.metric("📊 Expense Entries", str(len(expenses)))
+        st.metric("📊 Expense Entries", str(sum(count for _, count in expenses)))
     with col3:
         st.metric("📈 Total Invested", format_currency(total_investments))
     with col4:
-        st.metric("🗂️ Investment Entries", str(len(investments)))
+        st.metric("🗂️ Investment Entries", str(sum(count for _, count in investments)))
 
 
-def render_daily_trend(start_date, end_date, filter_label):
-    st.subheader(f"Daily Expense Trend ({filter_label})")
+def _trend_start(year: int, month: int, months):
+    """First (year, month) of the trend range ending with the selected month"""
+    if months is None:
+        year_months = ExpenseModel.get_available_year_months()
+        return min(year_months) if year_months else (year, month)
+    index = year * 12 + month - 1 - (months - 1)
+    return index // 12, index % 12 + 1
 
+
+def render_daily_trend(start_date, end_date, filter_label):
     if not start_date or not end_date:
+        st.subheader(f"Daily Expense Trend ({filter_label})")
         st.info("Daily trend is not available for 'All Time'. Please select a specific period.")
         return
 
+    trend_range = st.radio(
+        "Range", options=list(TREND_RANGES), horizontal=True, key="daily_trend_range",
+    )
+    months = TREND_RANGES[trend_range]
+    if months != 1:
+        first_year, first_month = _trend_start(start_date.year, start_date.month, months)
+        start_date = min(start_date, datetime(first_year, first_month, 1))
+        filter_label = f"{get_month_name(start_date.month)} {start_date.year} – {filter_label}"
+
+    st.subheader(f"Daily Expense Trend ({filter_label})")
+
     daily_data = ExpenseModel.get_daily_totals(start_date, end_date)
 
     if daily_data.empty:
         st.info(f"No expenses recorded for {filter_label}.")
         return
 
-    fig = px.line(
-        daily_data,
-        x="date",
-        y="amount",
+    # Downsample before the figure is serialized; WebGL keeps long series smooth
+    days = pd.to_datetime(daily_data["date"]).values.astype("datetime64[D]").astype(np.int64)
+    keep = lttb(days, daily_data["amount"].to_numpy(dtype=float), config.TREND_MAX_POINTS)
+    shown = daily_data.iloc[keep]
+    show_markers = len(daily_data) <= 62
+
+    fig = go.Figure(go.Scattergl(
+        x=shown["date"],
+        y=shown["amount"],
+        mode="lines+markers" if show_markers else "lines",
+        line=dict(color="#4ECDC4", width=3 if show_markers else 2),
+        marker=dict(size=8),
+        name="Spent",
+    ))
+    fig.update_layout(
         title=f"Daily Spending Pattern - {filter_label}",
-        labels={"date": "Date", "amount": f"Amount ({config.CURRENCY_SYMBOL})"},
-        markers=True,
+        xaxis_title="Date",
+        yaxis_title=f"Amount ({config.CURRENCY_SYMBOL})",
+        hovermode="x unified",
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
     )
-    fig.update_traces(line_color="#4ECDC4", line_width=3, marker=dict(size=8))
-    fig.update_layout(hovermode="x unified", plot_bgcolor="rgba(0,0,0,0)", paper_bgcolor="rgba(0,0,0,0)")
     st.plotly_chart(fig, use_container_width=True)
+    if len(shown) < len(daily_data):
+        st.caption(f"Showing {len(shown)} of {len(daily_data)} days, downsampled to keep peaks and dips.")
 
 
 def render_monthly_comparison():
-    st.subheader("Monthly Comparison (Last 6 Months)")
-
     now = datetime.now()
-    monthly_data = []
-
-    for i in range(5, -1, -1):
-        month = (now.month - i - 1) % 12 + 1
-        year = now.year + (now.month - i - 1) // 12
-        label = f"{get_month_name(month)} {year}"
-        month_date = datetime(year, month, 1)
-        expense_total = ExpenseModel.get_monthly_total(month_date.year, month_date.month)
-        investment_total = InvestmentModel.get_monthly_total(month_date.year, month_date.month)
-        if expense_total > 0 or investment_total > 0:
-            monthly_data.append({"month": label, "amount": expense_total, "type": "Expenses"})
-            monthly_data.append({"month": label, "amount": investment_total, "type": "Investments"})
-
-    if not monthly_data:
-        st.info("No data available for the last 6 months.")
+    index = now.year * 12 + now.month - 1 - 5
+    start_date = datetime(index // 12, index % 12 + 1, 1)
+    end_date = get_month_start_end(now.year, now.month)[1]
+    render_period_comparison(start_date, end_date, "month", "Last 6 Months")
+
+
+def render_period_comparison(start_date, end_date, unit, filter_label):
+    st.subheader(f"Expenses vs Investments ({filter_label})")
+
+    expenses = ExpenseModel.get_period_totals(start_date, end_date, unit)
+    investments = InvestmentModel.get_period_totals(start_date, end_date, unit)
+    periods = pd.DataFrame({
+        "period": expenses["period"],
+        "Expenses": expenses["amount"],
+        "Investments": investments["amount"],
+    })
+    periods = periods[(periods["Expenses"] > 0) | (periods["Investments"] > 0)]
+
+    if periods.empty:
+        st.info(f"No data available for {filter_label}.")
         return
 
+    periods["label"] = [_period_label(p, unit) for p in periods["period"]]
     fig = px.bar(
-        pd.DataFrame(monthly_data),
-        x="month",
+        periods.melt(id_vars=["period", "label"], var_name="type", value_name="amount"),
+        x="label",
         y="amount",
         color="type",
         barmode="group",
-        title="Monthly Expenses vs Investments (Last 6 Months)",
-        labels={"month": "Month", "amount": f"Amount ({config.CURRENCY_SYMBOL})", "type": ""},
+        title=f"Expenses vs Investments per {unit.capitalize()} ({filter_label})",
+        labels={"label": unit.capitalize(), "amount": f"Amount ({config.CURRENCY_SYMBOL})", "type": ""},
         color_discrete_map={"Expenses": "#FF6B6B", "Investments": "#6C5CE7"},
     )
     fig.update_layout(plot_bgcolor="rgba(0,0,0,0)", paper_bgcolor="rgba(0,0,0,0)", legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
     st.plotly_chart(fig, use_container_width=True)
 
 
+def render_period_trend(start_date, end_date, unit, filter_label):
+    st.subheader(f"{_UNIT_ADJECTIVES[unit]} Trend ({filter_label})")
+
+    expenses = ExpenseModel.get_period_totals(start_date, end_date, unit)
+    investments = InvestmentModel.get_period_totals(start_date, end_date, unit)
+
+    if not (expenses["amount"].any() or investments["amount"].any()):
+        st.info(f"No data available for {filter_label}.")
+        return
+
+    fig = go.Figure()
+    for name, data, color in (("Expenses", expenses, "#FF6B6B"), ("Investments", investments, "#6C5CE7")):
+        days = data["period"].values.astype("datetime64[D]").astype(np.int64)
+        shown = data.iloc[lttb(days, data["amount"].to_numpy(dtype=float), config.TREND_MAX_POINTS)]
+        fig.add_trace(go.Scattergl(
+            x=shown["period"],
+            y=shown["amount"],
+            mode="lines+markers" if len(shown) <= 62 else "lines",
+            name=name,
+            line=dict(color=color, width=3),
+            marker=dict(size=8),
+        ))
+    fig.update_layout(
+        xaxis_title=unit.capitalize(),
+        yaxis_title=f"Amount ({config.CURRENCY_SYMBOL})",
+        hovermode="x unified",
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+
 def render_yearly_overview():
     st.subheader("Yearly Overview")
 
@@ -170,7 +313,15 @@ def render_yearly_overview():
         st.info("No data available yet.")
         return
 
-    year = st.selectbox("Select Year", options=available_years, index=0, key="yearly_overview_year")
+    col1, col2 = st.columns(2)
+    with col1:
+        year = st.selectbox("Select Year", options=available_years, index=0, key="yearly_overview_year")
+    with col2:
+        compare_years = st.multiselect(
+            "Compare with",
+            options=[y for y in available_years if y != year],
+            key="yearly_overview_compare",
+        )
 
     expense_totals = ExpenseModel.get_yearly_monthly_totals(year)
     investment_totals = InvestmentModel.get_yearly_monthly_totals(year)
@@ -215,19 +366,229 @@ def render_yearly_overview():
     )
     st.plotly_chart(fig, use_container_width=True)
 
+    if compare_years:
+        render_year_comparison(sorted([year] + compare_years))
+
+
+def render_year_comparison(years):
+    st.subheader(f"Year-over-Year Expenses ({', '.join(str(y) for y in years)})")
+
+    monthly = ExpenseModel.get_monthly_totals_range(years[0], years[-1])
+    month_labels = [get_month_name(m) for m in range(1, 13)]
+
+    fig = go.Figure()
+    for y in years:
+        fig.add_trace(go.Scatter(
+            x=month_labels,
+            y=[monthly.get((y, m), 0.0) for m in range(1, 13)],
+            mode="lines+markers",
+            name=str(y),
+        ))
+    fig.update_layout(
+        xaxis_title="Month",
+        yaxis_title=f"Amount ({config.CURRENCY_SYMBOL})",
+        hovermode="x unified",
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    category_totals = ExpenseModel.get_yearly_category_totals(years[0], years[-1])
+    rows = [
+        {"category": cat, "year": y, "amount": amount}
+        for (y, cat), amount in category_totals.items()
+        if y in years
+    ]
+    if not rows:
+        return
+    df = pd.DataFrame(rows).pivot_table(index="category", columns="year", values="amount", fill_value=0.0)
+    df = df.reindex(columns=years, fill_value=0.0).sort_values(years[-1], ascending=False)
+    st.markdown("**Category totals by year**")
+    st.dataframe(df.map(format_currency), use_container_width=True)
+
+
+def render_anomalies(start_date, end_date, filter_label):
+    st.subheader(f"Unusual Spending ({filter_label})")
+    st.caption(
+        f"Days and expenses at least {config.ANOMALY_Z_THRESHOLD:g} standard deviations above the category's "
+        f"usual spend over the previous {config.ANOMALY_BASELINE_DAYS} days. Scheduled payments are left out."
+    )
+
+    history_start = start_date - timedelta(days=config.ANOMALY_BASELINE_DAYS)
+    entries = ExpenseModel.get_expense_frame(history_start, end_date)
+    entries = entries[~entries["scheduled"]]
+
+    days = score_days(
+        daily_category_totals(entries),
+        config.ANOMALY_BASELINE_DAYS,
+        config.ANOMALY_MIN_HISTORY,
+        config.ANOMALY_Z_THRESHOLD,
+    )
+    days = days[days["date"] >= start_date]
+    transactions = score_transactions(
+        entries, config.ANOMALY_TRANSACTION_WINDOW, config.ANOMALY_MIN_HISTORY, config.ANOMALY_Z_THRESHOLD,
+    )
+    transactions = transactions[transactions["date"] >= start_date]
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("📅 Unusual Category-Days", str(len(days)))
+    with col2:
+        st.metric("🧾 Unusual Expenses", str(len(transactions)))
+
+    if days.empty and transactions.empty:
+        st.success(f"No unusual spending in {filter_label}.")
+        return
+
+    if not days.empty:
+        st.markdown("**Unusual days**")
+        st.dataframe(pd.DataFrame({
+            "Date": days["date"].dt.strftime("%d %b %Y"),
+            "Category": days["category"],
+            "Spent": days["amount"].map(format_currency),
+            "Usual": days["baseline"].map(format_currency),
+            "Deviation": days["z"].map(lambda z: f"{z:.1f}σ"),
+        }), use_container_width=True, hide_index=True)
+
+    if not transactions.empty:
+        st.markdown("**Unusual expenses**")
+        st.dataframe(pd.DataFrame({
+            "Date": transactions["date"].dt.strftime("%d %b %Y"),
+            "Category": transactions["category"],
+            "Description": transactions["description"],
+            "Amount": transactions["amount"].map(format_currency),
+            "Usual": transactions["baseline"].map(format_currency),
+            "Deviation": transactions["z"].map(lambda z: f"{z:.1f}σ"),
+        }), use_container_width=True, hide_index=True)
+
+
+def render_category_heatmap():
+    st.subheader("Category Heatmap")
+
+    years = sorted(ExpenseModel.get_available_years())
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        from_year = st.selectbox("From", options=years, index=max(len(years) - 2, 0), key="heatmap_from_year")
+    with col2:
+        to_years = [y for y in years if y >= from_year]
+        to_year = st.selectbox("To", options=to_years, index=len(to_years) - 1, key="heatmap_to_year")
+    with col3:
+        granularity = st.radio("Per", options=["Month", "Week"], horizontal=True, key="heatmap_unit")
+    unit = granularity.lower()
+
+    categories, periods, matrix = ExpenseModel.get_category_period_matrix(
+        datetime(from_year, 1, 1), datetime(to_year, 12, 31, 23, 59, 59), unit,
+    )
+    if not categories:
+        st.info(f"No expenses recorded for {from_year}–{to_year}.")
+        return
+
+    # Biggest categories first
+    order = np.argsort(-matrix.sum(axis=1), kind="stable")
+    matrix = matrix[order]
+    categories = [categories[i] for i in order]
+
+    fig = go.Figure(go.Heatmap(
+        z=matrix,
+        x=periods,
+        y=categories,
+        colorscale="Reds",
+        hovertemplate=f"<b>%{{y}}</b><br>%{{x|{'%b %Y' if unit == 'month' else 'Week of %d %b %Y'}}}"
+                      f"<br>{config.CURRENCY_SYMBOL}%{{z:,.2f}}<extra></extra>",
+    ))
+    fig.update_layout(
+        title=f"Spending by Category per {granularity} ({from_year}–{to_year})",
+        height=max(320, 40 * len(categories) + 140),
+        yaxis=dict(autorange="reversed"),
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(
+        pd.DataFrame({
+            "Category": categories,
+            "Total": [format_currency(t) for t in matrix.sum(axis=1)],
+            f"Average per {granularity}": [format_currency(a) for a in matrix.mean(axis=1)],
+            "Trend": [row.tolist() for row in matrix],
+        }),
+        column_config={"Trend": st.column_config.LineChartColumn(f"{_UNIT_ADJECTIVES[unit]} spend", y_min=0)},
+        use_container_width=True,
+        hide_index=True,
+    )
+
+
+def render_forecast():
+    st.subheader("Month-end & Quarter-end Forecast")
+    st.caption(
+        f"Actuals so far + average unscheduled daily spend over the last {config.FORECAST_LOOKBACK_DAYS} days "
+        "for each remaining day + every remaining occurrence of active scheduled payments."
+    )
+
+    today = date.today()
+    history_start = min(today - timedelta(days=config.FORECAST_LOOKBACK_DAYS - 1), quarter_start(today))
+    start = datetime(history_start.year, history_start.month, history_start.day)
+    end = datetime(today.year, today.month, today.day, 23, 59, 59)
+    events = EventModel.get_active_events()
+
+    forecasts = {
+        "Expenses": project_totals(
+            ExpenseModel.get_expense_frame(start, end),
+            [e for e in events if e.get("event_type", "expense") != "investment"],
+            today,
+            config.FORECAST_LOOKBACK_DAYS,
+        ),
+        "Investments": project_totals(
+            InvestmentModel.get_investment_frame(start, end),
+            [e for e in events if e.get("event_type") == "investment"],
+            today,
+            config.FORECAST_LOOKBACK_DAYS,
+        ),
+    }
+
+    rows = []
+    for period, label in (("month", "Month-end"), ("quarter", "Quarter-end")):
+        st.markdown(f"**{label} ({forecasts['Expenses'][period]['end'].strftime('%d %b %Y')})**")
+        cols = st.columns(2)
+        for col, (kind, forecast) in zip(cols, forecasts.items()):
+            f = forecast[period]
+            with col:
+                st.metric(
+                    f"Projected {kind}",
+                    format_currency(f["projected"]),
+                    delta=f"{format_currency(f['projected'] - f['to_date'])} still to come",
+                    delta_color="off",
+                )
+            rows += [
+                {"period": label, "type": kind, "part": "So far", "amount": f["to_date"]},
+                {"period": label, "type": kind, "part": "Scheduled", "amount": f["scheduled"]},
+                {"period": label, "type": kind, "part": "Run rate", "amount": f["unscheduled"]},
+            ]
+
+    fig = px.bar(
+        pd.DataFrame(rows),
+        x="type",
+        y="amount",
+        color="part",
+        facet_col="period",
+        labels={"type": "", "amount": f"Amount ({config.CURRENCY_SYMBOL})", "part": ""},
+        color_discrete_map={"So far": "#4ECDC4", "Scheduled": "#6C5CE7", "Run rate": "#FFD93D"},
+    )
+    fig.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))
+    fig.update_layout(plot_bgcolor="rgba(0,0,0,0)", paper_bgcolor="rgba(0,0,0,0)", legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+    st.plotly_chart(fig, use_container_width=True)
+
 
 def render_category_breakdown(start_date, end_date, filter_label):
     st.subheader(f"Category-wise Expense Breakdown ({filter_label})")
 
     if not start_date or not end_date:
-        expenses = ExpenseModel.get_expenses()
-        if not expenses:
+        summary = ExpenseModel.get_category_summary()
+        if not summary:
             st.info("No expenses recorded yet.")
             return
-        category_data = {}
-        for exp in expenses:
-            cat = exp["category"]
-            category_data[cat] = category_data.get(cat, 0) + exp["amount"]
+        category_data = {cat: total for cat, (total, _) in summary.items()}
     else:
         category_data = ExpenseModel.get_category_breakdown(start_date, end_date)
 
@@ -270,14 +631,11 @@ def render_investment_breakdown(start_date, end_date, filter_label):
     st.subheader(f"Investment Breakdown ({filter_label})")
 
     if not start_date or not end_date:
-        investments = InvestmentModel.get_investments()
-        if not investments:
+        summary = InvestmentModel.get_category_summary()
+        if not summary:
             st.info("No investments recorded yet.")
             return
-        category_data: dict = {}
-        for inv in investments:
-            cat = inv["category"]
-            category_data[cat] = category_data.get(cat, 0) + inv["amount"]
+        category_data = {cat: total for cat, (total, _) in summary.items()}
     else:
         category_data = InvestmentModel.get_category_breakdown(start_date, end_date)
 
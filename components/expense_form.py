@@ -3,6 +3,9 @@ from datetime import datetime
 import config
 from database.models import ExpenseModel
 from database.category_model import CategoryModel
+from components.bulk_entry import render_bulk_entry_form
+from components.idempotency import submission_key
+from utils.fingerprint import entry_fingerprint
 from utils.validators import validate_amount, validate_date, validate_description, validate_category
 
 
@@ -64,9 +67,24 @@ def render_expense_form():
                     category=category,
                     description=description,
                     amount=amount,
+                    idempotency_key=submission_key(
+                        "expense_form", entry_fingerprint(expense_datetime, category, description, amount)
+                    ),
                 )
                 if success:
                     st.session_state.expense_added = True
                     st.session_state.expense_added_amount = amount
                 else:
                     st.error("❌ Failed to add expense. Please try again.")
+
+
+def render_bulk_expense_form():
+    saved = render_bulk_entry_form(
+        "bulk_expense_form",
+        CategoryModel.get_all_categories(),
+        ExpenseModel.create_expenses,
+    )
+    if saved:
+        st.session_state.expense_added = True
+        st.session_state.expense_added_amount = sum(e["amount"] for e in saved)
+        st.session_state.expense_added_count = len(saved)
@@ -0,0 +1,22 @@
+import time
+import uuid
+import streamlit as st
+import config
+
+
+def submission_key(form_key: str, fingerprint: str) -> str:
+    """Idempotency key for one submission of an entry form.
+
+    Submitting the same entry again within RESUBMIT_WINDOW_SECONDS (a double
+    click) reuses the previous key, so the entry is only created once; later
+    identical entries are new ones.
+    """
+    state_key = f"{form_key}_last_submission"
+    last = st.session_state.get(state_key)
+    now = time.time()
+    if last and last["fingerprint"] == fingerprint and now - last["at"] < config.RESUBMIT_WINDOW_SECONDS:
+        key = last["key"]
+    else:
+        key = uuid.uuid4().hex
+    st.session_state[state_key] = {"fingerprint": fingerprint, "key": key, "at": now}
+    return key
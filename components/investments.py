@@ -1,8 +1,14 @@
 import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
 import config
 from datetime import datetime
 from database.investment_model import InvestmentModel
 from database.investment_category_model import InvestmentCategoryModel
+from database.holding_model import HoldingModel
+from components.bulk_entry import render_bulk_entry_form
+from components.idempotency import submission_key
+from utils.fingerprint import entry_fingerprint
 from utils.helpers import get_month_name, get_month_start_end
 
 
@@ -10,14 +16,30 @@ def render_investments():
     st.header("📈 Investments")
     st.divider()
     st.subheader("Add New Investment")
-    render_investment_form()
+    entry_mode = st.radio(
+        "Entry mode",
+        options=["single", "bulk"],
+        format_func=lambda x: "📝 Single entry" if x == "single" else "📋 Bulk entry",
+        horizontal=True,
+        key="investment_entry_mode",
+        label_visibility="collapsed",
+    )
+    if entry_mode == "bulk":
+        render_bulk_investment_form()
+    else:
+        render_investment_form()
 
     if st.session_state.get("investment_added"):
         amount = st.session_state.get("investment_added_amount", 0)
-        st.success(f"✅ Investment of {config.CURRENCY_SYMBOL}{amount:,.2f} added successfully!")
+        count = st.session_state.get("investment_added_count", 1)
+        if count > 1:
+            st.success(f"✅ {count} investments totaling {config.CURRENCY_SYMBOL}{amount:,.2f} added successfully!")
+        else:
+            st.success(f"✅ Investment of {config.CURRENCY_SYMBOL}{amount:,.2f} added successfully!")
         st.balloons()
         st.session_state.investment_added = False
         st.session_state.investment_added_amount = 0
+        st.session_state.investment_added_count = 1
         st.rerun()
 
     st.divider()
@@ -76,6 +98,12 @@ def render_investments():
     filter_label = f"{get_month_name(selected_month)} {selected_year}"
     render_investment_history(start_date, end_date, filter_label, selected_category)
 
+    st.divider()
+    render_investment_timeline()
+
+    st.divider()
+    render_holding_returns()
+
 
 def render_investment_form():
     if "investment_added" not in st.session_state:
@@ -124,6 +152,9 @@ def render_investment_form():
                     category=category,
                     description=description,
                     amount=amount,
+                    idempotency_key=submission_key(
+                        "investment_form", entry_fingerprint(investment_datetime, category, description, amount)
+                    ),
                 )
                 if success:
                     st.session_state.investment_added = True
@@ -132,6 +163,19 @@ def render_investment_form():
                     st.error("❌ Failed to add investment. Please try again.")
 
 
+def render_bulk_investment_form():
+    saved = render_bulk_entry_form(
+        "bulk_investment_form",
+        InvestmentCategoryModel.get_all_categories(),
+        InvestmentModel.create_investments,
+        amount_step=100.0,
+    )
+    if saved:
+        st.session_state.investment_added = True
+        st.session_state.investment_added_amount = sum(i["amount"] for i in saved)
+        st.session_state.investment_added_count = len(saved)
+
+
 def render_investment_history(start_date, end_date, filter_label, selected_category="All Categories"):
     investments = InvestmentModel.get_investments(start_date, end_date) if (start_date and end_date) else InvestmentModel.get_investments()
 
@@ -226,6 +270,134 @@ def render_investment_history(start_date, end_date, filter_label, selected_categ
         render_edit_form(st.session_state.editing_investment)
 
 
+def render_investment_timeline():
+    st.subheader("⏳ Cumulative Timeline")
+
+    timeline = InvestmentModel.get_cumulative_timeline()
+    if timeline.empty:
+        st.info("No expenses or investments recorded yet.")
+        return
+
+    view = st.radio(
+        "Timeline",
+        options=["Invested capital", "Cash flow"],
+        horizontal=True,
+        key="investment_timeline_view",
+        label_visibility="collapsed",
+    )
+    currency = config.CURRENCY_SYMBOL
+    fig = go.Figure()
+
+    if view == "Invested capital":
+        invested = timeline[timeline["kind"] == "investment"]
+        if invested.empty:
+            st.info("No investments recorded yet.")
+            return
+        for category, rows in invested.groupby("category"):
+            fig.add_trace(go.Scatter(
+                x=rows["date"], y=rows["category_total"], name=category, mode="lines", line_shape="hv",
+                hovertemplate=f"%{{x|%d %b %Y}}<br>{currency}%{{y:,.2f}}<extra>{category}</extra>",
+            ))
+        title = "Running Invested Capital by Category"
+    else:
+        # One running total per kind and day, carried forward over days without entries of that kind
+        flow = (
+            timeline.drop_duplicates(["date", "kind"])
+            .pivot(index="date", columns="kind", values="kind_total")
+            .reindex(columns=["expense", "investment"])
+            .ffill()
+            .fillna(0.0)
+        )
+        flow["total"] = flow["expense"] + flow["investment"]
+        for column, name, color in (
+            ("expense", "Expenses", "#FF6B6B"),
+            ("investment", "Investments", "#6C5CE7"),
+            ("total", "Total outflow", "#FDCB6E"),
+        ):
+            fig.add_trace(go.Scatter(
+                x=flow.index, y=flow[column], name=name, mode="lines", line_shape="hv",
+                line=dict(color=color, dash="dot" if column == "total" else "solid"),
+                hovertemplate=f"%{{x|%d %b %Y}}<br>{currency}%{{y:,.2f}}<extra>{name}</extra>",
+            ))
+        title = "Cumulative Expenses and Investments"
+
+    fig.update_layout(
+        title=title,
+        xaxis_title="Date",
+        yaxis_title=f"Amount ({currency})",
+        hovermode="x unified",
+        height=420,
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def render_holding_returns():
+    st.subheader("📊 Returns (XIRR)")
+    st.caption(
+        "Enter the current value of a holding (category and description) to get its annualized return. "
+        "Clear a value to remove it."
+    )
+
+    holdings, categories = HoldingModel.get_returns()
+    if holdings.empty:
+        st.info("No investments recorded yet.")
+        return
+
+    currency = config.CURRENCY_SYMBOL
+    holdings = holdings.assign(xirr=holdings["xirr"] * 100)
+    with st.form("holding_values_form"):
+        edited = st.data_editor(
+            holdings[["category", "description", "invested", "value", "as_of", "gain", "xirr"]],
+            column_config={
+                "category": st.column_config.TextColumn("Category"),
+                "description": st.column_config.TextColumn("Description"),
+                "invested": st.column_config.NumberColumn(f"Invested ({currency})", format="%.2f"),
+                "value": st.column_config.NumberColumn(
+                    f"Current Value ({currency})", min_value=0.0, step=100.0, format="%.2f"
+                ),
+                "as_of": st.column_config.DateColumn("As of", format="DD MMM YYYY"),
+                "gain": st.column_config.NumberColumn(f"Gain ({currency})", format="%.2f"),
+                "xirr": st.column_config.NumberColumn("XIRR", format="%.2f%%"),
+            },
+            disabled=["category", "description", "invested", "as_of", "gain", "xirr"],
+            hide_index=True,
+            use_container_width=True,
+            key="holding_values_editor",
+        )
+        submitted = st.form_submit_button("💾 Save Values", use_container_width=True)
+
+    if submitted:
+        ok = True
+        for (_, before), (_, row) in zip(holdings.iterrows(), edited.iterrows()):
+            if pd.isna(row["value"]):
+                if not pd.isna(before["value"]):
+                    ok = HoldingModel.remove_value(row["category"], row["description"]) and ok
+            elif before["value"] != float(row["value"]):
+                ok = HoldingModel.set_value(row["category"], row["description"], float(row["value"])) and ok
+        if ok:
+            st.success("✅ Values saved!")
+            st.rerun()
+        else:
+            st.error("❌ Failed to save some values. Please try again.")
+
+    if not categories.empty:
+        st.markdown("##### By Category")
+        st.dataframe(
+            pd.DataFrame({
+                "Category": categories["category"],
+                "Invested": [f"{currency}{v:,.2f}" for v in categories["invested"]],
+                "Current Value": [f"{currency}{v:,.2f}" for v in categories["value"]],
+                "Gain": [f"{currency}{v:,.2f}" for v in categories["gain"]],
+                "XIRR": [f"{v:.2%}" if pd.notna(v) else "—" for v in categories["xirr"]],
+            }),
+            use_container_width=True,
+            hide_index=True,
+        )
+        st.caption("Category returns cover only the holdings that have a current value.")
+
+
 def render_edit_form(investment):
     st.divider()
     st.subheader("✏️ Edit Investment")
@@ -53,37 +53,30 @@ def render_event_list():
         frequency = event.get("frequency", "monthly")
         is_active = event.get("is_active", True)
 
+        status = EventModel.describe_event(event, today)
         if frequency == "daily":
-            already_done = EventModel.has_been_executed_today(event_id, today)
             if not is_active:
                 badge, border_color = "⏸️ Paused", "#555"
-            elif already_done:
+            elif status["status"] == "skipped":
                 badge, border_color = "✅ Done today", "#2ecc71"
             else:
                 badge, border_color = "🔄 Due today", "#f39c12"
             schedule_label = "Every day"
         else:
             day = event["day_of_month"]
-            last_day = calendar.monthrange(today.year, today.month)[1]
-            effective_day = min(day, last_day)
-            due_date = date(today.year, today.month, effective_day)
-            already_done = EventModel.has_been_executed(event_id, today.year, today.month)
+            due_date = status["due_date"]
 
             if not is_active:
                 badge, border_color = "⏸️ Paused", "#555"
-            elif already_done:
+            elif status["status"] == "skipped":
                 badge, border_color = "✅ Done this month", "#2ecc71"
             elif today == due_date:
                 badge, border_color = "🔄 Executing today", "#f39c12"
-            elif today < due_date:
+            elif status["status"] == "pending":
                 badge, border_color = f"⏳ Due on {due_date.strftime('%d %b')} (this month)", "#3498db"
             else:
-                if today.month == 12:
-                    nd = date(today.year + 1, 1, min(day, 31))
-                else:
-                    nm_last = calendar.monthrange(today.year, today.month + 1)[1]
-                    nd = date(today.year, today.month + 1, min(day, nm_last))
-                badge, border_color = f"🔜 Next month ({nd.strftime('%d %b %Y')})", "#9b59b6"
+                nd = status["next_due"]
+                badge, border_color = f"🔜 Next month ({nd.strftime('%d %b %Y') if nd else '—'})", "#9b59b6"
             schedule_label = f"{day}{_ordinal(day)} of every month"
 
         with st.container():
@@ -148,10 +141,19 @@ def render_event_list():
 
                 if st.session_state.get(f"confirm_del_{event_id}"):
                     st.warning("Are you sure?")
+                    linked = EventModel.get_linked_entries(event_id)
+                    linked_count = len(linked["expense"]) + len(linked["investment"])
+                    delete_entries = False
+                    if linked_count:
+                        linked_total = sum(e["amount"] for e in linked["expense"] + linked["investment"])
+                        delete_entries = st.checkbox(
+                            f"Also delete the {linked_count} entries it posted ({format_currency(linked_total)})",
+                            key=f"del_entries_{event_id}",
+                        )
                     c1, c2 = st.columns(2)
                     with c1:
                         if st.button("Yes", key=f"yes_{event_id}"):
-                            EventModel.delete_event(event_id)
+                            EventModel.delete_event(event_id, delete_entries)
                             del st.session_state[f"confirm_del_{event_id}"]
                             st.rerun()
                     with c2:
@@ -339,10 +341,12 @@ def render_scheduler_panel():
     )
     st.divider()
 
-    results = EventModel.run_due_events()
-    if not results:
+    ran = {str(r["event"]["_id"]): r for r in EventModel.run_due_events()}
+    active_events = EventModel.get_active_events()
+    if not active_events:
         st.info("No active recurring payments found. Add one in the **Add Payment** tab.")
         return
+    results = [ran.get(str(ev["_id"])) or EventModel.describe_event(ev, today) for ev in active_events]
 
     counts = {"executed": 0, "skipped": 0, "pending": 0, "next_month": 0, "failed": 0}
     for r in results:
@@ -377,8 +381,9 @@ def render_scheduler_panel():
     st.divider()
     st.markdown("#### 🔁 Force Re-run Today")
     st.warning(
-        "⚠️ This will re-create expense entries for **all active payments** even if they "
-        "already ran today / this month. Use only to correct missing entries."
+        "⚠️ This will re-create entries for **all active payments** even if they "
+        "already ran today / this month, unless an identical entry still exists. "
+        "Use only to correct missing entries."
     )
     if st.button("🔁 Force Execute All Payments Now", type="primary"):
         force_results = EventModel.run_due_events(force=True)
@@ -6,15 +6,17 @@ from database.models import ExpenseModel
 from database.investment_model import InvestmentModel
 from database.category_model import CategoryModel
 from database.investment_category_model import InvestmentCategoryModel
-from database.connection import get_db
+from database.budget_model import BudgetModel
+from database.read_routing import analytics_reads
 from utils.helpers import get_current_month_range
 
 
 def render_settings():
     st.header("⚙️ Settings")
-    tab1, tab2, tab3, tab4 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5 = st.tabs([
         "📦 Expense Categories",
         "📈 Investment Categories",
+        "🎯 Budgets",
         "📥 Export Data",
         "🔄 Migrate Investments",
     ])
@@ -23,8 +25,10 @@ def render_settings():
     with tab2:
         render_investment_category_management()
     with tab3:
-        render_export_section()
+        render_budget_management()
     with tab4:
+        render_export_section()
+    with tab5:
         render_migration_section()
 
 
@@ -68,9 +72,7 @@ def render_category_management():
     st.divider()
     st.markdown("### 🗑️ Remove Category")
 
-    db = get_db()
-    custom_cats = db["categories"].find_one({"_id": "custom_categories"})
-    custom_categories = custom_cats.get("categories", []) if custom_cats else []
+    custom_categories = CategoryModel.get_custom_categories()
 
     if not custom_categories:
         st.info("ℹ️ No custom categories to remove. Default categories cannot be removed.")
@@ -130,9 +132,7 @@ def render_investment_category_management():
     st.divider()
     st.markdown("### 🗑️ Remove Investment Category")
 
-    db = get_db()
-    custom_doc = db["investment_categories"].find_one({"_id": "custom_investment_categories"})
-    custom_categories = custom_doc.get("categories", []) if custom_doc else []
+    custom_categories = InvestmentCategoryModel.get_custom_categories()
 
     if not custom_categories:
         st.info("ℹ️ No custom investment categories to remove. Default categories cannot be removed.")
@@ -152,6 +152,57 @@ def render_investment_category_management():
                     st.error("❌ Failed to remove category. Default categories cannot be removed.")
 
 
+def render_budget_management():
+    st.subheader("🎯 Monthly Budgets")
+    st.caption("Set a monthly limit per expense category. Leave blank or 0 for no budget.")
+
+    budgets = BudgetModel.get_budgets()
+    categories = sorted(set(CategoryModel.get_all_categories()) | set(budgets))
+    df = pd.DataFrame({
+        "category": categories,
+        "budget": [budgets.get(cat) for cat in categories],
+    })
+
+    with st.form("budget_form"):
+        edited = st.data_editor(
+            df,
+            column_config={
+                "category": st.column_config.TextColumn("Category", disabled=True),
+                "budget": st.column_config.NumberColumn(
+                    f"Monthly Budget ({config.CURRENCY_SYMBOL})", min_value=0.0, step=100.0, format="%.2f"
+                ),
+            },
+            hide_index=True,
+            use_container_width=True,
+            key="budget_editor",
+        )
+        submitted = st.form_submit_button("💾 Save Budgets", use_container_width=True)
+
+    if submitted:
+        ok = True
+        for row in edited.to_dict("records"):
+            category, amount = row["category"], row["budget"]
+            if pd.isna(amount) or amount <= 0:
+                if category in budgets:
+                    ok = BudgetModel.remove_budget(category) and ok
+            elif budgets.get(category) != float(amount):
+                ok = BudgetModel.set_budget(category, float(amount)) and ok
+        if ok:
+            st.success("✅ Budgets saved!")
+            st.rerun()
+        else:
+            st.error("❌ Failed to save some budgets. Please try again.")
+
+    st.divider()
+    st.markdown("### 🔁 Recalculate Spending Totals")
+    st.caption("Budget status reads running per-category month totals. Rebuild them from all expenses if they ever look off.")
+    if st.button("🔁 Recalculate", use_container_width=True):
+        if BudgetModel.rebuild_totals():
+            st.success("✅ Spending totals recalculated!")
+        else:
+            st.error("❌ Failed to recalculate spending totals.")
+
+
 def render_export_section():
     st.subheader("📥 Export Data")
 
@@ -179,7 +230,8 @@ def render_export_section():
         else:
             start_date, end_date = None, None
 
-        expenses = ExpenseModel.get_expenses(start_date, end_date)
+        with analytics_reads():
+            expenses = ExpenseModel.get_expenses(start_date, end_date)
 
         if not expenses:
             st.warning("No expenses found for the selected period.")
@@ -202,22 +254,6 @@ def render_export_section():
                 st.dataframe(df, use_container_width=True, hide_index=True)
 
 
-def _normalize_investment_category(raw: str) -> str:
-    mapping = {
-        "mutual fund": "Mutual Fund",
-        "fd": "Fixed Deposit",
-        "fixed deposit": "Fixed Deposit",
-        "fixed fd": "Fixed Deposit",
-        "sip": "SIP",
-        "stocks": "Stocks",
-        "ppf": "PPF",
-        "nps": "NPS",
-        "gold": "Gold",
-        "other investment": "Other Investment",
-    }
-    return mapping.get(raw.strip().lower(), raw.strip())
-
-
 def render_migration_section():
     st.subheader("🔄 Migrate Misclassified Investments")
     st.markdown(
@@ -258,20 +294,7 @@ def render_migration_section():
         confirm = st.button("🚀 Migrate All", type="primary", use_container_width=True)
 
     if confirm:
-        migrated, failed = 0, 0
-        for exp in candidates:
-            category = _normalize_investment_category(exp["category"])
-            ok = InvestmentModel.create_investment(
-                date=exp["date"],
-                category=category,
-                description=exp.get("description", ""),
-                amount=exp["amount"],
-            )
-            if ok:
-                ExpenseModel.delete_expense(str(exp["_id"]))
-                migrated += 1
-            else:
-                failed += 1
+        migrated, failed = InvestmentModel.migrate_from_expenses(candidates)
 
         if migrated:
             st.success(f"✅ Successfully migrated {migrated} expense(s) to Investments.")
@@ -1,7 +1,8 @@
 import streamlit as st
 import config
 from datetime import datetime
-from components.expense_form import render_expense_form
+from components.budgets import render_budget_status
+from components.expense_form import render_expense_form, render_bulk_expense_form
 from database.models import ExpenseModel
 from database.category_model import CategoryModel
 from utils.helpers import get_month_name, get_month_start_end
@@ -11,14 +12,30 @@ def render_transactions():
     st.header("💳 Transactions")
     st.divider()
     st.subheader("Add New Expense")
-    render_expense_form()
+    entry_mode = st.radio(
+        "Entry mode",
+        options=["single", "bulk"],
+        format_func=lambda x: "📝 Single entry" if x == "single" else "📋 Bulk entry",
+        horizontal=True,
+        key="expense_entry_mode",
+        label_visibility="collapsed",
+    )
+    if entry_mode == "bulk":
+        render_bulk_expense_form()
+    else:
+        render_expense_form()
 
     if st.session_state.get("expense_added"):
         amount = st.session_state.get("expense_added_amount", 0)
-        st.success(f"✅ Expense of {config.CURRENCY_SYMBOL}{amount:,.2f} added successfully!")
+        count = st.session_state.get("expense_added_count", 1)
+        if count > 1:
+            st.success(f"✅ {count} expenses totaling {config.CURRENCY_SYMBOL}{amount:,.2f} added successfully!")
+        else:
+            st.success(f"✅ Expense of {config.CURRENCY_SYMBOL}{amount:,.2f} added successfully!")
         st.balloons()
         st.session_state.expense_added = False
         st.session_state.expense_added_amount = 0
+        st.session_state.expense_added_count = 1
         st.rerun()
 
     st.divider()
@@ -75,6 +92,12 @@ def render_transactions():
 
     start_date, end_date = get_month_start_end(selected_year, selected_month)
     filter_label = f"{get_month_name(selected_month)} {selected_year}"
+    render_budget_status(
+        selected_year,
+        selected_month,
+        filter_label,
+        None if selected_category == "All Categories" else selected_category,
+    )
     render_expense_history(start_date, end_date, filter_label, selected_category)
 
 
@@ -3,10 +3,95 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# "mongodb" or "sqlite" (embedded, single-user installs)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongodb").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "budget_tracker.db")
+
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
 DATABASE_NAME = "budget_tracker"
 EXPENSES_COLLECTION = "expenses"
 INVESTMENTS_COLLECTION = "investments"
+CATEGORIES_COLLECTION = "categories"
+INVESTMENT_CATEGORIES_COLLECTION = "investment_categories"
+EVENTS_COLLECTION = "recurring_events"
+EXECUTIONS_COLLECTION = "event_executions"
+BUDGETS_COLLECTION = "budgets"
+HOLDING_VALUES_COLLECTION = "holding_values"
+CATEGORY_MONTH_TOTALS_COLLECTION = "category_month_totals"
+META_COLLECTION = "app_meta"
+LEDGERS_COLLECTION = "ledgers"
+USERS_COLLECTION = "users"
+
+# Every document belongs to one ledger (household); data written before
+# ledgers existed is assigned to this one
+DEFAULT_LEDGER_ID = os.getenv("DEFAULT_LEDGER_ID", "default")
+
+# Every ledger belongs to one user, the only one the app lets open it; the
+# default ledger belongs to this one. Without AUTH_ENABLED nobody signs in and
+# everyone is DEFAULT_USER_ID; turn it on for a shared deployment after
+# creating accounts with `python -m budget_tracker add-user NAME`.
+DEFAULT_USER_ID = os.getenv("DEFAULT_USER_ID", "admin")
+AUTH_ENABLED = os.getenv("AUTH_ENABLED", "false").lower() == "true"
+PASSWORD_HASH_ITERATIONS = 600_000
+
+# Closed years are moved out of the hot ledger collections into these so the
+# hot collections and their indexes only hold recent entries; reads that reach
+# back before the archive boundary query both tiers
+ARCHIVE_COLLECTIONS = {
+    EXPENSES_COLLECTION: "expenses_archive",
+    INVESTMENTS_COLLECTION: "investments_archive",
+}
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "true").lower() == "true"
+# Years kept hot, counting the current one
+ARCHIVE_HOT_YEARS = int(os.getenv("ARCHIVE_HOT_YEARS", "2"))
+
+# Parquet snapshots + DuckDB for multi-year dashboards (needs duckdb and pyarrow)
+ANALYTICS_ENGINE_ENABLED = os.getenv("ANALYTICS_ENGINE_ENABLED", "true").lower() == "true"
+ANALYTICS_DIR = os.getenv("ANALYTICS_DIR", "analytics_snapshots")
+ANALYTICS_REFRESH_SECONDS = int(os.getenv("ANALYTICS_REFRESH_SECONDS", "300"))
+# Refreshes only rewrite recently changed months; at most this often one also
+# compares every month with the database, which finds entries other processes
+# deleted or moved to another month
+ANALYTICS_RECONCILE_SECONDS = int(os.getenv("ANALYTICS_RECONCILE_SECONDS", "3600"))
+
+# Dashboard and export reads may go to a replica-set secondary at most this many
+# seconds behind (MongoDB's minimum is 90). For the same window after this
+# process writes a collection, its reads stay on the primary.
+ANALYTICS_READS_FROM_SECONDARIES = os.getenv("ANALYTICS_READS_FROM_SECONDARIES", "true").lower() == "true"
+ANALYTICS_MAX_STALENESS_SECONDS = max(90, int(os.getenv("ANALYTICS_MAX_STALENESS_SECONDS", "90")))
+
+# Worker processes of a full rebuild (one year per task); 0 uses every core
+REBUILD_WORKERS = int(os.getenv("REBUILD_WORKERS", "0"))
+
+# Cached reads expire after this many seconds; with the change-stream watcher
+# (MongoDB replica set only) other processes' writes invalidate them immediately
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "30"))
+CHANGE_STREAM_WATCHER = os.getenv("CHANGE_STREAM_WATCHER", "false").lower() == "true"
+WATCHED_COLLECTIONS = (
+    EXPENSES_COLLECTION,
+    INVESTMENTS_COLLECTION,
+    CATEGORIES_COLLECTION,
+    INVESTMENT_CATEGORIES_COLLECTION,
+    EVENTS_COLLECTION,
+    BUDGETS_COLLECTION,
+    HOLDING_VALUES_COLLECTION,
+    LEDGERS_COLLECTION,
+)
+
+# Cached reads kept as a fallback while the database is unavailable (least
+# recently used dropped first); invalidation and CACHE_TTL_SECONDS don't drop them
+STALE_CACHE_ENTRIES = int(os.getenv("STALE_CACHE_ENTRIES", "512"))
+
+# After this many consecutive connection errors, database calls fail at once
+# for CIRCUIT_RESET_SECONDS before one is tried again
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+CIRCUIT_RESET_SECONDS = int(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+# Entries created while the database is unavailable wait in this local file and
+# are saved every WRITE_QUEUE_REPLAY_SECONDS, WRITE_QUEUE_BATCH_SIZE at a time
+WRITE_QUEUE_PATH = os.getenv("WRITE_QUEUE_PATH", "pending_writes.db")
+WRITE_QUEUE_REPLAY_SECONDS = int(os.getenv("WRITE_QUEUE_REPLAY_SECONDS", "15"))
+WRITE_QUEUE_BATCH_SIZE = int(os.getenv("WRITE_QUEUE_BATCH_SIZE", "500"))
 
 CURRENCY_SYMBOL = "₹"
 
@@ -50,6 +135,41 @@ CHART_COLORS = {
     "Other": "#C7CEEA",
 }
 
+# An entry form submitted again with the same entry within this many seconds
+# (a double click) doesn't create it twice
+RESUBMIT_WINDOW_SECONDS = int(os.getenv("RESUBMIT_WINDOW_SECONDS", "10"))
+
+# Budget utilization at or above this fraction is flagged as a warning
+BUDGET_WARNING_THRESHOLD = 0.8
+
+# Days of history used for the forecast's daily run rate
+FORECAST_LOOKBACK_DAYS = 90
+
+# Daily trend charts longer than this many points are downsampled (LTTB)
+TREND_MAX_POINTS = 1000
+
+# Spending anomalies: a category-day is compared with the category's spend over
+# the previous ANOMALY_BASELINE_DAYS, an expense with the previous
+# ANOMALY_TRANSACTION_WINDOW expenses in its category
+ANOMALY_BASELINE_DAYS = 90
+ANOMALY_TRANSACTION_WINDOW = 30
+ANOMALY_MIN_HISTORY = 5
+ANOMALY_Z_THRESHOLD = 3.0
+
+# Blank rows shown in the bulk-entry grid (more can be added in the grid)
+BULK_ENTRY_ROWS = 10
+
+# Headless JSON API (api.py); binds to localhost unless told otherwise. With
+# API_TOKEN set, requests must send "Authorization: Bearer <token>". The token
+# opens every ledger, so it belongs to the operator, not to a user.
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8502"))
+API_TOKEN = os.getenv("API_TOKEN") or None
+API_MAX_BATCH = int(os.getenv("API_MAX_BATCH", "10000"))
+# Larger request bodies are refused before being read
+API_MAX_BODY_BYTES = int(os.getenv("API_MAX_BODY_BYTES", str(8 * 1024 * 1024)))
+API_MAX_PAGE_SIZE = 1000
+
 PAGE_TITLE = "Expense Tracker"
 PAGE_ICON = "📊"
 LAYOUT = "wide"
@@ -0,0 +1,290 @@
+"""
+Columnar analytics engine: Parquet snapshots of the ledgers queried with DuckDB
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import config
+from database.cache import add_invalidation_listener
+from database.ledger import current_ledger
+from database.tiers import LedgerTiers
+
+
+# An incremental refresh looks this far back before the previous one: entries
+# stamped just before it may have been committed, or reached the secondary the
+# refresh read from, only after it
+_SYNC_OVERLAP = timedelta(seconds=config.ANALYTICS_MAX_STALENESS_SECONDS)
+
+
+def spans_months(start_date: datetime, end_date: datetime) -> bool:
+    """Whether a range is worth the engine; one month's aggregate is a cheap
+    indexed query on the database"""
+    return (start_date.year, start_date.month) != (end_date.year, end_date.month)
+
+
+class AnalyticsEngine:
+    """Keeps one Parquet file per (ledger, collection, year, month) under
+    ANALYTICS_DIR and answers multi-year aggregate queries in-process.
+
+    A manifest stores (count, total, last updated_at) per month. A refresh
+    rewrites the months this process wrote to and the months of entries
+    updated since the last refresh (one indexed query). Deletes and moves made
+    by other processes are only found by comparing every month's stats with
+    the database, which is done at most every ANALYTICS_RECONCILE_SECONDS.
+    Every method works on the current ledger's snapshot.
+    """
+
+    def __init__(self, root: str):
+        import duckdb
+        self._root = root
+        self._duck = duckdb.connect(":memory:")
+        self._lock = threading.Lock()
+        # Bumped on invalidation; a ledger's snapshot is stale until it has
+        # been refreshed at the collection's current generation
+        self._generation: Dict[str, int] = {}
+        self._refreshed: Dict[Tuple[str, str], Tuple[float, int]] = {}
+        # Months written by this process since the last refresh, per (ledger, collection)
+        self._dirty: Dict[Tuple[str, str], Set[Tuple[int, int]]] = {}
+        self._dirty_lock = threading.Lock()
+        add_invalidation_listener(self.mark_stale)
+
+    # ── Snapshots ─────────────────────────────────────────────────────────────
+
+    def _collection_dir(self, collection: str) -> str:
+        return os.path.join(self._root, current_ledger(), collection)
+
+    def _partition_dir(self, collection: str, year: int, month: int) -> str:
+        return os.path.join(self._collection_dir(collection), f"year={year}", f"month={month}")
+
+    def _manifest_path(self, collection: str) -> str:
+        return os.path.join(self._collection_dir(collection), "_manifest.json")
+
+    def _load_manifest(self, collection: str) -> Dict:
+        """{"months": {"YYYY-MM": stats}, "synced_at": ..., "reconciled_at": ...};
+        a missing or unreadable manifest has no months and was never reconciled"""
+        try:
+            with open(self._manifest_path(collection)) as fh:
+                manifest = json.load(fh)
+        except (OSError, ValueError):
+            manifest = {}
+        if not isinstance(manifest.get("months"), dict):
+            return {"months": {}}
+        return manifest
+
+    def _save_manifest(self, collection: str, manifest: Dict) -> None:
+        path = self._manifest_path(collection)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(manifest, fh)
+        os.replace(tmp, path)
+
+    def _write_partition(self, collection: str, year: int, month: int) -> Optional[list]:
+        """Write one month's file again; returns its manifest stats, None
+        (and no file) if the month has no entries"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        from utils.helpers import get_month_start_end
+
+        start_date, end_date = get_month_start_end(year, month)
+        entries = LedgerTiers.find_entries(collection, start_date, end_date)
+        part_dir = self._partition_dir(collection, year, month)
+        if not entries:
+            shutil.rmtree(part_dir, ignore_errors=True)
+            return None
+        table = pa.table({
+            "id": pa.array([str(e["_id"]) for e in entries], pa.string()),
+            "date": pa.array([e["date"] for e in entries], pa.timestamp("us")),
+            "category": pa.array([e["category"] for e in entries], pa.string()),
+            "description": pa.array([e.get("description") or "" for e in entries], pa.string()),
+            "amount": pa.array([float(e["amount"]) for e in entries], pa.float64()),
+        })
+        os.makedirs(part_dir, exist_ok=True)
+        tmp = os.path.join(part_dir, "data.parquet.tmp")
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, os.path.join(part_dir, "data.parquet"))
+        last = max(filter(None, (e.get("updated_at") for e in entries)), default=None)
+        return [len(entries), round(sum(float(e["amount"]) for e in entries), 2), last.isoformat() if last else None]
+
+    def _rewrite_months(self, collection: str, months: Dict[str, list], year_months: Iterable[Tuple[int, int]]) -> int:
+        rewritten = 0
+        for year, month in sorted(set(year_months)):
+            stats = self._write_partition(collection, year, month)
+            ym = f"{year}-{month:02d}"
+            if stats:
+                months[ym] = stats
+            else:
+                months.pop(ym, None)
+            rewritten += 1
+        return rewritten
+
+    def mark_stale(self, collection: str, months: Optional[Iterable[Tuple[int, int]]] = None) -> None:
+        """Force the next query on `collection` to refresh its snapshot first,
+        rewriting `months` of the current ledger"""
+        if collection in (config.EXPENSES_COLLECTION, config.INVESTMENTS_COLLECTION):
+            if months:
+                with self._dirty_lock:
+                    self._dirty.setdefault((current_ledger(), collection), set()).update(months)
+            self._generation[collection] = self._generation.get(collection, 0) + 1
+
+    def refresh(self, collection: str, force: bool = False) -> int:
+        """Bring the snapshot of `collection` up to date; returns months
+        rewritten. `force` compares every month with the database."""
+        with self._lock:
+            key = (current_ledger(), collection)
+            generation = self._generation.get(collection, 0)
+            refreshed_at, refreshed_generation = self._refreshed.get(key, (float("-inf"), -1))
+            age = time.monotonic() - refreshed_at
+            if not force and refreshed_generation == generation and age < config.ANALYTICS_REFRESH_SECONDS:
+                return 0
+
+            os.makedirs(self._collection_dir(collection), exist_ok=True)
+            manifest = self._load_manifest(collection)
+            with self._dirty_lock:
+                dirty = self._dirty.pop(key, set())
+            started = datetime.now()
+            try:
+                reconciled_at = manifest.get("reconciled_at")
+                if (
+                    force
+                    or reconciled_at is None
+                    or (started - datetime.fromisoformat(reconciled_at)).total_seconds()
+                    >= config.ANALYTICS_RECONCILE_SECONDS
+                ):
+                    current = self._current_stats(collection)
+                    changed = {ym for ym, stats in current.items() if manifest["months"].get(ym) != stats}
+                    changed |= set(manifest["months"]) - set(current)
+                    dirty |= {(int(ym[:4]), int(ym[5:7])) for ym in changed}
+                    manifest["reconciled_at"] = started.isoformat()
+                else:
+                    since = datetime.fromisoformat(manifest["synced_at"]) - _SYNC_OVERLAP
+                    dirty.update(LedgerTiers.changed_months(collection, since))
+                rewritten = self._rewrite_months(collection, manifest["months"], dirty)
+            except Exception:
+                # Try these months again on the next refresh
+                self.mark_stale(collection, dirty)
+                raise
+
+            manifest["synced_at"] = started.isoformat()
+            self._save_manifest(collection, manifest)
+            self._refreshed[key] = (time.monotonic(), generation)
+            return rewritten
+
+    @staticmethod
+    def _current_stats(collection: str) -> Dict[str, list]:
+        return {
+            f"{year}-{month:02d}": [count, round(total, 2), last.isoformat() if last else None]
+            for (year, month), (count, total, last) in LedgerTiers.partition_stats(collection).items()
+        }
+
+    # A rebuild is clear(), write_months() for every year (possibly in worker
+    # processes, see database/rebuild.py), then publish()
+
+    def clear(self, collection: str) -> Dict[str, list]:
+        """Discard the current ledger's snapshot of `collection`; returns the
+        stats of the months to write back, keyed "YYYY-MM" """
+        with self._lock:
+            shutil.rmtree(self._collection_dir(collection), ignore_errors=True)
+            os.makedirs(self._collection_dir(collection), exist_ok=True)
+            # Entries updated from now on are caught by the next refresh
+            now = datetime.now().isoformat()
+            self._save_manifest(collection, {"months": {}, "synced_at": now, "reconciled_at": now})
+            return self._current_stats(collection)
+
+    def write_months(self, collection: str, year: int, months: List[int]) -> None:
+        for month in months:
+            self._write_partition(collection, year, month)
+
+    def publish(self, collection: str, stats: Dict[str, list]) -> None:
+        """Save the manifest of a cleared snapshot once its months are written"""
+        with self._lock:
+            manifest = self._load_manifest(collection)
+            manifest["months"] = stats
+            self._save_manifest(collection, manifest)
+            self._refreshed[(current_ledger(), collection)] = (time.monotonic(), self._generation.get(collection, 0))
+
+    def rebuild(self, collection: str) -> int:
+        """Write the current ledger's snapshot of `collection` again from the
+        database; returns months written"""
+        stats = self.clear(collection)
+        for ym in stats:
+            self._write_partition(collection, int(ym[:4]), int(ym[5:7]))
+        self.publish(collection, stats)
+        return len(stats)
+
+    def _scan(self, collection: str) -> Optional[str]:
+        """read_parquet() source for the collection, or None if it has no data"""
+        self.refresh(collection)
+        if not self._load_manifest(collection)["months"]:
+            return None
+        pattern = os.path.join(self._collection_dir(collection), "*", "*", "*.parquet").replace("'", "''")
+        return f"read_parquet('{pattern}', hive_partitioning = true)"
+
+    # ── Queries ───────────────────────────────────────────────────────────────
+
+    def monthly_totals(self, collection: str, start_year: int, end_year: int) -> Dict[Tuple[int, int], float]:
+        """Sum per (year, month) for the inclusive year range"""
+        source = self._scan(collection)
+        if source is None:
+            return {}
+        rows = self._duck.cursor().execute(
+            f"SELECT year, month, SUM(amount) FROM {source} "
+            "WHERE year BETWEEN ? AND ? GROUP BY year, month",
+            [start_year, end_year],
+        ).fetchall()
+        return {(int(y), int(m)): float(total) for y, m, total in rows}
+
+    def category_totals(self, collection: str, start_date: datetime, end_date: datetime) -> Dict[str, float]:
+        """Sum per category for the date range"""
+        source = self._scan(collection)
+        if source is None:
+            return {}
+        rows = self._duck.cursor().execute(
+            f"SELECT category, SUM(amount) FROM {source} "
+            "WHERE year BETWEEN ? AND ? AND date BETWEEN ? AND ? GROUP BY category",
+            [start_date.year, end_date.year, start_date, end_date],
+        ).fetchall()
+        return {category: float(total) for category, total in rows}
+
+    def yearly_category_totals(self, collection: str, start_year: int, end_year: int) -> Dict[Tuple[int, str], float]:
+        """Sum per (year, category) for the inclusive year range"""
+        source = self._scan(collection)
+        if source is None:
+            return {}
+        rows = self._duck.cursor().execute(
+            f"SELECT year, category, SUM(amount) FROM {source} "
+            "WHERE year BETWEEN ? AND ? GROUP BY year, category",
+            [start_year, end_year],
+        ).fetchall()
+        return {(int(y), category): float(total) for y, category, total in rows}
+
+
+_engine: Optional[AnalyticsEngine] = None
+_engine_checked = False
+
+
+def get_analytics_engine() -> Optional[AnalyticsEngine]:
+    """Process-wide engine, or None when disabled or duckdb/pyarrow are missing"""
+    global _engine, _engine_checked
+    if not _engine_checked:
+        _engine_checked = True
+        if config.ANALYTICS_ENGINE_ENABLED:
+            try:
+                import pyarrow  # noqa: F401
+                _engine = AnalyticsEngine(config.ANALYTICS_DIR)
+            except ImportError as e:
+                print(f"Analytics engine disabled: {e}")
+    return _engine
+
+
+def _forget_engine() -> None:
+    # Its DuckDB connection and lock belong to the parent; a forked child opens its own
+    global _engine, _engine_checked
+    _engine, _engine_checked = None, False
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_engine)
@@ -0,0 +1,409 @@
+"""
+Storage backend interface shared by the MongoDB and SQLite implementations
+"""
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from typing import Dict, List, Optional, Set, Tuple
+import config
+
+
+class DatabaseUnavailable(Exception):
+    """The database didn't answer, or recently failed so often that it isn't tried"""
+
+
+class StorageBackend(ABC):
+    """Persistence operations used by the model classes.
+
+    Ledger entries (expenses and investments) share one shape and are
+    addressed by collection name, so both ledgers go through the same methods.
+    Every method is scoped to `database.ledger.current_ledger()`: inserts are
+    stamped with its ledger_id and reads, updates and deletes only touch it.
+    """
+
+    # Errors meaning the database couldn't be reached, as opposed to the
+    # database rejecting an operation; they trip the circuit breaker
+    connection_errors: Tuple[type, ...] = ()
+
+    # ── Ledger entries ────────────────────────────────────────────────────────
+
+    @abstractmethod
+    def insert_entry(self, collection: str, doc: Dict) -> Optional[str]:
+        """Insert one entry and return its id; None without inserting if
+        the doc's idempotency_key is already used"""
+
+    @abstractmethod
+    def insert_entries(self, collection: str, docs: List[Dict]) -> List[Optional[str]]:
+        """Insert a batch of entries in one round trip and return their ids in
+        order; a doc whose idempotency_key is already used (also by an earlier
+        doc of the batch) isn't inserted and gets None"""
+
+    @abstractmethod
+    def find_entries(
+        self,
+        collection: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category: Optional[str] = None,
+        limit: Optional[int] = None,
+        before: Optional[Tuple[datetime, str]] = None,
+    ) -> List[Dict]:
+        """Entries in the date range, newest first and by id within a date;
+        only the first `limit` if given, and only those after `before`, the
+        (date, id) of the last entry of the previous page"""
+
+    @abstractmethod
+    def find_entries_by_categories(self, collection: str, categories: List[str]) -> List[Dict]:
+        """Entries whose category matches any of `categories`, ignoring case"""
+
+    @abstractmethod
+    def find_entries_by_event(self, collection: str, event_id: str) -> List[Dict]:
+        """Entries posted by one recurring event, newest first"""
+
+    @abstractmethod
+    def fingerprint_counts(self, collection: str, fingerprints: List[str]) -> Dict[str, int]:
+        """How many entries carry each of `fingerprints`; absent ones are omitted"""
+
+    @abstractmethod
+    def used_idempotency_keys(self, collection: str, keys: List[str]) -> Set[str]:
+        """Which of `keys` entries of this ledger already carry"""
+
+    @abstractmethod
+    def refresh_fingerprints(self, collection: str, start_date: datetime, end_date: datetime) -> int:
+        """Recompute the fingerprint of every entry dated in [start_date, end_date);
+        returns how many changed"""
+
+    @abstractmethod
+    def update_entry(self, collection: str, entry_id: str, fields: Dict) -> bool:
+        """Set `fields` on one entry; True if it was modified"""
+
+    @abstractmethod
+    def delete_entry(self, collection: str, entry_id: str) -> bool:
+        """Delete one entry; True if it existed"""
+
+    @abstractmethod
+    def find_and_update_entry(self, collection: str, entry_id: str, fields: Dict) -> Optional[Dict]:
+        """Atomically set `fields` on one entry and return it as it was before"""
+
+    @abstractmethod
+    def find_and_delete_entry(self, collection: str, entry_id: str) -> Optional[Dict]:
+        """Atomically delete one entry and return it"""
+
+    @abstractmethod
+    def move_entries(self, source: str, target: str, before: datetime) -> int:
+        """Move the entries dated before `before` into another collection, keeping their ids;
+        returns how many moved. An entry whose idempotency_key the target already
+        holds is the same entry stored twice: it is dropped instead of copied."""
+
+    @abstractmethod
+    def move_entry(self, source: str, target: str, entry_id: str) -> bool:
+        """Move one entry into another collection, keeping its id; True if it existed"""
+
+    @abstractmethod
+    def total_amount(self, collection: str, start_date: datetime, end_date: datetime) -> float:
+        """Sum of amounts in the date range"""
+
+    @abstractmethod
+    def category_totals(self, collection: str, start_date: datetime, end_date: datetime) -> Dict[str, float]:
+        """Sum of amounts per category in the date range"""
+
+    @abstractmethod
+    def daily_totals(self, collection: str, start_date: datetime, end_date: datetime) -> List[Tuple[date, float]]:
+        """(day, total) pairs in the date range, oldest first"""
+
+    @abstractmethod
+    def period_totals(
+        self, collection: str, start_date: datetime, end_date: datetime, unit: str
+    ) -> List[Tuple[datetime, float]]:
+        """(period start, total) per "day", "week" (from Monday), "month" or "quarter"
+        in the date range, oldest first; periods without entries are omitted"""
+
+    @abstractmethod
+    def category_period_totals(
+        self, collection: str, start_date: datetime, end_date: datetime, unit: str
+    ) -> List[Tuple[datetime, str, float]]:
+        """(period start, category, total) for every non-empty cell of the
+        category x period grid, periods as in period_totals"""
+
+    @abstractmethod
+    def running_totals(self, sources: Dict[str, List[str]]) -> List[Tuple[date, str, str, float, float, float]]:
+        """Full-history running totals across collections in one query.
+
+        `sources` maps a label to the collections holding its entries. Returns
+        (day, label, category, day's amount, label and category running total,
+        label running total) for every day with entries, oldest first.
+        """
+
+    @abstractmethod
+    def monthly_totals(self, collection: str, year: int) -> Dict[int, float]:
+        """Sum of amounts per month of `year`; months without entries are omitted"""
+
+    @abstractmethod
+    def entry_year_months(self, collection: str) -> List[Tuple[int, int]]:
+        """Distinct (year, month) pairs that have entries"""
+
+    @abstractmethod
+    def partition_stats(self, collection: str) -> Dict[Tuple[int, int], Tuple[int, float, Optional[datetime]]]:
+        """(count, total, last updated_at) per (year, month), used to detect changed months"""
+
+    @abstractmethod
+    def changed_months(self, collection: str, since: datetime) -> List[Tuple[int, int]]:
+        """Distinct (year, month) of the entries updated at or after `since`"""
+
+    # ── Custom categories ─────────────────────────────────────────────────────
+
+    @abstractmethod
+    def get_custom_categories(self, kind: str) -> List[str]:
+        """Custom category names stored for `kind` (expense or investment)"""
+
+    @abstractmethod
+    def add_custom_category(self, kind: str, name: str) -> None:
+        """Add a custom category; no-op if it already exists"""
+
+    @abstractmethod
+    def remove_custom_category(self, kind: str, name: str) -> bool:
+        """Remove a custom category; True if it existed"""
+
+    # ── Budgets and per-category month totals ───────────────────────────────
+
+    @abstractmethod
+    def get_budgets(self) -> Dict[str, float]:
+        """Monthly budget per expense category"""
+
+    @abstractmethod
+    def set_budget(self, category: str, amount: float) -> None:
+        """Create or change the monthly budget of a category"""
+
+    @abstractmethod
+    def remove_budget(self, category: str) -> bool:
+        """Remove a category's budget; True if it existed"""
+
+    @abstractmethod
+    def increment_category_month(self, year: int, month: int, category: str, delta: float) -> None:
+        """Atomically add `delta` to the running total of (year, month, category)"""
+
+    @abstractmethod
+    def get_category_month_totals(self, year: int, month: int) -> Dict[str, float]:
+        """Running totals per category for one month"""
+
+    @abstractmethod
+    def rebuild_category_month_totals(self, collections: List[str], year: Optional[int] = None) -> None:
+        """Recompute the running totals from the entries in `collections` (hot
+        and archive tiers); only `year`'s if given"""
+
+    # ── Holding values ────────────────────────────────────────────────────────
+
+    @abstractmethod
+    def get_holding_values(self) -> List[Dict]:
+        """Entered current values ({category, description, value, as_of}) of investment holdings"""
+
+    @abstractmethod
+    def set_holding_value(self, category: str, description: str, value: float, as_of: datetime) -> None:
+        """Create or change the current value of the holding (category, description)"""
+
+    @abstractmethod
+    def remove_holding_value(self, category: str, description: str) -> bool:
+        """Remove a holding's current value; True if it existed"""
+
+    # ── Ledgers ───────────────────────────────────────────────────────────────
+
+    @abstractmethod
+    def find_ledgers(self, user_id: Optional[str] = None) -> List[Dict]:
+        """Registered ledgers ({_id, name, user_id, created_at}) ordered by
+        name; only those `user_id` owns if given"""
+
+    @abstractmethod
+    def insert_ledger(self, ledger_id: str, name: str, user_id: str) -> bool:
+        """Register a ledger owned by `user_id`; False if the id is taken"""
+
+    @abstractmethod
+    def set_ledger_owner(self, ledger_id: str, user_id: str) -> bool:
+        """Hand a ledger to another user; True if it exists"""
+
+    # ── Users ─────────────────────────────────────────────────────────────────
+
+    @abstractmethod
+    def find_user(self, user_id: str) -> Optional[Dict]:
+        """The user ({_id, password_hash, created_at}), or None"""
+
+    @abstractmethod
+    def insert_user(self, user_id: str, password_hash: str) -> bool:
+        """Create a user; False if the name is taken"""
+
+    # ── Schema and metadata (global, not ledger-scoped) ──────────────────────
+
+    @abstractmethod
+    def ensure_schema(self) -> None:
+        """Create missing tables and indexes and backfill older data (ledger
+        ids, fingerprints); runs on startup and is safe to repeat"""
+
+    @abstractmethod
+    def get_meta(self, key: str):
+        """Stored value for `key`, or None"""
+
+    @abstractmethod
+    def set_meta(self, key: str, value) -> None:
+        """Store a JSON-serialisable value under `key`"""
+
+    # ── Recurring events ──────────────────────────────────────────────────────
+
+    @abstractmethod
+    def insert_event(self, doc: Dict) -> str:
+        """Insert one recurring event and return its id"""
+
+    @abstractmethod
+    def find_events(self, active_only: bool = False) -> List[Dict]:
+        """Events ordered by day of month"""
+
+    @abstractmethod
+    def find_due_events(self, now: datetime) -> List[Dict]:
+        """Active events whose next_due_at is at or before `now`"""
+
+    @abstractmethod
+    def find_events_without_next_due(self) -> List[Dict]:
+        """Events created before next_due_at was tracked"""
+
+    @abstractmethod
+    def get_event(self, event_id: str) -> Optional[Dict]:
+        """One event by id"""
+
+    @abstractmethod
+    def update_event(self, event_id: str, fields: Dict) -> bool:
+        """Set `fields` on one event; True if it was modified"""
+
+    @abstractmethod
+    def delete_event(self, event_id: str) -> bool:
+        """Delete one event; True if it existed"""
+
+    @abstractmethod
+    def advance_event(self, event_id: str, expected_next_due: Optional[datetime], fields: Dict) -> bool:
+        """Set `fields` only if next_due_at still equals `expected_next_due`; True if it did"""
+
+    # ── Event executions ──────────────────────────────────────────────────────
+
+    @abstractmethod
+    def find_execution(self, key: str) -> Optional[Dict]:
+        """Execution record by its period key"""
+
+    @abstractmethod
+    def insert_entry_with_execution(self, collection: str, doc: Dict, key: str, execution: Dict) -> Optional[str]:
+        """Insert a ledger entry together with the execution record `key`, which
+        stores the entry's id. Returns the entry id, or None (and writes
+        nothing) if an execution record with that key already exists."""
+
+    @abstractmethod
+    def find_executions(self, event_id: str) -> List[Dict]:
+        """Execution records of one event, newest first"""
+
+    @abstractmethod
+    def delete_executions(self, event_id: str) -> None:
+        """Delete every execution record of one event"""
+
+
+class CircuitBreaker:
+    """Stops calling a database that keeps failing.
+
+    After CIRCUIT_FAILURE_THRESHOLD consecutive connection errors the circuit
+    opens and calls fail at once with DatabaseUnavailable, instead of each
+    waiting out the server selection timeout. After CIRCUIT_RESET_SECONDS one
+    trial call goes through: success closes the circuit, failure reopens it.
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self._threshold = threshold
+        self._reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_lock)
+
+    def _reset_lock(self) -> None:
+        # Another thread may have held the lock when the process forked
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if self._trial or time.monotonic() - self._opened_at < self._reset_seconds:
+                raise DatabaseUnavailable("Database unavailable, not retrying yet")
+            self._trial = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial = False
+            if self._opened_at is not None or self._failures >= self._threshold:
+                self._opened_at = time.monotonic()
+
+
+class _GuardedBackend:
+    """Passes every call of a backend through its circuit breaker; connection
+    errors come out as DatabaseUnavailable"""
+
+    def __init__(self, backend: StorageBackend, breaker: CircuitBreaker):
+        self._backend = backend
+        self._breaker = breaker
+
+    def __getattr__(self, name):
+        attr = getattr(self._backend, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            self._breaker.before_call()
+            try:
+                result = attr(*args, **kwargs)
+            except self._backend.connection_errors as e:
+                self._breaker.record_failure()
+                raise DatabaseUnavailable(str(e)) from e
+            except Exception:
+                # The database answered, even if only to reject the call
+                self._breaker.record_success()
+                raise
+            self._breaker.record_success()
+            return result
+        return call
+
+
+_backend: Optional[StorageBackend] = None
+_breaker: Optional[CircuitBreaker] = None
+
+
+def get_backend() -> StorageBackend:
+    """Return the process-wide backend selected by config.STORAGE_BACKEND,
+    behind a circuit breaker if it is a database server"""
+    global _backend, _breaker
+    if _backend is None:
+        if config.STORAGE_BACKEND == "sqlite":
+            from database.sqlite_backend import SQLiteBackend
+            backend = SQLiteBackend(config.SQLITE_PATH)
+        elif config.STORAGE_BACKEND == "mongodb":
+            from database.mongo_backend import MongoBackend
+            backend = MongoBackend()
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND: {config.STORAGE_BACKEND!r}")
+        if backend.connection_errors:
+            _breaker = CircuitBreaker(config.CIRCUIT_FAILURE_THRESHOLD, config.CIRCUIT_RESET_SECONDS)
+            backend = _GuardedBackend(backend, _breaker)
+        _backend = backend
+    return _backend
+
+
+def database_available() -> bool:
+    """False while the circuit breaker is open"""
+    return _breaker is None or not _breaker.is_open
@@ -0,0 +1,140 @@
+"""
+Monthly budgets per expense category, evaluated from running month totals
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+from database.backend import get_backend
+from database.cache import cached, invalidate
+from database.ledger import current_ledger
+import config
+
+
+# Meta key set once a ledger's running totals have been built from its existing expenses
+_TOTALS_BUILT_KEY = "category_month_totals_built"
+
+
+def _totals_built_key() -> str:
+    return f"{_TOTALS_BUILT_KEY}:{current_ledger()}"
+
+
+class BudgetModel:
+    """Budgets are compared against per-(year, month, category) totals that
+    ExpenseModel keeps current on every write, so a status check is one
+    indexed read of the month's totals rather than a scan of its expenses."""
+
+    _totals_built = set()
+
+    @staticmethod
+    @cached(config.BUDGETS_COLLECTION)
+    def get_budgets() -> Dict[str, float]:
+        """Get the monthly budget of every category that has one"""
+        return get_backend().get_budgets()
+
+    @staticmethod
+    def set_budget(category: str, amount: float) -> bool:
+        """Create or change a category's monthly budget"""
+        try:
+            get_backend().set_budget(category, float(amount))
+            invalidate(config.BUDGETS_COLLECTION)
+            return True
+        except Exception as e:
+            print(f"Error setting budget: {e}")
+            return False
+
+    @staticmethod
+    def remove_budget(category: str) -> bool:
+        """Remove a category's monthly budget"""
+        try:
+            removed = get_backend().remove_budget(category)
+            invalidate(config.BUDGETS_COLLECTION)
+            return removed
+        except Exception as e:
+            print(f"Error removing budget: {e}")
+            return False
+
+    @staticmethod
+    def record_change(date: datetime, category: str, delta: float) -> None:
+        """Add `delta` to the running total of the expense's month and category.
+
+        The expense itself is already saved, so a failure here only flags the
+        totals for a rebuild instead of failing the write. It isn't atomic with
+        that write: a crash in between leaves the month's totals off until the
+        next rebuild (Recalculate in Settings, or `rebuild-rollups`).
+        """
+        if not delta:
+            return
+        try:
+            get_backend().increment_category_month(date.year, date.month, category, delta)
+        except Exception as e:
+            print(f"Error updating budget totals, scheduling rebuild: {e}")
+            BudgetModel._totals_built.discard(current_ledger())
+            try:
+                get_backend().set_meta(_totals_built_key(), None)
+            except Exception:
+                pass
+
+    @staticmethod
+    def rebuild_totals(year: Optional[int] = None) -> bool:
+        """Recompute the current ledger's running totals from its expenses,
+        archived ones included. With `year`, only that year's are recomputed
+        (the parallel rebuild does one year per worker) and the ledger isn't
+        marked as built."""
+        try:
+            backend = get_backend()
+            backend.rebuild_category_month_totals([
+                config.EXPENSES_COLLECTION,
+                config.ARCHIVE_COLLECTIONS[config.EXPENSES_COLLECTION],
+            ], year)
+            if year is None:
+                BudgetModel.mark_totals_built()
+            return True
+        except Exception as e:
+            print(f"Error rebuilding budget totals: {e}")
+            return False
+
+    @staticmethod
+    def mark_totals_built() -> None:
+        get_backend().set_meta(_totals_built_key(), datetime.now().isoformat())
+        BudgetModel._totals_built.add(current_ledger())
+
+    @staticmethod
+    def _ensure_totals() -> None:
+        # Expenses written before budgets existed have no running totals yet
+        if current_ledger() not in BudgetModel._totals_built:
+            if get_backend().get_meta(_totals_built_key()):
+                BudgetModel._totals_built.add(current_ledger())
+            else:
+                BudgetModel.rebuild_totals()
+
+    @staticmethod
+    @cached(config.EXPENSES_COLLECTION)
+    def _month_totals(year: int, month: int) -> Dict[str, float]:
+        return get_backend().get_category_month_totals(year, month)
+
+    @staticmethod
+    def get_budget_status(year: int, month: int) -> List[Dict]:
+        """Spent, remaining and utilization of each budget for a month, most used first"""
+        try:
+            budgets = BudgetModel.get_budgets()
+            if not budgets:
+                return []
+            BudgetModel._ensure_totals()
+            spent = BudgetModel._month_totals(year, month)
+        except Exception as e:
+            print(f"Error getting budget status: {e}")
+            return []
+
+        status = []
+        for category, budget in budgets.items():
+            amount = round(spent.get(category, 0.0), 2)
+            utilization = amount / budget if budget > 0 else 0.0
+            status.append({
+                "category": category,
+                "budget": budget,
+                "spent": amount,
+                "remaining": budget - amount,
+                "utilization": utilization,
+                "over_budget": amount > budget,
+                "warning": amount <= budget and utilization >= config.BUDGET_WARNING_THRESHOLD,
+            })
+        return sorted(status, key=lambda s: s["utilization"], reverse=True)
@@ -0,0 +1,151 @@
+"""
+In-process read cache with per-collection invalidation
+"""
+import contextlib
+import contextvars
+import copy
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import config
+from database.backend import DatabaseUnavailable
+from database.ledger import current_ledger
+
+
+_lock = threading.Lock()
+_entries: Dict[Tuple, Tuple[float, object]] = {}
+_keys_by_collection: Dict[str, set] = {}
+_listeners: List[Callable[[str, Optional[Iterable[Tuple[int, int]]]], None]] = []
+
+# Last value each key read from the database, served while it is unavailable
+_last_good: "OrderedDict[Tuple, object]" = OrderedDict()
+_served_stale: contextvars.ContextVar[bool] = contextvars.ContextVar("served_stale", default=False)
+
+# Reads made inside the current rerun_scope(): key -> (collections, value)
+_run_memo: contextvars.ContextVar[Optional[Dict[Tuple, Tuple[Tuple[str, ...], object]]]] = contextvars.ContextVar(
+    "run_memo", default=None
+)
+
+
+def _reset_lock() -> None:
+    # Another thread may have held the lock when the process forked
+    global _lock
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_lock)
+
+
+def add_invalidation_listener(listener: Callable[[str, Optional[Iterable[Tuple[int, int]]]], None]) -> None:
+    """Call `listener(collection, months)` whenever a collection is invalidated"""
+    with _lock:
+        if listener not in _listeners:
+            _listeners.append(listener)
+
+
+def invalidate(collection: str, months: Optional[Iterable[Tuple[int, int]]] = None) -> None:
+    """Drop cached reads of `collection` and notify listeners (rollups, snapshots).
+
+    Called by the models after their own writes, with the (year, month) pairs
+    of the current ledger the write touched, and by the change-stream watcher
+    for writes made by other processes, whose months aren't known.
+    """
+    with _lock:
+        for key in _keys_by_collection.pop(collection, set()):
+            _entries.pop(key, None)
+        listeners = list(_listeners)
+    memo = _run_memo.get()
+    if memo:
+        for key in [k for k, (collections, _) in memo.items() if collection in collections]:
+            del memo[key]
+    for listener in listeners:
+        listener(collection, months)
+
+
+def invalidate_all() -> None:
+    for collection in list(_keys_by_collection) + list(config.WATCHED_COLLECTIONS):
+        invalidate(collection)
+
+
+def served_stale() -> bool:
+    """Whether a read in this context fell back to a last known-good value
+    since clear_served_stale()"""
+    return _served_stale.get()
+
+
+def clear_served_stale() -> None:
+    _served_stale.set(False)
+
+
+@contextlib.contextmanager
+def rerun_scope() -> Iterator[None]:
+    """Make each distinct cached read at most once inside the block (one
+    Streamlit script run) and reuse its result until the block ends, even if
+    its cache entry expires meanwhile. The block's own writes still drop the
+    reads they invalidate."""
+    token = _run_memo.set({})
+    try:
+        yield
+    finally:
+        _run_memo.reset(token)
+
+
+def _read(key: Tuple, fn: Callable, args: Tuple, kwargs: Dict, collections: Tuple[str, ...]):
+    # The cache's own copy of the value, which callers must not get
+    now = time.monotonic()
+    with _lock:
+        hit = _entries.get(key)
+    if hit is not None and now - hit[0] < config.CACHE_TTL_SECONDS:
+        return hit[1]
+
+    try:
+        value = fn(*args, **kwargs)
+    except DatabaseUnavailable:
+        with _lock:
+            if key not in _last_good:
+                raise
+            stale = _last_good[key]
+        _served_stale.set(True)
+        return stale
+
+    stored = copy.deepcopy(value)
+    with _lock:
+        _entries[key] = (now, stored)
+        for collection in collections:
+            _keys_by_collection.setdefault(collection, set()).add(key)
+        _last_good[key] = stored
+        _last_good.move_to_end(key)
+        while len(_last_good) > config.STALE_CACHE_ENTRIES:
+            _last_good.popitem(last=False)
+    return stored
+
+
+def cached(*collections: str):
+    """Cache a small read until one of `collections` is invalidated.
+
+    Entries also expire after CACHE_TTL_SECONDS, which bounds staleness for
+    writes from other processes when the change-stream watcher isn't running.
+    Results are copied on the way in and out so callers may mutate them.
+    Keys include the current ledger; invalidation drops every ledger's reads.
+
+    While the database is unavailable a read returns the last value it got,
+    however old, and marks the context as served_stale(). Inside
+    rerun_scope() a repeated read returns the value of the first one.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (fn.__qualname__, current_ledger(), args, tuple(sorted(kwargs.items())))
+            memo = _run_memo.get()
+            if memo is not None and key in memo:
+                return copy.deepcopy(memo[key][1])
+            value = _read(key, fn, args, kwargs, collections)
+            if memo is not None:
+                memo[key] = (collections, value)
+            return copy.deepcopy(value)
+        return wrapper
+    return decorator
@@ -0,0 +1,81 @@
+"""
+MongoDB change-stream watcher that invalidates in-process caches on every replica
+"""
+import threading
+from typing import Optional
+from pymongo.errors import OperationFailure, PyMongoError
+import config
+from database.cache import invalidate, invalidate_all
+from database.connection import get_db
+
+
+# Server error codes meaning change streams can never work on this deployment
+_UNSUPPORTED_CODES = {
+    40573,  # "The $changeStream stage is only supported on replica sets"
+    136,    # CappedPositionLost / no oplog
+}
+
+
+class ChangeStreamWatcher(threading.Thread):
+    """Daemon thread tailing one database-level change stream.
+
+    Every change to a watched collection calls `invalidate(collection)`, so
+    writes made by any Streamlit process are seen by this one immediately.
+    After a disconnect it resumes from the last token; if resuming fails,
+    everything is invalidated because events may have been missed.
+    """
+
+    def __init__(self):
+        super().__init__(name="change-stream-watcher", daemon=True)
+        self._stop_event = threading.Event()
+        self._resume_token = None
+        self.unsupported = False
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        pipeline = [{"$match": {"ns.coll": {"$in": list(config.WATCHED_COLLECTIONS)}}}]
+        backoff = 1
+        while not self._stop_event.is_set():
+            try:
+                with get_db().watch(
+                    pipeline,
+                    resume_after=self._resume_token,
+                    max_await_time_ms=1000,
+                ) as stream:
+                    backoff = 1
+                    while not self._stop_event.is_set() and stream.alive:
+                        change = stream.try_next()
+                        if change is not None:
+                            invalidate(change["ns"]["coll"])
+                        self._resume_token = stream.resume_token
+            except OperationFailure as e:
+                if e.code in _UNSUPPORTED_CODES:
+                    print(f"Change streams unavailable, watcher stopped: {e}")
+                    self.unsupported = True
+                    return
+                print(f"Change stream could not resume, restarting: {e}")
+                self._resume_token = None
+                invalidate_all()
+            except PyMongoError as e:
+                print(f"Change stream interrupted, retrying in {backoff}s: {e}")
+                invalidate_all()
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 30)
+
+
+_watcher: Optional[ChangeStreamWatcher] = None
+_watcher_lock = threading.Lock()
+
+
+def start_change_watcher() -> Optional[ChangeStreamWatcher]:
+    """Start the per-process watcher once; no-op unless enabled on MongoDB"""
+    global _watcher
+    if not config.CHANGE_STREAM_WATCHER or config.STORAGE_BACKEND != "mongodb":
+        return None
+    with _watcher_lock:
+        if _watcher is None or not (_watcher.is_alive() or _watcher.unsupported):
+            _watcher = ChangeStreamWatcher()
+            _watcher.start()
+    return _watcher
@@ -1,18 +1,22 @@
 """
 MongoDB connection handler with singleton pattern
 """
-from pymongo import MongoClient, ASCENDING, DESCENDING
+import os
+from datetime import datetime
+from pymongo import MongoClient, ASCENDING, DESCENDING, UpdateOne
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from pymongo.read_preferences import SecondaryPreferred
 import config
-import streamlit as st
+from utils.fingerprint import entry_fingerprint
 
 
 class DatabaseConnection:
-    """Singleton class for MongoDB connection"""
+    """Singleton class for MongoDB connection, one per process"""
     
     _instance = None
     _client = None
     _db = None
+    _analytics_db = None
     
     def __new__(cls):
         if cls._instance is None:
@@ -30,31 +34,140 @@ class DatabaseConnection:
                 # Test connection
                 self._client.admin.command('ping')
                 self._db = self._client[config.DATABASE_NAME]
-                self._create_indexes()
+                # Same database, reads preferring a secondary that isn't too far behind
+                self._analytics_db = self._client.get_database(
+                    config.DATABASE_NAME,
+                    read_preference=SecondaryPreferred(max_staleness=config.ANALYTICS_MAX_STALENESS_SECONDS),
+                )
+                self.create_indexes()
                 
             except (ConnectionFailure, ServerSelectionTimeoutError) as e:
-                st.error(f"Failed to connect to MongoDB: {e}")
+                print(f"Error connecting to MongoDB: {e}")
+                # Connect again on the next call instead of handing out no database
+                self._client.close()
+                self._client = None
                 raise
     
-    def _create_indexes(self):
-        """Create necessary indexes for collections"""
+    def _assign_default_ledger(self):
+        """Stamp documents written before ledgers existed with DEFAULT_LEDGER_ID"""
+        unassigned = {"ledger_id": {"$exists": False}}
+        for name in (
+            config.EXPENSES_COLLECTION,
+            config.INVESTMENTS_COLLECTION,
+            config.CATEGORIES_COLLECTION,
+            config.INVESTMENT_CATEGORIES_COLLECTION,
+            config.EVENTS_COLLECTION,
+            config.EXECUTIONS_COLLECTION,
+        ):
+            self._db[name].update_many(unassigned, {"$set": {"ledger_id": config.DEFAULT_LEDGER_ID}})
+        self._db[config.LEDGERS_COLLECTION].update_one(
+            {"_id": config.DEFAULT_LEDGER_ID},
+            {"$setOnInsert": {
+                "name": config.DEFAULT_LEDGER_ID.capitalize(),
+                "user_id": config.DEFAULT_USER_ID,
+                "created_at": datetime.now(),
+            }},
+            upsert=True,
+        )
+
+    def _fingerprint_entries(self):
+        """Stamp entries written before duplicate detection with their content fingerprint"""
+        for name in (config.EXPENSES_COLLECTION, config.INVESTMENTS_COLLECTION):
+            entries = self._db[name]
+            batch = []
+            for doc in entries.find(
+                {"fingerprint": {"$exists": False}}, {"date": 1, "category": 1, "description": 1, "amount": 1}
+            ):
+                fingerprint = entry_fingerprint(doc["date"], doc["category"], doc.get("description"), doc["amount"])
+                batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"fingerprint": fingerprint}}))
+                if len(batch) == 1000:
+                    entries.bulk_write(batch, ordered=False)
+                    batch = []
+            if batch:
+                entries.bulk_write(batch, ordered=False)
+
+    def create_indexes(self):
+        """Create necessary indexes for collections; every one leads with ledger_id"""
         try:
-            # Expense collection indexes
-            expenses = self._db[config.EXPENSES_COLLECTION]
-            expenses.create_index([("date", DESCENDING)])
-            expenses.create_index([("category", ASCENDING), ("date", DESCENDING)])
-            
-            # Investment collection indexes
-            investments = self._db[config.INVESTMENTS_COLLECTION]
-            investments.create_index([("date", DESCENDING)])
-            investments.create_index([("category", ASCENDING), ("date", DESCENDING)])
+            self._assign_default_ledger()
+            self._fingerprint_entries()
+
+            for name in (
+                config.EXPENSES_COLLECTION,
+                config.INVESTMENTS_COLLECTION,
+                *config.ARCHIVE_COLLECTIONS.values(),
+            ):
+                entries = self._db[name]
+                # _id breaks date ties, so pages of find_entries are index range scans
+                entries.create_index([("ledger_id", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)])
+                entries.create_index(
+                    [("ledger_id", ASCENDING), ("category", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)]
+                )
+                # Entries posted by a recurring event, for delete_event's cascade / report
+                entries.create_index(
+                    [("ledger_id", ASCENDING), ("event_id", ASCENDING)],
+                    partialFilterExpression={"event_id": {"$type": "string"}},
+                )
+                # Duplicate detection: fingerprint probes and one entry per idempotency key
+                entries.create_index([("ledger_id", ASCENDING), ("fingerprint", ASCENDING)])
+                entries.create_index(
+                    [("ledger_id", ASCENDING), ("idempotency_key", ASCENDING)],
+                    unique=True,
+                    partialFilterExpression={"idempotency_key": {"$type": "string"}},
+                )
+                # Months changed since the last dashboard snapshot refresh
+                entries.create_index([("ledger_id", ASCENDING), ("updated_at", ASCENDING)])
+
+            # One execution record per event period; inserting it is the scheduler's claim
+            executions = self._db[config.EXECUTIONS_COLLECTION]
+            executions.create_index([("ledger_id", ASCENDING), ("key", ASCENDING)], unique=True)
+            executions.create_index(
+                [("ledger_id", ASCENDING), ("event_id", ASCENDING), ("executed_at", DESCENDING)]
+            )
+
+            # Scheduler only looks at active events that are due
+            self._db[config.EVENTS_COLLECTION].create_index(
+                [("ledger_id", ASCENDING), ("is_active", ASCENDING), ("next_due_at", ASCENDING)]
+            )
+
+            # Running per-category month totals backing budget status
+            self._db[config.CATEGORY_MONTH_TOTALS_COLLECTION].create_index(
+                [("ledger_id", ASCENDING), ("year", ASCENDING), ("month", ASCENDING), ("category", ASCENDING)],
+                unique=True,
+            )
+            self._db[config.BUDGETS_COLLECTION].create_index(
+                [("ledger_id", ASCENDING), ("category", ASCENDING)], unique=True
+            )
+            self._db[config.HOLDING_VALUES_COLLECTION].create_index(
+                [("ledger_id", ASCENDING), ("category", ASCENDING), ("description", ASCENDING)], unique=True
+            )
+            for name in (config.CATEGORIES_COLLECTION, config.INVESTMENT_CATEGORIES_COLLECTION):
+                self._db[name].create_index([("ledger_id", ASCENDING)], unique=True)
+
+            # The ledger list of the signed-in user
+            self._db[config.LEDGERS_COLLECTION].create_index([("user_id", ASCENDING), ("name", ASCENDING)])
+
+            # Superseded by the ledger-leading indexes above
+            for name in (config.EXPENSES_COLLECTION, config.INVESTMENTS_COLLECTION):
+                for index in ("date_-1", "category_1_date_-1"):
+                    if index in self._db[name].index_information():
+                        self._db[name].drop_index(index)
 
         except Exception as e:
-            st.warning(f"Index creation warning: {e}")
+            print(f"Index creation warning: {e}")
     
+    @classmethod
+    def _forget(cls):
+        # MongoClient isn't fork-safe: a forked child connects again on first use
+        cls._instance = None
+
     def get_database(self):
         """Get database instance"""
         return self._db
+
+    def get_analytics_database(self):
+        """Database instance whose reads prefer a replica-set secondary"""
+        return self._analytics_db
     
     def close(self):
         """Close MongoDB connection"""
@@ -62,9 +175,19 @@ class DatabaseConnection:
             self._client.close()
             self._client = None
             self._db = None
+            self._analytics_db = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=DatabaseConnection._forget)
 
 
 def get_db():
     """Helper function to get database instance"""
     conn = DatabaseConnection()
     return conn.get_database()
+
+
+def get_analytics_db():
+    """Database instance for analytical reads (see database/read_routing.py)"""
+    return DatabaseConnection().get_analytics_database()
@@ -1,16 +1,39 @@
-import calendar
 from datetime import datetime, date
 from typing import Dict, List, Optional
-from bson import ObjectId
-from database.connection import get_db
+import config
+from database.backend import get_backend
+from database.cache import cached, invalidate
+from database.ledger import current_ledger
+from database.tiers import LedgerTiers
+from utils.fingerprint import entry_fingerprint
+from utils.occurrences import (
+    next_occurrence,
+    occurrence_on_or_after,
+    period_due_date,
+    same_period,
+)
 
 
-EVENTS_COLLECTION = "recurring_events"
-EXECUTIONS_COLLECTION = "event_executions"
+EVENTS_COLLECTION = config.EVENTS_COLLECTION
+EXECUTIONS_COLLECTION = config.EXECUTIONS_COLLECTION
+
+
+def _midnight(d: date) -> datetime:
+    return datetime(d.year, d.month, d.day)
 
 
 class EventModel:
 
+    _next_due_backfilled = set()
+
+    @staticmethod
+    def _next_due_at(frequency: str, day_of_month: int, last_executed_at: Optional[datetime], today: date) -> datetime:
+        """First occurrence on or after today that hasn't been executed yet"""
+        due = occurrence_on_or_after(frequency, day_of_month, today)
+        if last_executed_at and same_period(frequency, last_executed_at.date(), due):
+            due = next_occurrence(frequency, day_of_month, due)
+        return _midnight(due)
+
     @staticmethod
     def create_event(
         title: str,
@@ -22,9 +45,8 @@ class EventModel:
         event_type: str = "expense",
         frequency: str = "monthly",
     ) -> bool:
-        db = get_db()
         try:
-            db[EVENTS_COLLECTION].insert_one({
+            get_backend().insert_event({
                 "title": title.strip(),
                 "category": category,
                 "amount": amount,
@@ -33,9 +55,12 @@ class EventModel:
                 "is_active": is_active,
                 "event_type": event_type,
                 "frequency": frequency,
+                "next_due_at": EventModel._next_due_at(frequency, day_of_month, None, date.today()),
+                "last_executed_at": None,
                 "created_at": datetime.now(),
                 "updated_at": datetime.now(),
             })
+            invalidate(EVENTS_COLLECTION)
             return True
         except Exception as e:
             print(f"Error creating event: {e}")
@@ -43,22 +68,25 @@ class EventModel:
 
     @staticmethod
     def get_all_events() -> List[Dict]:
-        db = get_db()
         try:
-            return list(db[EVENTS_COLLECTION].find().sort("day_of_month", 1))
+            return EventModel._find_events(False)
         except Exception as e:
             print(f"Error fetching events: {e}")
             return []
 
     @staticmethod
     def get_active_events() -> List[Dict]:
-        db = get_db()
         try:
-            return list(db[EVENTS_COLLECTION].find({"is_active": True}).sort("day_of_month", 1))
+            return EventModel._find_events(True)
         except Exception as e:
             print(f"Error fetching active events: {e}")
             return []
 
+    @staticmethod
+    @cached(EVENTS_COLLECTION)
+    def _find_events(active_only: bool) -> List[Dict]:
+        return get_backend().find_events(active_only=active_only)
+
     @staticmethod
     def update_event(
         event_id: str,
@@ -71,47 +99,86 @@ class EventModel:
         event_type: str = "expense",
         frequency: str = "monthly",
     ) -> bool:
-        db = get_db()
         try:
-            result = db[EVENTS_COLLECTION].update_one(
-                {"_id": ObjectId(event_id)},
-                {"$set": {
-                    "title": title.strip(),
-                    "category": category,
-                    "amount": amount,
-                    "day_of_month": day_of_month,
-                    "description": description.strip(),
-                    "is_active": is_active,
-                    "event_type": event_type,
-                    "frequency": frequency,
-                    "updated_at": datetime.now(),
-                }},
-            )
-            return result.modified_count > 0
+            backend = get_backend()
+            existing = backend.get_event(event_id)
+            if not existing:
+                return False
+            updated = backend.update_event(event_id, {
+                "title": title.strip(),
+                "category": category,
+                "amount": amount,
+                "day_of_month": day_of_month,
+                "description": description.strip(),
+                "is_active": is_active,
+                "event_type": event_type,
+                "frequency": frequency,
+                "next_due_at": EventModel._next_due_at(
+                    frequency, day_of_month, existing.get("last_executed_at"), date.today()
+                ),
+                "updated_at": datetime.now(),
+            })
+            invalidate(EVENTS_COLLECTION)
+            return updated
         except Exception as e:
             print(f"Error updating event: {e}")
             return False
 
     @staticmethod
-    def delete_event(event_id: str) -> bool:
-        db = get_db()
+    def get_linked_entries(event_id: str) -> Dict[str, List[Dict]]:
+        """Expenses and investments posted by an event (one indexed query each)"""
+        from database.models import ExpenseModel
+        from database.investment_model import InvestmentModel
+        try:
+            return {
+                "expense": ExpenseModel.get_expenses_by_event(event_id),
+                "investment": InvestmentModel.get_investments_by_event(event_id),
+            }
+        except Exception as e:
+            print(f"Error fetching linked entries: {e}")
+            return {"expense": [], "investment": []}
+
+    @staticmethod
+    def delete_event(event_id: str, delete_entries: bool = False) -> bool:
+        """Delete an event and its execution history; optionally also the entries it posted"""
+        from database.models import ExpenseModel
+        from database.investment_model import InvestmentModel
         try:
-            result = db[EVENTS_COLLECTION].delete_one({"_id": ObjectId(event_id)})
-            db[EXECUTIONS_COLLECTION].delete_many({"event_id": event_id})
-            return result.deleted_count > 0
+            backend = get_backend()
+            if delete_entries:
+                linked = EventModel.get_linked_entries(event_id)
+                for entry in linked["expense"]:
+                    ExpenseModel.delete_expense(str(entry["_id"]))
+                for entry in linked["investment"]:
+                    InvestmentModel.delete_investment(str(entry["_id"]))
+            deleted = backend.delete_event(event_id)
+            backend.delete_executions(event_id)
+            invalidate(EVENTS_COLLECTION)
+            return deleted
         except Exception as e:
             print(f"Error deleting event: {e}")
             return False
 
     @staticmethod
     def toggle_event(event_id: str, is_active: bool) -> bool:
-        db = get_db()
         try:
-            result = db[EVENTS_COLLECTION].update_one(
-                {"_id": ObjectId(event_id)},
-                {"$set": {"is_active": is_active, "updated_at": datetime.now()}},
-            )
-            return result.modified_count > 0
+            backend = get_backend()
+            event = backend.get_event(event_id)
+            if not event:
+                return False
+            # Resuming never back-fills payments missed while paused
+            toggled = backend.update_event(event_id, {
+                "is_active": is_active,
+                "next_due_at": EventModel._next_due_at(
+                    event.get("frequency", "monthly"),
+                    event["day_of_month"],
+                    event.get("last_executed_at"),
+                    date.today(),
+                ),
+                "updated_at": datetime.now(),
+            })
+            invalidate(EVENTS_COLLECTION)
+            return toggled
         except Exception as e:
             print(f"Error toggling event: {e}")
             return False
@@ -126,276 +193,238 @@ class EventModel:
 
     @staticmethod
     def has_been_executed(event_id: str, year: int, month: int) -> bool:
-        db = get_db()
         try:
             key = EventModel._execution_key(event_id, year, month)
-            return db[EXECUTIONS_COLLECTION].find_one({"key": key}) is not None
+            return get_backend().find_execution(key) is not None
         except Exception as e:
             print(f"Error checking execution: {e}")
             return False
 
     @staticmethod
     def has_been_executed_today(event_id: str, d: date) -> bool:
-        db = get_db()
         try:
             key = EventModel._daily_execution_key(event_id, d)
-            return db[EXECUTIONS_COLLECTION].find_one({"key": key}) is not None
+            return get_backend().find_execution(key) is not None
         except Exception as e:
             print(f"Error checking daily execution: {e}")
             return False
 
     @staticmethod
-    def mark_executed(event_id: str, year: int, month: int, expense_id=None) -> bool:
-        db = get_db()
-        try:
-            key = EventModel._execution_key(event_id, year, month)
-            db[EXECUTIONS_COLLECTION].update_one(
-                {"key": key},
-                {"$set": {
-                    "key": key,
-                    "event_id": event_id,
-                    "year": year,
-                    "month": month,
-                    "executed_at": datetime.now(),
-                    "expense_id": str(expense_id) if expense_id else None,
-                }},
-                upsert=True,
-            )
-            return True
-        except Exception as e:
-            print(f"Error marking execution: {e}")
-            return False
-
-    @staticmethod
-    def mark_executed_daily(event_id: str, d: date, expense_id=None) -> bool:
-        db = get_db()
-        try:
+    def _execution_record(event_id: str, frequency: str, d: date):
+        """Key and fields of the execution record for the period (day or month) containing d"""
+        if frequency == "daily":
             key = EventModel._daily_execution_key(event_id, d)
-            db[EXECUTIONS_COLLECTION].update_one(
-                {"key": key},
-                {"$set": {
-                    "key": key,
-                    "event_id": event_id,
-                    "year": d.year,
-                    "month": d.month,
-                    "day": d.day,
-                    "executed_at": datetime.now(),
-                    "expense_id": str(expense_id) if expense_id else None,
-                }},
-                upsert=True,
-            )
-            return True
-        except Exception as e:
-            print(f"Error marking daily execution: {e}")
-            return False
+            fields = {"event_id": event_id, "year": d.year, "month": d.month, "day": d.day}
+        else:
+            key = EventModel._execution_key(event_id, d.year, d.month)
+            fields = {"event_id": event_id, "year": d.year, "month": d.month}
+        fields["executed_at"] = datetime.now()
+        return key, fields
 
     @staticmethod
     def get_execution_history(event_id: str) -> List[Dict]:
-        db = get_db()
         try:
-            return list(
-                db[EXECUTIONS_COLLECTION].find({"event_id": event_id}).sort("executed_at", -1)
-            )
+            return get_backend().find_executions(event_id)
         except Exception as e:
             print(f"Error fetching execution history: {e}")
             return []
 
     @staticmethod
-    def run_due_events(force: bool = False) -> List[Dict]:
+    def _backfill_next_due(today: date) -> None:
+        """Give events created before next_due_at was tracked their schedule state"""
+        if current_ledger() in EventModel._next_due_backfilled:
+            return
+        backend = get_backend()
+        events = backend.find_events_without_next_due()
+        for event in events:
+            event_id = str(event["_id"])
+            history = backend.find_executions(event_id)
+            last_executed_at = history[0].get("executed_at") if history else None
+            backend.update_event(event_id, {
+                "next_due_at": EventModel._next_due_at(
+                    event.get("frequency", "monthly"), event["day_of_month"], last_executed_at, today
+                ),
+                "last_executed_at": last_executed_at,
+            })
+        if events:
+            invalidate(EVENTS_COLLECTION)
+        EventModel._next_due_backfilled.add(current_ledger())
+
+    @staticmethod
+    def describe_event(event: Dict, today: date) -> Dict:
+        """Scheduler status of an event that isn't being executed right now"""
+        frequency = event.get("frequency", "monthly")
+        due_date = period_due_date(frequency, event["day_of_month"], today)
+        next_due_at = event.get("next_due_at")
+        next_due = next_due_at.date() if next_due_at else None
+        last_executed_at = event.get("last_executed_at")
+        done = bool(last_executed_at) and same_period(frequency, last_executed_at.date(), today)
+
+        if frequency == "daily":
+            if done:
+                return {"event": event, "status": "skipped", "reason": "Already executed today",
+                        "due_date": today, "next_due": None}
+            return {"event": event, "status": "pending", "reason": "Due today",
+                    "due_date": today, "next_due": None}
+
+        if done:
+            return {"event": event, "status": "skipped", "reason": "Already executed this month",
+                    "due_date": due_date, "next_due": next_due}
+        if today <= due_date:
+            return {"event": event, "status": "pending",
+                    "reason": f"Due on {due_date.strftime('%d %b %Y')} (this month)",
+                    "due_date": due_date, "next_due": next_due}
+        return {"event": event, "status": "next_month",
+                "reason": (
+                    f"Scheduled day ({due_date.strftime('%d %b')}) already passed — "
+                    f"next execution on {next_due.strftime('%d %b %Y') if next_due else '—'}"
+                ),
+                "due_date": due_date, "next_due": next_due}
+
+    @staticmethod
+    def _post_entry(
+        event: Dict, entry_date: datetime, prefix: str, today: date, force: bool = False, manual: bool = False
+    ) -> Optional[str]:
+        """Post the event's entry and its execution record for today's period in one write.
+
+        The unique execution key is the claim: returns None without posting if
+        the period was already executed. Forced and manual runs that find it
+        taken use an extra timestamped key so they're recorded too; a forced
+        run still skips the event if an identical entry exists, so it only
+        restores missing ones. Raises if the write fails.
+        """
         from database.models import ExpenseModel
         from database.investment_model import InvestmentModel
 
-        today = date.today()
-        results = []
+        event_id = str(event["_id"])
+        key, execution = EventModel._execution_record(event_id, event.get("frequency", "monthly"), today)
+        desc = event.get("description") or event["title"]
+        if event.get("event_type", "expense") == "investment":
+            create, collection = InvestmentModel.create_scheduled_investment, config.INVESTMENTS_COLLECTION
+        else:
+            create, collection = ExpenseModel.create_scheduled_expense, config.EXPENSES_COLLECTION
+        args = (entry_date, event["category"], f"{prefix} {desc}", event["amount"], event_id)
 
-        for event in EventModel.get_active_events():
-            event_id = str(event["_id"])
-            event_type = event.get("event_type", "expense")
-            frequency = event.get("frequency", "monthly")
+        entry_id = create(*args, key, execution)
+        if entry_id is None and force:
+            if not manual and LedgerTiers.fingerprint_counts(collection, [entry_fingerprint(*args[:4])], entry_date):
+                return None
+            key = f"{key}_{execution['executed_at'].strftime('%Y%m%d%H%M%S%f')}"
+            entry_id = create(*args, key, execution)
+        return entry_id
 
-            if frequency == "daily":
-                results.append(EventModel._run_daily_event(event, today, force, ExpenseModel, InvestmentModel))
+    @staticmethod
+    def run_due_events(force: bool = False) -> List[Dict]:
+        """Execute events whose next_due_at has arrived.
+
+        Only events with `next_due_at <= now` are read, so a normal run costs
+        one indexed query however many events exist. Each event's period is
+        claimed through the unique execution key before its entry is posted,
+        so concurrent sessions can't both post it. A monthly event
+        whose day passed without the app running is skipped to next month,
+        never back-filled. `force` re-posts this period for every active event.
+        """
+        today = date.today()
+        try:
+            EventModel._backfill_next_due(today)
+            backend = get_backend()
+            if force:
+                events = backend.find_events(active_only=True)
             else:
-                results.append(EventModel._run_monthly_event(event, today, force, ExpenseModel, InvestmentModel))
+                events = backend.find_due_events(datetime.now())
+        except Exception as e:
+            print(f"Error fetching due events: {e}")
+            return []
 
+        results = [EventModel._run_event(event, today, force) for event in events]
+        if results:
+            invalidate(EVENTS_COLLECTION)
         return results
 
     @staticmethod
-    def _run_daily_event(event, today: date, force: bool, ExpenseModel, InvestmentModel) -> Dict:
-        event_id = str(event["_id"])
-        event_type = event.get("event_type", "expense")
-        already_done = EventModel.has_been_executed_today(event_id, today)
-
-        if already_done and not force:
-            return {
-                "event": event,
-                "status": "skipped",
-                "reason": "Already executed today",
-                "due_date": today,
-                "next_due": None,
-            }
-
-        entry_date = datetime(today.year, today.month, today.day)
-        desc = event.get("description") or event["title"]
-
-        if event_type == "investment":
-            success = InvestmentModel.create_investment(
-                date=entry_date,
-                category=event["category"],
-                description=f"[Auto-Daily] {desc}",
-                amount=event["amount"],
-            )
-            entry_label = "Investment"
-        else:
-            success = ExpenseModel.create_expense(
-                date=entry_date,
-                category=event["category"],
-                description=f"[Auto-Daily] {desc}",
-                amount=event["amount"],
-            )
-            entry_label = "Expense"
-
-        if success:
-            EventModel.mark_executed_daily(event_id, today)
-            return {
-                "event": event,
-                "status": "executed",
-                "reason": f"Daily {entry_label} created for {today.strftime('%d %b %Y')}",
-                "due_date": today,
-                "next_due": None,
-            }
-        return {
-            "event": event,
-            "status": "failed",
-            "reason": f"Failed to create daily {entry_label.lower()} — will retry next app load",
-            "due_date": today,
-            "next_due": None,
-        }
+    def _advance(event_id: str, expected: Optional[datetime], next_due: date, execution_key: str) -> None:
+        """Move next_due_at from `expected` to `next_due`, stamping the period's
+        execution time. Compare-and-swap, so only the first session to get here
+        moves it; if this fails the event stays due, and the next run finds the
+        period claimed and moves it then."""
+        backend = get_backend()
+        try:
+            claim = backend.find_execution(execution_key)
+            fields = {"next_due_at": _midnight(next_due)}
+            if claim:
+                fields["last_executed_at"] = claim["executed_at"]
+            backend.advance_event(event_id, expected, fields)
+        except Exception as e:
+            print(f"Error advancing event schedule: {e}")
 
     @staticmethod
-    def _run_monthly_event(event, today: date, force: bool, ExpenseModel, InvestmentModel) -> Dict:
+    def _run_event(event: Dict, today: date, force: bool) -> Dict:
+        backend = get_backend()
         event_id = str(event["_id"])
+        frequency = event.get("frequency", "monthly")
         day = event["day_of_month"]
-        event_type = event.get("event_type", "expense")
-
-        last_day = calendar.monthrange(today.year, today.month)[1]
-        effective_day = min(day, last_day)
-        due_date = date(today.year, today.month, effective_day)
-
-        if today.month == 12:
-            next_due = date(today.year + 1, 1, min(day, 31))
-        else:
-            nm_last = calendar.monthrange(today.year, today.month + 1)[1]
-            next_due = date(today.year, today.month + 1, min(day, nm_last))
-
-        already_done = EventModel.has_been_executed(event_id, today.year, today.month)
-
-        if already_done and not force:
-            return {"event": event, "status": "skipped",
-                    "reason": "Already executed this month",
-                    "due_date": due_date, "next_due": next_due}
-
-        if today < due_date and not force:
-            return {"event": event, "status": "pending",
-                    "reason": f"Due on {due_date.strftime('%d %b %Y')} (this month)",
-                    "due_date": due_date, "next_due": next_due}
-
-        if today > due_date and not already_done and not force:
-            return {"event": event, "status": "next_month",
-                    "reason": (
-                        f"Scheduled day ({due_date.strftime('%d %b')}) already passed — "
-                        f"next execution on {next_due.strftime('%d %b %Y')}"
-                    ),
+        due_date = period_due_date(frequency, day, today)
+        expected = event.get("next_due_at")
+        auto_prefix = "[Auto-Daily]" if frequency == "daily" else "[Auto]"
+        entry_label = "Investment" if event.get("event_type", "expense") == "investment" else "Expense"
+        if frequency == "daily":
+            entry_label = f"Daily {entry_label.lower()}"
+
+        if not force:
+            target = occurrence_on_or_after(frequency, day, today)
+            if target > today:
+                backend.advance_event(event_id, expected, {"next_due_at": _midnight(target)})
+                return {"event": event, "status": "next_month",
+                        "reason": (
+                            f"Scheduled day ({due_date.strftime('%d %b')}) already passed — "
+                            f"next execution on {target.strftime('%d %b %Y')}"
+                        ),
+                        "due_date": due_date, "next_due": target}
+
+        next_due = next_occurrence(frequency, day, max(today, due_date))
+        period_key, _ = EventModel._execution_record(event_id, frequency, today)
+        try:
+            entry_id = EventModel._post_entry(event, _midnight(due_date), auto_prefix, today, force)
+        except Exception as e:
+            print(f"Error posting scheduled entry: {e}")
+            return {"event": event, "status": "failed",
+                    "reason": f"Failed to create {entry_label.lower()} — will retry next app load",
+                    "due_date": due_date, "next_due": None if frequency == "daily" else next_due}
+
+        if entry_id is None:
+            # Claimed by another session, or by an earlier run that failed
+            # before moving the schedule on: move it on now
+            EventModel._advance(event_id, expected, next_due, period_key)
+            period = "today" if frequency == "daily" else "this month"
+            return {"event": event, "status": "skipped", "reason": f"Already executed {period}",
                     "due_date": due_date, "next_due": next_due}
 
-        entry_date = datetime(today.year, today.month, effective_day)
-        desc = event.get("description") or event["title"]
-
-        if event_type == "investment":
-            success = InvestmentModel.create_investment(
-                date=entry_date,
-                category=event["category"],
-                description=f"[Auto] {desc}",
-                amount=event["amount"],
-            )
-            entry_label = "Investment"
-        else:
-            success = ExpenseModel.create_expense(
-                date=entry_date,
-                category=event["category"],
-                description=f"[Auto] {desc}",
-                amount=event["amount"],
-            )
-            entry_label = "Expense"
-
-        if success:
-            EventModel.mark_executed(event_id, today.year, today.month)
-            return {"event": event, "status": "executed",
-                    "reason": f"{entry_label} created for {due_date.strftime('%d %b %Y')}",
-                    "due_date": due_date, "next_due": next_due}
-        return {"event": event, "status": "failed",
-                "reason": f"Failed to create {entry_label.lower()} — will retry next app load",
-                "due_date": due_date, "next_due": next_due}
+        EventModel._advance(event_id, expected, next_due, period_key)
+        return {"event": event, "status": "executed",
+                "reason": f"{entry_label} created for {due_date.strftime('%d %b %Y')}",
+                "due_date": due_date, "next_due": None if frequency == "daily" else next_due}
 
     @staticmethod
     def execute_single_event(event_id: str) -> bool:
-        from database.models import ExpenseModel
-        from database.investment_model import InvestmentModel
-        db = get_db()
         try:
-            event = db[EVENTS_COLLECTION].find_one({"_id": ObjectId(event_id)})
+            backend = get_backend()
+            event = backend.get_event(event_id)
             if not event:
                 return False
 
             today = date.today()
-            event_type = event.get("event_type", "expense")
             frequency = event.get("frequency", "monthly")
-            desc = event.get("description") or event["title"]
-
-            if frequency == "daily":
-                entry_date = datetime(today.year, today.month, today.day)
-                if event_type == "investment":
-                    success = InvestmentModel.create_investment(
-                        date=entry_date,
-                        category=event["category"],
-                        description=f"[Manual] {desc}",
-                        amount=event["amount"],
-                    )
-                else:
-                    success = ExpenseModel.create_expense(
-                        date=entry_date,
-                        category=event["category"],
-                        description=f"[Manual] {desc}",
-                        amount=event["amount"],
-                    )
-                if success:
-                    EventModel.mark_executed_daily(event_id, today)
-                    return True
-                return False
-
             day = event["day_of_month"]
-            effective_day = min(day, calendar.monthrange(today.year, today.month)[1])
-            entry_date = datetime(today.year, today.month, effective_day)
-
-            if event_type == "investment":
-                success = InvestmentModel.create_investment(
-                    date=entry_date,
-                    category=event["category"],
-                    description=f"[Manual] {desc}",
-                    amount=event["amount"],
-                )
-            else:
-                success = ExpenseModel.create_expense(
-                    date=entry_date,
-                    category=event["category"],
-                    description=f"[Manual] {desc}",
-                    amount=event["amount"],
-                )
-
-            if success:
-                EventModel.mark_executed(event_id, today.year, today.month)
-                return True
-            return False
+            due_date = period_due_date(frequency, day, today)
+
+            if not EventModel._post_entry(event, _midnight(due_date), "[Manual]", today, force=True, manual=True):
+                return False
+            backend.update_event(event_id, {
+                "next_due_at": _midnight(next_occurrence(frequency, day, max(today, due_date))),
+                "last_executed_at": datetime.now(),
+            })
+            invalidate(EVENTS_COLLECTION)
+            return True
         except Exception as e:
             print(f"Error executing single event: {e}")
             return False
@@ -0,0 +1,98 @@
+"""
+Current values of investment holdings and their annualized returns (XIRR)
+"""
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+from database.backend import get_backend
+from database.cache import cached, invalidate
+from database.investment_model import InvestmentModel
+from utils.xirr import xirr_by_series
+import config
+
+
+class HoldingModel:
+    """A holding is an investment category and description, such as one
+    mutual fund's SIP. Its XIRR treats each investment in it as a dated
+    contribution and the entered current value as the final inflow; every
+    holding and category is solved in one vectorized pass."""
+
+    @staticmethod
+    @cached(config.HOLDING_VALUES_COLLECTION)
+    def get_values() -> Dict[Tuple[str, str], Dict]:
+        """Entered current value and its date per (category, description)"""
+        return {(v["category"], v["description"]): v for v in get_backend().get_holding_values()}
+
+    @staticmethod
+    def set_value(category: str, description: str, value: float, as_of: Optional[datetime] = None) -> bool:
+        try:
+            get_backend().set_holding_value(category, description, float(value), as_of or datetime.now())
+            invalidate(config.HOLDING_VALUES_COLLECTION)
+            return True
+        except Exception as e:
+            print(f"Error setting holding value: {e}")
+            return False
+
+    @staticmethod
+    def remove_value(category: str, description: str) -> bool:
+        try:
+            removed = get_backend().remove_holding_value(category, description)
+            invalidate(config.HOLDING_VALUES_COLLECTION)
+            return removed
+        except Exception as e:
+            print(f"Error removing holding value: {e}")
+            return False
+
+    @staticmethod
+    @cached(config.INVESTMENTS_COLLECTION, config.HOLDING_VALUES_COLLECTION)
+    def get_returns() -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Invested amount, current value, gain and XIRR per holding and per category.
+
+        Holdings without a current value have no XIRR; a category's figures
+        cover only its holdings that have one. Contributions dated after a
+        value's as-of date are left out of that holding's XIRR.
+        """
+        entries = pd.DataFrame(
+            [
+                (e["date"], e["category"], e.get("description") or "", float(e["amount"]))
+                for e in InvestmentModel.get_investments()
+            ],
+            columns=["date", "category", "description", "amount"],
+        )
+        holdings = entries.groupby(["category", "description"], as_index=False).agg(invested=("amount", "sum"))
+        values = HoldingModel.get_values()
+        keys = list(zip(holdings["category"], holdings["description"]))
+        holdings["value"] = pd.Series([values[k]["value"] if k in values else np.nan for k in keys], dtype=float)
+        holdings["as_of"] = pd.to_datetime(pd.Series([values[k]["as_of"] if k in values else None for k in keys]))
+
+        valued = holdings.dropna(subset=["value"]).reset_index(drop=True)
+        categories = valued.groupby("category", as_index=False).agg(invested=("invested", "sum"), value=("value", "sum"))
+
+        # One series per valued holding, then one per category, solved together
+        flows = entries.merge(valued[["category", "description", "as_of"]].reset_index(), on=["category", "description"])
+        flows = flows[flows["date"] <= flows["as_of"]]
+        category_series = pd.Series(np.arange(len(categories)) + len(valued), index=categories["category"])
+        holding_series = flows["index"].to_numpy()
+        series = np.concatenate([
+            holding_series,
+            category_series[flows["category"]].to_numpy(),
+            np.arange(len(valued)),
+            category_series[valued["category"]].to_numpy(),
+        ])
+        days = np.concatenate([
+            np.tile(flows["date"].to_numpy(dtype="datetime64[D]"), 2),
+            np.tile(valued["as_of"].to_numpy(dtype="datetime64[D]"), 2),
+        ])
+        amounts = np.concatenate([
+            np.tile(-flows["amount"].to_numpy(dtype=float), 2),
+            np.tile(valued["value"].to_numpy(dtype=float), 2),
+        ])
+        rates = xirr_by_series(series, days, amounts, len(valued) + len(categories))
+
+        valued["xirr"] = rates[:len(valued)]
+        holdings = holdings.merge(valued[["category", "description", "xirr"]], on=["category", "description"], how="left")
+        categories["xirr"] = rates[len(valued):]
+        for frame in (holdings, categories):
+            frame["gain"] = frame["value"] - frame["invested"]
+        return holdings, categories
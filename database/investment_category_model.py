@@ -1,4 +1,5 @@
-from database.connection import get_db
+from database.backend import get_backend
+from database.cache import cached, invalidate
 import config
 
 
@@ -6,31 +7,22 @@ class InvestmentCategoryModel:
 
     @staticmethod
     def get_all_categories():
-        db = get_db()
-        custom = db["investment_categories"].find_one({"_id": "custom_investment_categories"})
-        if custom and "categories" in custom:
-            all_cats = list(set(config.INVESTMENT_CATEGORIES + custom["categories"]))
+        custom = InvestmentCategoryModel.get_custom_categories()
+        if custom:
+            all_cats = list(set(config.INVESTMENT_CATEGORIES + custom))
             return sorted(all_cats)
         return list(config.INVESTMENT_CATEGORIES)
 
+    @staticmethod
+    @cached(config.INVESTMENT_CATEGORIES_COLLECTION)
+    def get_custom_categories():
+        return get_backend().get_custom_categories(config.INVESTMENT_CATEGORIES_COLLECTION)
+
     @staticmethod
     def add_category(category_name: str) -> bool:
-        db = get_db()
         try:
-            doc = db["investment_categories"].find_one({"_id": "custom_investment_categories"})
-            if doc:
-                categories = doc.get("categories", [])
-                if category_name not in categories:
-                    categories.append(category_name)
-                    db["investment_categories"].update_one(
-                        {"_id": "custom_investment_categories"},
-                        {"$set": {"categories": categories}},
-                    )
-            else:
-                db["investment_categories"].insert_one({
-                    "_id": "custom_investment_categories",
-                    "categories": [category_name],
-                })
+            get_backend().add_custom_category(config.INVESTMENT_CATEGORIES_COLLECTION, category_name)
+            invalidate(config.INVESTMENT_CATEGORIES_COLLECTION)
             return True
         except Exception as e:
             print(f"Error adding investment category: {e}")
@@ -38,21 +30,12 @@ class InvestmentCategoryModel:
 
     @staticmethod
     def remove_category(category_name: str) -> bool:
-        db = get_db()
         try:
             if category_name in config.INVESTMENT_CATEGORIES:
                 return False
-            doc = db["investment_categories"].find_one({"_id": "custom_investment_categories"})
-            if doc and "categories" in doc:
-                categories = doc["categories"]
-                if category_name in categories:
-                    categories.remove(category_name)
-                    db["investment_categories"].update_one(
-                        {"_id": "custom_investment_categories"},
-                        {"$set": {"categories": categories}},
-                    )
-                    return True
-            return False
+            removed = get_backend().remove_custom_category(config.INVESTMENT_CATEGORIES_COLLECTION, category_name)
+            invalidate(config.INVESTMENT_CATEGORIES_COLLECTION)
+            return removed
         except Exception as e:
             print(f"Error removing investment category: {e}")
             return False
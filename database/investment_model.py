@@ -1,47 +1,154 @@
+import uuid
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import pandas as pd
-from bson import ObjectId
 import config
-from database.connection import get_db
+from database.analytics_engine import get_analytics_engine, spans_months
+from database.backend import DatabaseUnavailable, get_backend
+from database.cache import cached, invalidate
+from database.tiers import LedgerTiers
+from database.write_queue import enqueue
+from utils.fingerprint import entry_fingerprint
+from utils.helpers import normalize_investment_category, period_starts
 
 
 class InvestmentModel:
 
     @staticmethod
-    def create_investment(date: datetime, category: str, description: str, amount: float) -> bool:
-        db = get_db()
+    def create_investment(
+        date: datetime, category: str, description: str, amount: float, idempotency_key: Optional[str] = None
+    ) -> bool:
+        """Create an investment; repeating a call with the same `idempotency_key` creates it only once"""
+        # Keyed even without a caller key: if the write reached the database
+        # before the connection failed, the queued copy is skipped on replay
+        idempotency_key = idempotency_key or uuid.uuid4().hex
         try:
-            db[config.INVESTMENTS_COLLECTION].insert_one({
+            doc = {
                 "date": date,
                 "category": category,
                 "description": description,
                 "amount": amount,
+                "fingerprint": entry_fingerprint(date, category, description, amount),
                 "created_at": datetime.now(),
                 "updated_at": datetime.now(),
-            })
+                "idempotency_key": idempotency_key,
+            }
+            if LedgerTiers.insert_entry(config.INVESTMENTS_COLLECTION, doc) is None:
+                return True
+            invalidate(config.INVESTMENTS_COLLECTION, [(date.year, date.month)])
             return True
+        except DatabaseUnavailable as e:
+            # Saved by the write queue's replayer once the database is back
+            print(f"Database unavailable, queueing investment: {e}")
+            return enqueue(config.INVESTMENTS_COLLECTION, date, category, description, amount, idempotency_key)
         except Exception as e:
             print(f"Error creating investment: {e}")
             return False
 
+    @staticmethod
+    def create_scheduled_investment(
+        date: datetime,
+        category: str,
+        description: str,
+        amount: float,
+        event_id: str,
+        execution_key: str,
+        execution: Dict,
+    ) -> Optional[str]:
+        # Raises on failure so the scheduler can tell it apart from an already-claimed period
+        now = datetime.now()
+        investment_id = get_backend().insert_entry_with_execution(config.INVESTMENTS_COLLECTION, {
+            "date": date,
+            "category": category,
+            "description": description,
+            "amount": amount,
+            "fingerprint": entry_fingerprint(date, category, description, amount),
+            "event_id": event_id,
+            "execution_key": execution_key,
+            "created_at": now,
+            "updated_at": now,
+        }, execution_key, execution)
+        if investment_id:
+            invalidate(config.INVESTMENTS_COLLECTION, [(date.year, date.month)])
+        return investment_id
+
+    @staticmethod
+    def get_investments_by_event(event_id: str) -> List[Dict]:
+        return LedgerTiers.find_entries_by_event(config.INVESTMENTS_COLLECTION, event_id)
+
+    @staticmethod
+    def create_investments(entries: List[Dict], skip_duplicates: bool = False) -> Optional[List[Dict]]:
+        """Create a batch; returns the created entries, None on failure. Raises
+        DatabaseUnavailable during an outage, which callers report apart from
+        a failed write.
+
+        An entry whose `idempotency_key` is already used isn't created again.
+        With `skip_duplicates` (statement imports), entries identical to stored
+        ones are left out too, so a re-imported statement adds nothing.
+        """
+        now = datetime.now()
+        try:
+            docs = []
+            for e in entries:
+                doc = {
+                    "date": e["date"],
+                    "category": e["category"],
+                    "description": e.get("description") or "",
+                    "amount": e["amount"],
+                    "fingerprint": entry_fingerprint(e["date"], e["category"], e.get("description"), e["amount"]),
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                if e.get("idempotency_key"):
+                    doc["idempotency_key"] = e["idempotency_key"]
+                docs.append(doc)
+            if skip_duplicates:
+                docs = LedgerTiers.without_duplicates(config.INVESTMENTS_COLLECTION, docs)
+            ids = LedgerTiers.insert_entries(config.INVESTMENTS_COLLECTION, docs)
+            docs = [doc for doc, doc_id in zip(docs, ids) if doc_id is not None]
+            if docs:
+                invalidate(config.INVESTMENTS_COLLECTION, {(e["date"].year, e["date"].month) for e in docs})
+            return docs
+        except DatabaseUnavailable:
+            raise
+        except Exception as e:
+            print(f"Error creating investments: {e}")
+            return None
+
     @staticmethod
     def get_investments(
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         category: Optional[str] = None,
+        limit: Optional[int] = None,
+        before: Optional[Tuple[datetime, str]] = None,
     ) -> List[Dict]:
-        db = get_db()
-        query = {}
-        if start_date or end_date:
-            query["date"] = {}
-            if start_date:
-                query["date"]["$gte"] = start_date
-            if end_date:
-                query["date"]["$lte"] = end_date
-        if category:
-            query["category"] = category
-        return list(db[config.INVESTMENTS_COLLECTION].find(query).sort("date", -1))
+        return LedgerTiers.find_entries(config.INVESTMENTS_COLLECTION, start_date, end_date, category, limit, before)
+
+    @staticmethod
+    @cached(config.INVESTMENTS_COLLECTION)
+    def get_category_summary(
+        start_date: Optional[datetime] = None, end_date: Optional[datetime] = None
+    ) -> Dict[str, Tuple[float, int]]:
+        """Total and number of entries per category of the range, all time without one"""
+        summary: Dict[str, Tuple[float, int]] = {}
+        for entry in LedgerTiers.find_entries(config.INVESTMENTS_COLLECTION, start_date, end_date):
+            total, count = summary.get(entry["category"], (0.0, 0))
+            summary[entry["category"]] = (total + entry["amount"], count + 1)
+        return summary
+
+    @staticmethod
+    @cached(config.INVESTMENTS_COLLECTION)
+    def get_investment_frame(start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        """Investments of the range as columns; `scheduled` marks entries posted by recurring events"""
+        investments = LedgerTiers.find_entries(config.INVESTMENTS_COLLECTION, start_date, end_date)
+        return pd.DataFrame({
+            "date": pd.to_datetime([e["date"] for e in investments]),
+            "category": [e["category"] for e in investments],
+            "description": [e.get("description") or "" for e in investments],
+            "amount": pd.Series([float(e["amount"]) for e in investments], dtype=float),
+            "scheduled": pd.Series([bool(e.get("event_id")) for e in investments], dtype=bool),
+        })
 
     @staticmethod
     def get_monthly_total(year: int, month: int) -> float:
@@ -50,36 +157,94 @@ class InvestmentModel:
             end_date = datetime(year + 1, 1, 1) - timedelta(seconds=1)
         else:
             end_date = datetime(year, month + 1, 1) - timedelta(seconds=1)
-        return sum(i["amount"] for i in InvestmentModel.get_investments(start_date, end_date))
+        return LedgerTiers.total_amount(config.INVESTMENTS_COLLECTION, start_date, end_date)
 
     @staticmethod
+    @cached(config.INVESTMENTS_COLLECTION)
     def get_category_breakdown(start_date: datetime, end_date: datetime) -> Dict[str, float]:
-        investments = InvestmentModel.get_investments(start_date, end_date)
-        breakdown: Dict[str, float] = {}
-        for inv in investments:
-            cat = inv["category"]
-            breakdown[cat] = breakdown.get(cat, 0.0) + inv["amount"]
-        return breakdown
+        engine = get_analytics_engine()
+        if engine and spans_months(start_date, end_date):
+            return engine.category_totals(config.INVESTMENTS_COLLECTION, start_date, end_date)
+        return LedgerTiers.category_totals(config.INVESTMENTS_COLLECTION, start_date, end_date)
 
     @staticmethod
+    @cached(config.INVESTMENTS_COLLECTION)
     def get_daily_totals(start_date: datetime, end_date: datetime) -> pd.DataFrame:
-        investments = InvestmentModel.get_investments(start_date, end_date)
-        if not investments:
+        rows = LedgerTiers.daily_totals(config.INVESTMENTS_COLLECTION, start_date, end_date)
+        if not rows:
             return pd.DataFrame(columns=["date", "amount"])
-        df = pd.DataFrame(investments)
-        df["date"] = pd.to_datetime(df["date"]).dt.date
-        return df.groupby("date")["amount"].sum().reset_index()
+        return pd.DataFrame(rows, columns=["date", "amount"])
+
+    @staticmethod
+    @cached(config.INVESTMENTS_COLLECTION)
+    def get_period_totals(start_date: datetime, end_date: datetime, unit: str) -> pd.DataFrame:
+        """Total per day, week, month or quarter of the range, empty periods included"""
+        totals = dict(LedgerTiers.period_totals(config.INVESTMENTS_COLLECTION, start_date, end_date, unit))
+        periods = period_starts(start_date, end_date, unit)
+        return pd.DataFrame({
+            "period": periods,
+            "amount": [totals.get(p.to_pydatetime(), 0.0) for p in periods],
+        })
+
+    @staticmethod
+    @cached(config.EXPENSES_COLLECTION, config.INVESTMENTS_COLLECTION)
+    def get_cumulative_timeline() -> pd.DataFrame:
+        """Running totals over the full history, one row per day and category
+        with entries: kind ("expense" or "investment"), the day's amount, the
+        running total of the category and the running total of the kind"""
+        columns = ["date", "kind", "category", "amount", "category_total", "kind_total"]
+        try:
+            rows = LedgerTiers.running_totals({
+                "expense": config.EXPENSES_COLLECTION,
+                "investment": config.INVESTMENTS_COLLECTION,
+            })
+        except DatabaseUnavailable:
+            raise
+        except Exception as e:
+            print(f"Error getting cumulative timeline: {e}")
+            rows = []
+        return pd.DataFrame(rows, columns=columns)
 
     @staticmethod
     def get_yearly_monthly_totals(year: int) -> Dict[int, float]:
-        return {month: InvestmentModel.get_monthly_total(year, month) for month in range(1, 13)}
+        totals = InvestmentModel.get_monthly_totals_range(year, year)
+        return {month: totals.get((year, month), 0.0) for month in range(1, 13)}
+
+    @staticmethod
+    @cached(config.INVESTMENTS_COLLECTION)
+    def get_monthly_totals_range(start_year: int, end_year: int) -> Dict[Tuple[int, int], float]:
+        engine = get_analytics_engine()
+        if engine:
+            return engine.monthly_totals(config.INVESTMENTS_COLLECTION, start_year, end_year)
+        return {
+            (year, month): total
+            for year in range(start_year, end_year + 1)
+            for month, total in LedgerTiers.monthly_totals(config.INVESTMENTS_COLLECTION, year).items()
+        }
+
+    @staticmethod
+    @cached(config.INVESTMENTS_COLLECTION)
+    def get_yearly_category_totals(start_year: int, end_year: int) -> Dict[Tuple[int, str], float]:
+        engine = get_analytics_engine()
+        if engine:
+            return engine.yearly_category_totals(config.INVESTMENTS_COLLECTION, start_year, end_year)
+        return {
+            (year, cat): total
+            for year in range(start_year, end_year + 1)
+            for cat, total in LedgerTiers.category_totals(
+                config.INVESTMENTS_COLLECTION, datetime(year, 1, 1), datetime(year, 12, 31, 23, 59, 59)
+            ).items()
+        }
+
+    @staticmethod
+    @cached(config.INVESTMENTS_COLLECTION)
+    def _year_months() -> List[tuple]:
+        return LedgerTiers.entry_year_months(config.INVESTMENTS_COLLECTION)
 
     @staticmethod
     def get_available_years() -> List[int]:
-        db = get_db()
         try:
-            investments = db[config.INVESTMENTS_COLLECTION].find({}, {"date": 1})
-            years = {i["date"].year for i in investments if i.get("date")}
+            years = {y for y, _ in InvestmentModel._year_months()}
             return sorted(years, reverse=True) if years else [datetime.now().year]
         except Exception as e:
             print(f"Error getting available years: {e}")
@@ -87,10 +252,8 @@ class InvestmentModel:
 
     @staticmethod
     def get_available_year_months() -> List[tuple]:
-        db = get_db()
         try:
-            investments = db[config.INVESTMENTS_COLLECTION].find({}, {"date": 1})
-            ym = {(i["date"].year, i["date"].month) for i in investments if i.get("date")}
+            ym = set(InvestmentModel._year_months())
             return sorted(ym, reverse=True) if ym else [(datetime.now().year, datetime.now().month)]
         except Exception as e:
             print(f"Error getting available year-months: {e}")
@@ -98,29 +261,56 @@ class InvestmentModel:
 
     @staticmethod
     def update_investment(investment_id: str, date: datetime, category: str, description: str, amount: float) -> bool:
-        db = get_db()
         try:
-            result = db[config.INVESTMENTS_COLLECTION].update_one(
-                {"_id": ObjectId(investment_id)},
-                {"$set": {
-                    "date": date,
-                    "category": category,
-                    "description": description,
-                    "amount": amount,
-                    "updated_at": datetime.now(),
-                }},
+            previous = LedgerTiers.find_and_update_entry(config.INVESTMENTS_COLLECTION, investment_id, {
+                "date": date,
+                "category": category,
+                "description": description,
+                "amount": amount,
+                "fingerprint": entry_fingerprint(date, category, description, amount),
+                "updated_at": datetime.now(),
+            })
+            if previous is None:
+                return False
+            invalidate(
+                config.INVESTMENTS_COLLECTION,
+                [(previous["date"].year, previous["date"].month), (date.year, date.month)],
             )
-            return result.modified_count > 0
+            return True
         except Exception as e:
             print(f"Error updating investment: {e}")
             return False
 
     @staticmethod
     def delete_investment(investment_id: str) -> bool:
-        db = get_db()
         try:
-            result = db[config.INVESTMENTS_COLLECTION].delete_one({"_id": ObjectId(investment_id)})
-            return result.deleted_count > 0
+            deleted = LedgerTiers.find_and_delete_entry(config.INVESTMENTS_COLLECTION, investment_id)
+            if deleted is None:
+                return False
+            invalidate(config.INVESTMENTS_COLLECTION, [(deleted["date"].year, deleted["date"].month)])
+            return True
         except Exception as e:
             print(f"Error deleting investment: {e}")
             return False
+
+    @staticmethod
+    def migrate_from_expenses(expenses: List[Dict]) -> Tuple[int, int]:
+        """Move misclassified expenses to investments; returns (migrated, failed).
+        Failed ones stay in expenses."""
+        from database.models import ExpenseModel
+        migrated, failed = 0, 0
+        for exp in expenses:
+            # Keyed by the expense, so a retry after a failed delete doesn't copy it twice
+            ok = InvestmentModel.create_investment(
+                date=exp["date"],
+                category=normalize_investment_category(exp["category"]),
+                description=exp.get("description", ""),
+                amount=exp["amount"],
+                idempotency_key=f"migrated:{exp['_id']}",
+            )
+            # A queued investment may leave its expense behind; the next run removes it
+            if ok and ExpenseModel.delete_expense(str(exp["_id"])):
+                migrated += 1
+            else:
+                failed += 1
+        return migrated, failed
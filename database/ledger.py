@@ -0,0 +1,29 @@
+"""
+Current ledger (tenant) that every model and backend call is scoped to
+"""
+import contextlib
+import contextvars
+from typing import Iterator, Optional
+import config
+
+
+_current_ledger: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("ledger_id", default=None)
+
+
+def current_ledger() -> str:
+    return _current_ledger.get() or config.DEFAULT_LEDGER_ID
+
+
+def set_current_ledger(ledger_id: Optional[str]) -> None:
+    """Scope the rest of this thread's work (e.g. one Streamlit script run) to a ledger"""
+    _current_ledger.set(ledger_id)
+
+
+@contextlib.contextmanager
+def ledger_scope(ledger_id: str) -> Iterator[None]:
+    """Temporarily scope calls to another ledger (jobs that walk every ledger)"""
+    token = _current_ledger.set(ledger_id)
+    try:
+        yield
+    finally:
+        _current_ledger.reset(token)
@@ -0,0 +1,60 @@
+"""
+Ledgers (households) that partition every collection, each owned by one user
+"""
+import re
+import uuid
+from typing import Dict, List, Optional
+from database.backend import get_backend
+from database.cache import cached, invalidate
+import config
+
+
+class LedgerModel:
+    """Handle ledger-related database operations"""
+
+    @staticmethod
+    @cached(config.LEDGERS_COLLECTION)
+    def get_ledgers(user_id: Optional[str] = None) -> List[Dict]:
+        """Get the ledgers `user_id` owns, or every ledger (the default one
+        included even before it is stored) without a user"""
+        ledgers = get_backend().find_ledgers(user_id)
+        if user_id is None and not any(l["_id"] == config.DEFAULT_LEDGER_ID for l in ledgers):
+            ledgers.insert(0, {
+                "_id": config.DEFAULT_LEDGER_ID,
+                "name": config.DEFAULT_LEDGER_ID.capitalize(),
+                "user_id": config.DEFAULT_USER_ID,
+            })
+        return ledgers
+
+    @staticmethod
+    def create_ledger(name: str, user_id: str) -> Optional[str]:
+        """Create a ledger owned by `user_id` and return its id, or None if the name is taken"""
+        ledger_id = re.sub(r"[^a-z0-9]+", "-", name.strip().lower()).strip("-")
+        if not ledger_id:
+            return None
+        try:
+            created = get_backend().insert_ledger(ledger_id, name.strip(), user_id)
+            invalidate(config.LEDGERS_COLLECTION)
+            return ledger_id if created else None
+        except Exception as e:
+            print(f"Error creating ledger: {e}")
+            return None
+
+    @staticmethod
+    def create_personal_ledger(user_id: str) -> Optional[str]:
+        """First ledger of a new user, named after them; suffixed if another
+        user already has a ledger of that name"""
+        return LedgerModel.create_ledger(user_id, user_id) or LedgerModel.create_ledger(
+            f"{user_id} {uuid.uuid4().hex[:6]}", user_id
+        )
+
+    @staticmethod
+    def set_owner(ledger_id: str, user_id: str) -> bool:
+        """Hand a ledger and all its data to another user"""
+        try:
+            found = get_backend().set_ledger_owner(ledger_id, user_id)
+            invalidate(config.LEDGERS_COLLECTION)
+            return found
+        except Exception as e:
+            print(f"Error changing ledger owner: {e}")
+            return False
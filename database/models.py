@@ -1,47 +1,164 @@
+import uuid
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 import pandas as pd
-from bson import ObjectId
 import config
-from database.connection import get_db
+from database.analytics_engine import get_analytics_engine, spans_months
+from database.backend import DatabaseUnavailable, get_backend
+from database.budget_model import BudgetModel
+from database.cache import cached, invalidate
+from database.tiers import LedgerTiers
+from database.write_queue import enqueue
+from utils.fingerprint import entry_fingerprint
+from utils.helpers import period_starts
 
 
 class ExpenseModel:
 
     @staticmethod
-    def create_expense(date: datetime, category: str, description: str, amount: float) -> bool:
-        db = get_db()
+    def create_expense(
+        date: datetime, category: str, description: str, amount: float, idempotency_key: Optional[str] = None
+    ) -> bool:
+        """Create an expense; repeating a call with the same `idempotency_key` creates it only once"""
+        # Keyed even without a caller key: if the write reached the database
+        # before the connection failed, the queued copy is skipped on replay
+        idempotency_key = idempotency_key or uuid.uuid4().hex
         try:
-            db[config.EXPENSES_COLLECTION].insert_one({
+            doc = {
                 "date": date,
                 "category": category,
                 "description": description,
                 "amount": amount,
+                "fingerprint": entry_fingerprint(date, category, description, amount),
                 "created_at": datetime.now(),
                 "updated_at": datetime.now(),
-            })
+                "idempotency_key": idempotency_key,
+            }
+            if LedgerTiers.insert_entry(config.EXPENSES_COLLECTION, doc) is None:
+                return True
+            BudgetModel.record_change(date, category, amount)
+            invalidate(config.EXPENSES_COLLECTION, [(date.year, date.month)])
             return True
+        except DatabaseUnavailable as e:
+            # Saved by the write queue's replayer once the database is back
+            print(f"Database unavailable, queueing expense: {e}")
+            return enqueue(config.EXPENSES_COLLECTION, date, category, description, amount, idempotency_key)
         except Exception as e:
             print(f"Error creating expense: {e}")
             return False
 
+    @staticmethod
+    def create_scheduled_expense(
+        date: datetime,
+        category: str,
+        description: str,
+        amount: float,
+        event_id: str,
+        execution_key: str,
+        execution: Dict,
+    ) -> Optional[str]:
+        # Raises on failure so the scheduler can tell it apart from an already-claimed period
+        now = datetime.now()
+        expense_id = get_backend().insert_entry_with_execution(config.EXPENSES_COLLECTION, {
+            "date": date,
+            "category": category,
+            "description": description,
+            "amount": amount,
+            "fingerprint": entry_fingerprint(date, category, description, amount),
+            "event_id": event_id,
+            "execution_key": execution_key,
+            "created_at": now,
+            "updated_at": now,
+        }, execution_key, execution)
+        if expense_id:
+            BudgetModel.record_change(date, category, amount)
+            invalidate(config.EXPENSES_COLLECTION, [(date.year, date.month)])
+        return expense_id
+
+    @staticmethod
+    def get_expenses_by_event(event_id: str) -> List[Dict]:
+        return LedgerTiers.find_entries_by_event(config.EXPENSES_COLLECTION, event_id)
+
+    @staticmethod
+    def create_expenses(entries: List[Dict], skip_duplicates: bool = False) -> Optional[List[Dict]]:
+        """Create a batch; returns the created entries, None on failure. Raises
+        DatabaseUnavailable during an outage, which callers report apart from
+        a failed write.
+
+        An entry whose `idempotency_key` is already used isn't created again.
+        With `skip_duplicates` (statement imports), entries identical to stored
+        ones are left out too, so a re-imported statement adds nothing.
+        """
+        now = datetime.now()
+        try:
+            docs = []
+            for e in entries:
+                doc = {
+                    "date": e["date"],
+                    "category": e["category"],
+                    "description": e.get("description") or "",
+                    "amount": e["amount"],
+                    "fingerprint": entry_fingerprint(e["date"], e["category"], e.get("description"), e["amount"]),
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                if e.get("idempotency_key"):
+                    doc["idempotency_key"] = e["idempotency_key"]
+                docs.append(doc)
+            if skip_duplicates:
+                docs = LedgerTiers.without_duplicates(config.EXPENSES_COLLECTION, docs)
+            ids = LedgerTiers.insert_entries(config.EXPENSES_COLLECTION, docs)
+            docs = [doc for doc, doc_id in zip(docs, ids) if doc_id is not None]
+            deltas: Dict[Tuple[int, int, str], float] = {}
+            for e in docs:
+                key = (e["date"].year, e["date"].month, e["category"])
+                deltas[key] = deltas.get(key, 0.0) + e["amount"]
+            for (year, month, category), delta in deltas.items():
+                BudgetModel.record_change(datetime(year, month, 1), category, delta)
+            if docs:
+                invalidate(config.EXPENSES_COLLECTION, {(year, month) for year, month, _ in deltas})
+            return docs
+        except DatabaseUnavailable:
+            raise
+        except Exception as e:
+            print(f"Error creating expenses: {e}")
+            return None
+
     @staticmethod
     def get_expenses(
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         category: Optional[str] = None,
+        limit: Optional[int] = None,
+        before: Optional[Tuple[datetime, str]] = None,
     ) -> List[Dict]:
-        db = get_db()
-        query = {}
-        if start_date or end_date:
-            query["date"] = {}
-            if start_date:
-                query["date"]["$gte"] = start_date
-            if end_date:
-                query["date"]["$lte"] = end_date
-        if category:
-            query["category"] = category
-        return list(db[config.EXPENSES_COLLECTION].find(query).sort("date", -1))
+        return LedgerTiers.find_entries(config.EXPENSES_COLLECTION, start_date, end_date, category, limit, before)
+
+    @staticmethod
+    @cached(config.EXPENSES_COLLECTION)
+    def get_category_summary(
+        start_date: Optional[datetime] = None, end_date: Optional[datetime] = None
+    ) -> Dict[str, Tuple[float, int]]:
+        """Total and number of entries per category of the range, all time without one"""
+        summary: Dict[str, Tuple[float, int]] = {}
+        for entry in LedgerTiers.find_entries(config.EXPENSES_COLLECTION, start_date, end_date):
+            total, count = summary.get(entry["category"], (0.0, 0))
+            summary[entry["category"]] = (total + entry["amount"], count + 1)
+        return summary
+
+    @staticmethod
+    @cached(config.EXPENSES_COLLECTION)
+    def get_expense_frame(start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        """Expenses of the range as columns; `scheduled` marks entries posted by recurring events"""
+        expenses = LedgerTiers.find_entries(config.EXPENSES_COLLECTION, start_date, end_date)
+        return pd.DataFrame({
+            "date": pd.to_datetime([e["date"] for e in expenses]),
+            "category": [e["category"] for e in expenses],
+            "description": [e.get("description") or "" for e in expenses],
+            "amount": pd.Series([float(e["amount"]) for e in expenses], dtype=float),
+            "scheduled": pd.Series([bool(e.get("event_id")) for e in expenses], dtype=bool),
+        })
 
     @staticmethod
     def get_monthly_total(year: int, month: int) -> float:
@@ -50,37 +167,100 @@ class ExpenseModel:
             end_date = datetime(year + 1, 1, 1) - timedelta(seconds=1)
         else:
             end_date = datetime(year, month + 1, 1) - timedelta(seconds=1)
-        return sum(e["amount"] for e in ExpenseModel.get_expenses(start_date, end_date))
+        return LedgerTiers.total_amount(config.EXPENSES_COLLECTION, start_date, end_date)
 
     @staticmethod
+    @cached(config.EXPENSES_COLLECTION, config.CATEGORIES_COLLECTION)
     def get_category_breakdown(start_date: datetime, end_date: datetime) -> Dict[str, float]:
         from database.category_model import CategoryModel
-        expenses = ExpenseModel.get_expenses(start_date, end_date)
         breakdown = {cat: 0.0 for cat in CategoryModel.get_all_categories()}
-        for exp in expenses:
-            cat = exp["category"]
-            breakdown[cat] = breakdown.get(cat, 0.0) + exp["amount"]
+        engine = get_analytics_engine()
+        if engine and spans_months(start_date, end_date):
+            totals = engine.category_totals(config.EXPENSES_COLLECTION, start_date, end_date)
+        else:
+            totals = LedgerTiers.category_totals(config.EXPENSES_COLLECTION, start_date, end_date)
+        for cat, amount in totals.items():
+            breakdown[cat] = breakdown.get(cat, 0.0) + amount
         return breakdown
 
     @staticmethod
+    @cached(config.EXPENSES_COLLECTION)
     def get_daily_totals(start_date: datetime, end_date: datetime) -> pd.DataFrame:
-        expenses = ExpenseModel.get_expenses(start_date, end_date)
-        if not expenses:
+        rows = LedgerTiers.daily_totals(config.EXPENSES_COLLECTION, start_date, end_date)
+        if not rows:
             return pd.DataFrame(columns=["date", "amount"])
-        df = pd.DataFrame(expenses)
-        df["date"] = pd.to_datetime(df["date"]).dt.date
-        return df.groupby("date")["amount"].sum().reset_index()
+        return pd.DataFrame(rows, columns=["date", "amount"])
+
+    @staticmethod
+    @cached(config.EXPENSES_COLLECTION)
+    def get_period_totals(start_date: datetime, end_date: datetime, unit: str) -> pd.DataFrame:
+        """Total per day, week, month or quarter of the range, empty periods included"""
+        totals = dict(LedgerTiers.period_totals(config.EXPENSES_COLLECTION, start_date, end_date, unit))
+        periods = period_starts(start_date, end_date, unit)
+        return pd.DataFrame({
+            "period": periods,
+            "amount": [totals.get(p.to_pydatetime(), 0.0) for p in periods],
+        })
+
+    @staticmethod
+    @cached(config.EXPENSES_COLLECTION)
+    def get_category_period_matrix(
+        start_date: datetime, end_date: datetime, unit: str
+    ) -> Tuple[List[str], pd.DatetimeIndex, np.ndarray]:
+        """Spend per category (rows) and period (columns) of the range as a dense array"""
+        rows = LedgerTiers.category_period_totals(config.EXPENSES_COLLECTION, start_date, end_date, unit)
+        periods = period_starts(start_date, end_date, unit)
+        categories = sorted({category for _, category, _ in rows})
+        matrix = np.zeros((len(categories), len(periods)))
+        if rows:
+            row_periods, row_categories, totals = zip(*rows)
+            cells = (
+                pd.Index(categories).get_indexer(row_categories),
+                periods.get_indexer(pd.DatetimeIndex(row_periods)),
+            )
+            np.add.at(matrix, cells, totals)
+        return categories, periods, matrix
 
     @staticmethod
     def get_yearly_monthly_totals(year: int) -> Dict[int, float]:
-        return {month: ExpenseModel.get_monthly_total(year, month) for month in range(1, 13)}
+        totals = ExpenseModel.get_monthly_totals_range(year, year)
+        return {month: totals.get((year, month), 0.0) for month in range(1, 13)}
+
+    @staticmethod
+    @cached(config.EXPENSES_COLLECTION)
+    def get_monthly_totals_range(start_year: int, end_year: int) -> Dict[Tuple[int, int], float]:
+        engine = get_analytics_engine()
+        if engine:
+            return engine.monthly_totals(config.EXPENSES_COLLECTION, start_year, end_year)
+        return {
+            (year, month): total
+            for year in range(start_year, end_year + 1)
+            for month, total in LedgerTiers.monthly_totals(config.EXPENSES_COLLECTION, year).items()
+        }
+
+    @staticmethod
+    @cached(config.EXPENSES_COLLECTION)
+    def get_yearly_category_totals(start_year: int, end_year: int) -> Dict[Tuple[int, str], float]:
+        engine = get_analytics_engine()
+        if engine:
+            return engine.yearly_category_totals(config.EXPENSES_COLLECTION, start_year, end_year)
+        return {
+            (year, cat): total
+            for year in range(start_year, end_year + 1)
+            for cat, total in LedgerTiers.category_totals(
+                config.EXPENSES_COLLECTION, datetime(year, 1, 1), datetime(year, 12, 31, 23, 59, 59)
+            ).items()
+        }
+
+    @staticmethod
+    @cached(config.EXPENSES_COLLECTION)
+    def _year_months() -> List[tuple]:
+        return LedgerTiers.entry_year_months(config.EXPENSES_COLLECTION)
 
     @staticmethod
     def get_available_years() -> List[int]:
-        db = get_db()
         try:
-            expenses = db[config.EXPENSES_COLLECTION].find({}, {"date": 1})
-            years = {e["date"].year for e in expenses if e.get("date")}
+            years = {y for y, _ in ExpenseModel._year_months()}
             return sorted(years, reverse=True) if years else [datetime.now().year]
         except Exception as e:
             print(f"Error getting available years: {e}")
@@ -88,10 +268,8 @@ class ExpenseModel:
 
     @staticmethod
     def get_available_year_months() -> List[tuple]:
-        db = get_db()
         try:
-            expenses = db[config.EXPENSES_COLLECTION].find({}, {"date": 1})
-            ym = {(e["date"].year, e["date"].month) for e in expenses if e.get("date")}
+            ym = set(ExpenseModel._year_months())
             return sorted(ym, reverse=True) if ym else [(datetime.now().year, datetime.now().month)]
         except Exception as e:
             print(f"Error getting available year-months: {e}")
@@ -99,44 +277,47 @@ class ExpenseModel:
 
     @staticmethod
     def update_expense(expense_id: str, date: datetime, category: str, description: str, amount: float) -> bool:
-        db = get_db()
         try:
-            result = db[config.EXPENSES_COLLECTION].update_one(
-                {"_id": ObjectId(expense_id)},
-                {"$set": {
-                    "date": date,
-                    "category": category,
-                    "description": description,
-                    "amount": amount,
-                    "updated_at": datetime.now(),
-                }},
+            previous = LedgerTiers.find_and_update_entry(config.EXPENSES_COLLECTION, expense_id, {
+                "date": date,
+                "category": category,
+                "description": description,
+                "amount": amount,
+                "fingerprint": entry_fingerprint(date, category, description, amount),
+                "updated_at": datetime.now(),
+            })
+            if previous is None:
+                return False
+            BudgetModel.record_change(previous["date"], previous["category"], -previous["amount"])
+            BudgetModel.record_change(date, category, amount)
+            invalidate(
+                config.EXPENSES_COLLECTION,
+                [(previous["date"].year, previous["date"].month), (date.year, date.month)],
             )
-            return result.modified_count > 0
+            return True
         except Exception as e:
             print(f"Error updating expense: {e}")
             return False
 
     @staticmethod
     def delete_expense(expense_id: str) -> bool:
-        db = get_db()
         try:
-            result = db[config.EXPENSES_COLLECTION].delete_one({"_id": ObjectId(expense_id)})
-            return result.deleted_count > 0
+            deleted = LedgerTiers.find_and_delete_entry(config.EXPENSES_COLLECTION, expense_id)
+            if deleted is None:
+                return False
+            BudgetModel.record_change(deleted["date"], deleted["category"], -deleted["amount"])
+            invalidate(config.EXPENSES_COLLECTION, [(deleted["date"].year, deleted["date"].month)])
+            return True
         except Exception as e:
             print(f"Error deleting expense: {e}")
             return False
 
     @staticmethod
     def get_expenses_by_categories(categories: List[str]) -> List[Dict]:
-        import re
-        db = get_db()
         try:
             # Case-insensitive match; also treat "Fd" as an alias for "Fixed Deposit"
             search_terms = list(categories) + ["Fd", "Fixed deposit"]
-            patterns = [re.compile(f"^{re.escape(term)}$", re.IGNORECASE) for term in search_terms]
-            return list(db[config.EXPENSES_COLLECTION].find(
-                {"category": {"$in": patterns}}
-            ).sort("date", -1))
+            return LedgerTiers.find_entries_by_categories(config.EXPENSES_COLLECTION, search_terms)
         except Exception as e:
             print(f"Error fetching expenses by categories: {e}")
             return []
@@ -0,0 +1,572 @@
+"""
+MongoDB implementation of the storage backend
+"""
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from bson import ObjectId
+from pymongo import DeleteOne, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, ConnectionFailure, DuplicateKeyError, OperationFailure
+import config
+from database.backend import StorageBackend
+from database.connection import DatabaseConnection, get_analytics_db, get_db
+from database.ledger import current_ledger
+from database.read_routing import reads_from_secondary
+from utils.fingerprint import entry_fingerprint
+
+
+def _scoped(query: Optional[Dict] = None) -> Dict:
+    """Filter restricted to the current ledger; every index leads with ledger_id"""
+    return {"ledger_id": current_ledger(), **(query or {})}
+
+
+def _date_match(start_date: Optional[datetime], end_date: Optional[datetime]) -> Dict:
+    query: Dict = _scoped()
+    if start_date or end_date:
+        query["date"] = {}
+        if start_date:
+            query["date"]["$gte"] = start_date
+        if end_date:
+            query["date"]["$lte"] = end_date
+    return query
+
+
+def _reader(*collections: str):
+    """Database for a read of `collections`: a secondary for analytical reads
+    (see read_routing), the primary otherwise"""
+    return get_analytics_db() if reads_from_secondary(*collections) else get_db()
+
+
+_WRITE_BATCH_SIZE = 1000
+
+
+class MongoBackend(StorageBackend):
+
+    # Covers server selection timeouts, lost connections and network timeouts
+    connection_errors = (ConnectionFailure,)
+
+    def __init__(self):
+        self._transactions: Optional[bool] = None
+
+    # ── Ledger entries ────────────────────────────────────────────────────────
+
+    def insert_entry(self, collection: str, doc: Dict) -> Optional[str]:
+        try:
+            return str(get_db()[collection].insert_one({**doc, "ledger_id": current_ledger()}).inserted_id)
+        except DuplicateKeyError:
+            # Only the (ledger_id, idempotency_key) index can reject a new entry
+            if doc.get("idempotency_key") is None:
+                raise
+            return None
+
+    def insert_entries(self, collection: str, docs: List[Dict]) -> List[Optional[str]]:
+        if not docs:
+            return []
+        ledger_id = current_ledger()
+        docs = [{**doc, "ledger_id": ledger_id} for doc in docs]
+        skipped = set()
+        try:
+            # Unordered, so the rows after a used key are still inserted;
+            # insert_many sets each doc's _id
+            get_db()[collection].insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if not errors or any(
+                err["code"] != 11000 or docs[err["index"]].get("idempotency_key") is None for err in errors
+            ):
+                raise
+            skipped = {err["index"] for err in errors}
+        return [None if i in skipped else str(doc["_id"]) for i, doc in enumerate(docs)]
+
+    def find_entries(
+        self, collection, start_date=None, end_date=None, category=None, limit=None, before=None
+    ) -> List[Dict]:
+        query = _date_match(start_date, end_date)
+        if category:
+            query["category"] = category
+        if before:
+            before_date, before_id = before
+            before_id = ObjectId(before_id) if ObjectId.is_valid(before_id) else before_id
+            query["$or"] = [{"date": {"$lt": before_date}}, {"date": before_date, "_id": {"$lt": before_id}}]
+        return list(
+            _reader(collection)[collection].find(query).sort([("date", -1), ("_id", -1)]).limit(limit or 0)
+        )
+
+    def find_entries_by_categories(self, collection: str, categories: List[str]) -> List[Dict]:
+        patterns = [re.compile(f"^{re.escape(term)}$", re.IGNORECASE) for term in categories]
+        return list(get_db()[collection].find(_scoped({"category": {"$in": patterns}})).sort("date", -1))
+
+    def find_entries_by_event(self, collection: str, event_id: str) -> List[Dict]:
+        return list(get_db()[collection].find(_scoped({"event_id": event_id})).sort("date", -1))
+
+    def fingerprint_counts(self, collection: str, fingerprints: List[str]) -> Dict[str, int]:
+        rows = get_db()[collection].aggregate([
+            {"$match": _scoped({"fingerprint": {"$in": fingerprints}})},
+            {"$group": {"_id": "$fingerprint", "count": {"$sum": 1}}},
+        ])
+        return {r["_id"]: r["count"] for r in rows}
+
+    def used_idempotency_keys(self, collection: str, keys: List[str]) -> Set[str]:
+        return set(get_db()[collection].distinct("idempotency_key", _scoped({"idempotency_key": {"$in": keys}})))
+
+    def refresh_fingerprints(self, collection: str, start_date: datetime, end_date: datetime) -> int:
+        entries = get_db()[collection]
+        batch, changed = [], 0
+        for doc in entries.find(
+            _scoped({"date": {"$gte": start_date, "$lt": end_date}}),
+            {"date": 1, "category": 1, "description": 1, "amount": 1, "fingerprint": 1},
+        ):
+            fingerprint = entry_fingerprint(doc["date"], doc["category"], doc.get("description"), doc["amount"])
+            if doc.get("fingerprint") != fingerprint:
+                batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"fingerprint": fingerprint}}))
+            if len(batch) == _WRITE_BATCH_SIZE:
+                changed += entries.bulk_write(batch, ordered=False).modified_count
+                batch = []
+        if batch:
+            changed += entries.bulk_write(batch, ordered=False).modified_count
+        return changed
+
+    def update_entry(self, collection: str, entry_id: str, fields: Dict) -> bool:
+        result = get_db()[collection].update_one(_scoped({"_id": ObjectId(entry_id)}), {"$set": fields})
+        return result.modified_count > 0
+
+    def delete_entry(self, collection: str, entry_id: str) -> bool:
+        result = get_db()[collection].delete_one(_scoped({"_id": ObjectId(entry_id)}))
+        return result.deleted_count > 0
+
+    def find_and_update_entry(self, collection: str, entry_id: str, fields: Dict) -> Optional[Dict]:
+        return get_db()[collection].find_one_and_update(
+            _scoped({"_id": ObjectId(entry_id)}), {"$set": fields}, return_document=ReturnDocument.BEFORE
+        )
+
+    def find_and_delete_entry(self, collection: str, entry_id: str) -> Optional[Dict]:
+        return get_db()[collection].find_one_and_delete(_scoped({"_id": ObjectId(entry_id)}))
+
+    def _move(self, source: str, target: str, query: Dict) -> int:
+        # Copy with upserts before deleting, so a move interrupted without a
+        # transaction can simply be repeated
+        db = get_db()
+        moved = 0
+        while True:
+            docs = list(db[source].find(query).limit(_WRITE_BATCH_SIZE))
+            if not docs:
+                return moved
+            # Keys the target holds on other entries: those docs are duplicates, not copied
+            keys = [doc["idempotency_key"] for doc in docs if doc.get("idempotency_key")]
+            taken = set(db[target].distinct("idempotency_key", _scoped({
+                "idempotency_key": {"$in": keys}, "_id": {"$nin": [doc["_id"] for doc in docs]},
+            }))) if keys else set()
+            copies = [
+                ReplaceOne({"_id": doc["_id"]}, doc, upsert=True)
+                for doc in docs if doc.get("idempotency_key") not in taken
+            ]
+            ids = {"_id": {"$in": [doc["_id"] for doc in docs]}}
+            if self._supports_transactions():
+                with db.client.start_session() as session:
+                    with session.start_transaction():
+                        if copies:
+                            db[target].bulk_write(copies, session=session)
+                        db[source].delete_many(ids, session=session)
+            else:
+                if copies:
+                    db[target].bulk_write(copies)
+                db[source].delete_many(ids)
+            moved += len(docs)
+
+    def move_entries(self, source: str, target: str, before: datetime) -> int:
+        return self._move(source, target, _scoped({"date": {"$lt": before}}))
+
+    def move_entry(self, source: str, target: str, entry_id: str) -> bool:
+        return self._move(source, target, _scoped({"_id": ObjectId(entry_id)})) > 0
+
+    def total_amount(self, collection, start_date, end_date) -> float:
+        rows = list(_reader(collection)[collection].aggregate([
+            {"$match": _date_match(start_date, end_date)},
+            {"$group": {"_id": None, "total": {"$sum": "$amount"}}},
+        ]))
+        return float(rows[0]["total"]) if rows else 0.0
+
+    def category_totals(self, collection, start_date, end_date) -> Dict[str, float]:
+        rows = _reader(collection)[collection].aggregate([
+            {"$match": _date_match(start_date, end_date)},
+            {"$group": {"_id": "$category", "total": {"$sum": "$amount"}}},
+        ])
+        return {r["_id"]: float(r["total"]) for r in rows}
+
+    def daily_totals(self, collection, start_date, end_date) -> List[Tuple]:
+        rows = _reader(collection)[collection].aggregate([
+            {"$match": _date_match(start_date, end_date)},
+            {"$group": {
+                "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$date"}},
+                "total": {"$sum": "$amount"},
+            }},
+            {"$sort": {"_id": 1}},
+        ])
+        return [(datetime.strptime(r["_id"], "%Y-%m-%d").date(), float(r["total"])) for r in rows]
+
+    def period_totals(self, collection, start_date, end_date, unit) -> List[Tuple[datetime, float]]:
+        # One pass over the (ledger_id, date) index; needs MongoDB 5.0+ for $dateTrunc
+        rows = _reader(collection)[collection].aggregate([
+            {"$match": _date_match(start_date, end_date)},
+            {"$group": {
+                "_id": {"$dateTrunc": {"date": "$date", "unit": unit, "startOfWeek": "monday"}},
+                "total": {"$sum": "$amount"},
+            }},
+            {"$sort": {"_id": 1}},
+        ])
+        return [(r["_id"], float(r["total"])) for r in rows]
+
+    def category_period_totals(self, collection, start_date, end_date, unit) -> List[Tuple[datetime, str, float]]:
+        rows = _reader(collection)[collection].aggregate([
+            {"$match": _date_match(start_date, end_date)},
+            {"$group": {
+                "_id": {
+                    "p": {"$dateTrunc": {"date": "$date", "unit": unit, "startOfWeek": "monday"}},
+                    "c": "$category",
+                },
+                "total": {"$sum": "$amount"},
+            }},
+        ])
+        return [(r["_id"]["p"], r["_id"]["c"], float(r["total"])) for r in rows]
+
+    def running_totals(self, sources) -> List[Tuple]:
+        # One pipeline over every collection; needs MongoDB 5.0+ for $setWindowFields
+        branches = [
+            (collection, [
+                {"$match": _scoped()},
+                {"$project": {"_id": 0, "label": {"$literal": label}, "date": 1, "category": 1, "amount": 1}},
+            ])
+            for label, collections in sources.items()
+            for collection in collections
+        ]
+        (first, pipeline), rest = branches[0], branches[1:]
+        rows = _reader(*(collection for collection, _ in branches))[first].aggregate(pipeline + [
+            *({"$unionWith": {"coll": collection, "pipeline": branch}} for collection, branch in rest),
+            {"$group": {
+                "_id": {
+                    "day": {"$dateTrunc": {"date": "$date", "unit": "day"}},
+                    "label": "$label",
+                    "category": "$category",
+                },
+                "amount": {"$sum": "$amount"},
+            }},
+            {"$setWindowFields": {
+                "partitionBy": {"label": "$_id.label", "category": "$_id.category"},
+                "sortBy": {"_id.day": 1},
+                "output": {"category_total": {"$sum": "$amount", "window": {"documents": ["unbounded", "current"]}}},
+            }},
+            # A range window so every category's row on a day carries that day's full total
+            {"$setWindowFields": {
+                "partitionBy": "$_id.label",
+                "sortBy": {"_id.day": 1},
+                "output": {"label_total": {
+                    "$sum": "$amount", "window": {"range": ["unbounded", "current"], "unit": "day"},
+                }},
+            }},
+            {"$sort": {"_id.day": 1}},
+        ])
+        return [
+            (r["_id"]["day"].date(), r["_id"]["label"], r["_id"]["category"],
+             float(r["amount"]), float(r["category_total"]), float(r["label_total"]))
+            for r in rows
+        ]
+
+    def monthly_totals(self, collection: str, year: int) -> Dict[int, float]:
+        rows = _reader(collection)[collection].aggregate([
+            {"$match": _scoped({"date": {"$gte": datetime(year, 1, 1), "$lt": datetime(year + 1, 1, 1)}})},
+            {"$group": {"_id": {"$month": "$date"}, "total": {"$sum": "$amount"}}},
+        ])
+        return {r["_id"]: float(r["total"]) for r in rows}
+
+    def entry_year_months(self, collection: str) -> List[Tuple[int, int]]:
+        rows = _reader(collection)[collection].aggregate([
+            {"$match": _scoped({"date": {"$type": "date"}})},
+            {"$group": {"_id": {"y": {"$year": "$date"}, "m": {"$month": "$date"}}}},
+        ])
+        return [(r["_id"]["y"], r["_id"]["m"]) for r in rows]
+
+    def partition_stats(self, collection: str) -> Dict[Tuple[int, int], Tuple]:
+        rows = _reader(collection)[collection].aggregate([
+            {"$match": _scoped({"date": {"$type": "date"}})},
+            {"$group": {
+                "_id": {"y": {"$year": "$date"}, "m": {"$month": "$date"}},
+                "count": {"$sum": 1},
+                "total": {"$sum": "$amount"},
+                "last_updated": {"$max": "$updated_at"},
+            }},
+        ])
+        return {
+            (r["_id"]["y"], r["_id"]["m"]): (r["count"], float(r["total"]), r["last_updated"])
+            for r in rows
+        }
+
+    def changed_months(self, collection: str, since: datetime) -> List[Tuple[int, int]]:
+        rows = _reader(collection)[collection].aggregate([
+            {"$match": _scoped({"updated_at": {"$gte": since}})},
+            {"$group": {"_id": {"y": {"$year": "$date"}, "m": {"$month": "$date"}}}},
+        ])
+        return [(r["_id"]["y"], r["_id"]["m"]) for r in rows]
+
+    # ── Custom categories ─────────────────────────────────────────────────────
+
+    # One document per ledger in each kind's collection
+
+    def get_custom_categories(self, kind: str) -> List[str]:
+        doc = get_db()[kind].find_one(_scoped())
+        return list(doc.get("categories", [])) if doc else []
+
+    def add_custom_category(self, kind: str, name: str) -> None:
+        get_db()[kind].update_one(
+            _scoped(),
+            {"$addToSet": {"categories": name}},
+            upsert=True,
+        )
+
+    def remove_custom_category(self, kind: str, name: str) -> bool:
+        result = get_db()[kind].update_one(
+            _scoped(),
+            {"$pull": {"categories": name}},
+        )
+        return result.modified_count > 0
+
+    # ── Budgets and per-category month totals ───────────────────────────────
+
+    def get_budgets(self) -> Dict[str, float]:
+        return {d["category"]: float(d["amount"]) for d in get_db()[config.BUDGETS_COLLECTION].find(_scoped())}
+
+    def set_budget(self, category: str, amount: float) -> None:
+        get_db()[config.BUDGETS_COLLECTION].update_one(
+            _scoped({"category": category}), {"$set": {"amount": amount}}, upsert=True
+        )
+
+    def remove_budget(self, category: str) -> bool:
+        return get_db()[config.BUDGETS_COLLECTION].delete_one(_scoped({"category": category})).deleted_count > 0
+
+    def increment_category_month(self, year: int, month: int, category: str, delta: float) -> None:
+        get_db()[config.CATEGORY_MONTH_TOTALS_COLLECTION].update_one(
+            _scoped({"year": year, "month": month, "category": category}),
+            {"$inc": {"total": delta}},
+            upsert=True,
+        )
+
+    def get_category_month_totals(self, year: int, month: int) -> Dict[str, float]:
+        rows = get_db()[config.CATEGORY_MONTH_TOTALS_COLLECTION].find(
+            _scoped({"year": year, "month": month}), {"_id": 0, "category": 1, "total": 1}
+        )
+        return {r["category"]: float(r["total"]) for r in rows}
+
+    def rebuild_category_month_totals(self, collections: List[str], year: Optional[int] = None) -> None:
+        db = get_db()
+        totals = db[config.CATEGORY_MONTH_TOTALS_COLLECTION]
+        match = {"$type": "date"}
+        if year is not None:
+            match.update({"$gte": datetime(year, 1, 1), "$lt": datetime(year + 1, 1, 1)})
+
+        def rebuild(session=None) -> None:
+            sums: Dict[Tuple[int, int, str], float] = {}
+            for collection in collections:
+                rows = db[collection].aggregate([
+                    {"$match": _scoped({"date": match})},
+                    {"$group": {
+                        "_id": {"y": {"$year": "$date"}, "m": {"$month": "$date"}, "c": "$category"},
+                        "total": {"$sum": "$amount"},
+                    }},
+                ], session=session)
+                for r in rows:
+                    key = (r["_id"]["y"], r["_id"]["m"], r["_id"]["c"])
+                    sums[key] = sums.get(key, 0.0) + float(r["total"])
+            # Each total is replaced in place rather than deleted and
+            # re-inserted, so a concurrent $inc never finds it missing
+            stale = [
+                DeleteOne({"_id": doc["_id"]})
+                for doc in totals.find(
+                    _scoped({"year": year}) if year is not None else _scoped(),
+                    {"year": 1, "month": 1, "category": 1},
+                    session=session,
+                )
+                if (doc["year"], doc["month"], doc["category"]) not in sums
+            ]
+            replaced = [
+                ReplaceOne(
+                    _scoped({"year": y, "month": m, "category": c}),
+                    _scoped({"year": y, "month": m, "category": c, "total": total}),
+                    upsert=True,
+                )
+                for (y, m, c), total in sums.items()
+            ]
+            if stale or replaced:
+                totals.bulk_write([*stale, *replaced], ordered=False, session=session)
+
+        if self._supports_transactions():
+            # Reads a snapshot and writes it atomically: an $inc that lands
+            # meanwhile conflicts with it and one of the two is retried
+            with db.client.start_session() as session:
+                session.with_transaction(rebuild)
+        else:
+            rebuild()
+
+    # ── Holding values ────────────────────────────────────────────────────────
+
+    def get_holding_values(self) -> List[Dict]:
+        return list(get_db()[config.HOLDING_VALUES_COLLECTION].find(
+            _scoped(), {"_id": 0, "category": 1, "description": 1, "value": 1, "as_of": 1}
+        ))
+
+    def set_holding_value(self, category: str, description: str, value: float, as_of: datetime) -> None:
+        get_db()[config.HOLDING_VALUES_COLLECTION].update_one(
+            _scoped({"category": category, "description": description}),
+            {"$set": {"value": value, "as_of": as_of}},
+            upsert=True,
+        )
+
+    def remove_holding_value(self, category: str, description: str) -> bool:
+        return get_db()[config.HOLDING_VALUES_COLLECTION].delete_one(
+            _scoped({"category": category, "description": description})
+        ).deleted_count > 0
+
+    # ── Ledgers ───────────────────────────────────────────────────────────────
+
+    def find_ledgers(self, user_id: Optional[str] = None) -> List[Dict]:
+        query = {"user_id": user_id} if user_id is not None else {}
+        return list(get_db()[config.LEDGERS_COLLECTION].find(query).sort("name", 1))
+
+    def insert_ledger(self, ledger_id: str, name: str, user_id: str) -> bool:
+        try:
+            get_db()[config.LEDGERS_COLLECTION].insert_one(
+                {"_id": ledger_id, "name": name, "user_id": user_id, "created_at": datetime.now()}
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def set_ledger_owner(self, ledger_id: str, user_id: str) -> bool:
+        result = get_db()[config.LEDGERS_COLLECTION].update_one({"_id": ledger_id}, {"$set": {"user_id": user_id}})
+        return result.matched_count > 0
+
+    # ── Users ─────────────────────────────────────────────────────────────────
+
+    def find_user(self, user_id: str) -> Optional[Dict]:
+        return get_db()[config.USERS_COLLECTION].find_one({"_id": user_id})
+
+    def insert_user(self, user_id: str, password_hash: str) -> bool:
+        try:
+            get_db()[config.USERS_COLLECTION].insert_one(
+                {"_id": user_id, "password_hash": password_hash, "created_at": datetime.now()}
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    # ── Schema and metadata ───────────────────────────────────────────────────
+
+    def ensure_schema(self) -> None:
+        DatabaseConnection().create_indexes()
+
+    def get_meta(self, key: str):
+        doc = get_db()[config.META_COLLECTION].find_one({"_id": key})
+        return doc.get("value") if doc else None
+
+    def set_meta(self, key: str, value) -> None:
+        get_db()[config.META_COLLECTION].update_one({"_id": key}, {"$set": {"value": value}}, upsert=True)
+
+    # ── Recurring events ──────────────────────────────────────────────────────
+
+    def insert_event(self, doc: Dict) -> str:
+        return str(get_db()[config.EVENTS_COLLECTION].insert_one({**doc, "ledger_id": current_ledger()}).inserted_id)
+
+    def find_events(self, active_only: bool = False) -> List[Dict]:
+        query = _scoped({"is_active": True} if active_only else {})
+        return list(get_db()[config.EVENTS_COLLECTION].find(query).sort("day_of_month", 1))
+
+    def find_due_events(self, now: datetime) -> List[Dict]:
+        return list(
+            get_db()[config.EVENTS_COLLECTION]
+            .find(_scoped({"is_active": True, "next_due_at": {"$lte": now}}))
+            .sort("next_due_at", 1)
+        )
+
+    def find_events_without_next_due(self) -> List[Dict]:
+        return list(get_db()[config.EVENTS_COLLECTION].find(_scoped({"next_due_at": None})))
+
+    def get_event(self, event_id: str) -> Optional[Dict]:
+        return get_db()[config.EVENTS_COLLECTION].find_one(_scoped({"_id": ObjectId(event_id)}))
+
+    def update_event(self, event_id: str, fields: Dict) -> bool:
+        result = get_db()[config.EVENTS_COLLECTION].update_one(
+            _scoped({"_id": ObjectId(event_id)}), {"$set": fields}
+        )
+        return result.modified_count > 0
+
+    def delete_event(self, event_id: str) -> bool:
+        result = get_db()[config.EVENTS_COLLECTION].delete_one(_scoped({"_id": ObjectId(event_id)}))
+        return result.deleted_count > 0
+
+    def advance_event(self, event_id: str, expected_next_due: Optional[datetime], fields: Dict) -> bool:
+        result = get_db()[config.EVENTS_COLLECTION].update_one(
+            _scoped({"_id": ObjectId(event_id), "next_due_at": expected_next_due}), {"$set": fields}
+        )
+        return result.matched_count > 0
+
+    # ── Event executions ──────────────────────────────────────────────────────
+
+    def find_execution(self, key: str) -> Optional[Dict]:
+        return get_db()[config.EXECUTIONS_COLLECTION].find_one(_scoped({"key": key}))
+
+    def _supports_transactions(self) -> bool:
+        # Multi-document transactions need a replica set or sharded cluster
+        if self._transactions is None:
+            try:
+                hello = get_db().command("hello")
+            except Exception:
+                # Probe again next time rather than remember a transient failure
+                return False
+            self._transactions = bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+        return self._transactions
+
+    def insert_entry_with_execution(self, collection: str, doc: Dict, key: str, execution: Dict) -> Optional[str]:
+        db = get_db()
+        doc = {"_id": ObjectId(), **doc, "ledger_id": current_ledger()}
+        record = {"key": key, **execution, "expense_id": str(doc["_id"]), "ledger_id": current_ledger()}
+
+        if self._supports_transactions():
+            def claim_and_insert(session) -> bool:
+                try:
+                    db[config.EXECUTIONS_COLLECTION].insert_one(record, session=session)
+                except DuplicateKeyError:
+                    session.abort_transaction()
+                    return False
+                db[collection].insert_one(doc, session=session)
+                return True
+
+            # Two schedulers claiming the same key at once: the loser gets a
+            # WriteConflict labelled TransientTransactionError, which
+            # with_transaction retries until it sees the winner's key
+            try:
+                with db.client.start_session() as session:
+                    claimed = session.with_transaction(claim_and_insert)
+            except OperationFailure as e:
+                if e.has_error_label("TransientTransactionError") and self.find_execution(key):
+                    return None
+                raise
+            return str(doc["_id"]) if claimed else None
+
+        # Standalone server: claim first, then compensate if the entry insert fails.
+        # The unique index on key makes the claim atomic either way.
+        try:
+            db[config.EXECUTIONS_COLLECTION].insert_one(record)
+        except DuplicateKeyError:
+            return None
+        try:
+            db[collection].insert_one(doc)
+        except Exception:
+            db[config.EXECUTIONS_COLLECTION].delete_one(_scoped({"key": key}))
+            raise
+        return str(doc["_id"])
+
+    def find_executions(self, event_id: str) -> List[Dict]:
+        return list(
+            get_db()[config.EXECUTIONS_COLLECTION].find(_scoped({"event_id": event_id})).sort("executed_at", -1)
+        )
+
+    def delete_executions(self, event_id: str) -> None:
+        get_db()[config.EXECUTIONS_COLLECTION].delete_many(_scoped({"event_id": event_id}))
@@ -0,0 +1,47 @@
+"""
+Routing of analytical reads to replica-set secondaries
+"""
+import contextlib
+import contextvars
+import time
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+import config
+from database.cache import add_invalidation_listener
+
+
+_analytics: contextvars.ContextVar[bool] = contextvars.ContextVar("analytics_reads", default=False)
+
+# Last write to each collection seen by this process: its own writes, and other
+# processes' when the change-stream watcher is running
+_last_write: Dict[str, float] = {}
+
+# Archive tiers are only written through their hot collection's models
+_HOT_COLLECTION = {archive: hot for hot, archive in config.ARCHIVE_COLLECTIONS.items()}
+
+
+def _note_write(collection: str, months: Optional[Iterable[Tuple[int, int]]] = None) -> None:
+    _last_write[collection] = time.monotonic()
+
+
+add_invalidation_listener(_note_write)
+
+
+@contextlib.contextmanager
+def analytics_reads() -> Iterator[None]:
+    """Mark the reads inside as analytical (dashboards, exports): they may be
+    served by a secondary up to ANALYTICS_MAX_STALENESS_SECONDS behind"""
+    token = _analytics.set(True)
+    try:
+        yield
+    finally:
+        _analytics.reset(token)
+
+
+def reads_from_secondary(*collections: str) -> bool:
+    """Whether reads of `collections` may go to a secondary: only inside
+    analytics_reads(), and only if none of them was written within the
+    staleness bound, so a session always reads its own writes"""
+    if not config.ANALYTICS_READS_FROM_SECONDARIES or not _analytics.get():
+        return False
+    cutoff = time.monotonic() - config.ANALYTICS_MAX_STALENESS_SECONDS
+    return all(_last_write.get(_HOT_COLLECTION.get(c, c), float("-inf")) < cutoff for c in collections)
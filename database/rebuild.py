@@ -0,0 +1,81 @@
+"""
+Full rebuild of a ledger's derived data, spread over worker processes by year
+"""
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from itertools import repeat
+from typing import Dict, List, Optional, Tuple
+from database.analytics_engine import get_analytics_engine
+from database.backend import get_backend
+from database.budget_model import BudgetModel
+from database.cache import invalidate
+from database.ledger import ledger_scope
+from database.tiers import LedgerTiers
+import config
+
+
+_COLLECTIONS = (config.EXPENSES_COLLECTION, config.INVESTMENTS_COLLECTION)
+
+
+def _rebuild_year(ledger_id: str, year: int, snapshot_months: Dict[str, List[int]]) -> Tuple[int, bool]:
+    """One year of one ledger: entry fingerprints, budget month totals and the
+    year's dashboard snapshot months. Runs in a worker process, which opens
+    its own database connection; returns (fingerprints changed, totals ok)."""
+    start, end = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+    with ledger_scope(ledger_id):
+        backend = get_backend()
+        changed = sum(
+            backend.refresh_fingerprints(tier, start, end)
+            for collection in _COLLECTIONS
+            for tier in (collection, config.ARCHIVE_COLLECTIONS[collection])
+        )
+        totals_ok = BudgetModel.rebuild_totals(year)
+        engine = get_analytics_engine()
+        if engine:
+            for collection, months in snapshot_months.items():
+                engine.write_months(collection, year, months)
+    return changed, totals_ok
+
+
+def rebuild_ledger(ledger_id: str, executor: Optional[Executor] = None) -> Dict[str, int]:
+    """Archive closed years, then recompute every year of the ledger's
+    fingerprints, budget totals and dashboard snapshots, one task per year on
+    `executor` (in this process without one). Years without entries keep
+    whatever budget totals they have."""
+    with ledger_scope(ledger_id):
+        archived = LedgerTiers.archive_closed_years()
+        engine = get_analytics_engine()
+        stats = {collection: engine.clear(collection) for collection in _COLLECTIONS} if engine else {}
+        years = sorted({year for collection in _COLLECTIONS for year, _ in LedgerTiers.entry_year_months(collection)})
+        snapshot_months = [
+            {
+                collection: [int(ym[5:7]) for ym in months if int(ym[:4]) == year]
+                for collection, months in stats.items()
+            }
+            for year in years
+        ]
+
+        run = executor.map if executor else map
+        results = list(run(_rebuild_year, repeat(ledger_id), years, snapshot_months))
+
+        for collection, months in stats.items():
+            engine.publish(collection, months)
+        failed = sum(not totals_ok for _, totals_ok in results)
+        if not failed:
+            BudgetModel.mark_totals_built()
+        for collection in _COLLECTIONS:
+            invalidate(collection)
+    return {
+        "archived": archived,
+        "years": len(years),
+        "fingerprints": sum(changed for changed, _ in results),
+        "snapshot_months": sum(len(months) for months in stats.values()),
+        "failed_years": failed,
+    }
+
+
+def rebuild_ledgers(ledger_ids: List[str], workers: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+    """Rebuild each ledger in turn, its years in parallel on a process pool
+    (REBUILD_WORKERS processes, every core by default)"""
+    with ProcessPoolExecutor(max_workers=workers or config.REBUILD_WORKERS or None) as pool:
+        return {ledger_id: rebuild_ledger(ledger_id, pool) for ledger_id in ledger_ids}
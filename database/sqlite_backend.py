@@ -0,0 +1,771 @@
+"""
+Embedded SQLite implementation of the storage backend
+"""
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import date, datetime
+from typing import Dict, List, Optional, Set, Tuple
+import config
+from database.backend import StorageBackend
+from database.ledger import current_ledger
+from utils.fingerprint import entry_fingerprint
+
+
+_LEDGER_TABLES = (
+    config.EXPENSES_COLLECTION,
+    config.INVESTMENTS_COLLECTION,
+    *config.ARCHIVE_COLLECTIONS.values(),
+)
+
+_SCHEMA = [
+    *[
+        stmt
+        for table in _LEDGER_TABLES
+        for stmt in (
+            f"""CREATE TABLE IF NOT EXISTS {table} (
+                _id TEXT PRIMARY KEY,
+                ledger_id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                category TEXT NOT NULL,
+                description TEXT NOT NULL DEFAULT '',
+                amount REAL NOT NULL,
+                event_id TEXT,
+                execution_key TEXT,
+                fingerprint TEXT,
+                idempotency_key TEXT,
+                created_at TEXT,
+                updated_at TEXT
+            )""",
+        )
+    ],
+    """CREATE TABLE IF NOT EXISTS custom_categories (
+        ledger_id TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        name TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        PRIMARY KEY (ledger_id, kind, name)
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS {config.EVENTS_COLLECTION} (
+        _id TEXT PRIMARY KEY,
+        ledger_id TEXT NOT NULL,
+        title TEXT NOT NULL,
+        category TEXT NOT NULL,
+        amount REAL NOT NULL,
+        day_of_month INTEGER NOT NULL,
+        description TEXT NOT NULL DEFAULT '',
+        is_active INTEGER NOT NULL DEFAULT 1,
+        event_type TEXT NOT NULL DEFAULT 'expense',
+        frequency TEXT NOT NULL DEFAULT 'monthly',
+        next_due_at TEXT,
+        last_executed_at TEXT,
+        created_at TEXT,
+        updated_at TEXT
+    )""",
+    # One execution record per ledger and event period; inserting it is the scheduler's claim
+    f"""CREATE TABLE IF NOT EXISTS {config.EXECUTIONS_COLLECTION} (
+        ledger_id TEXT NOT NULL,
+        key TEXT NOT NULL,
+        event_id TEXT NOT NULL,
+        year INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        day INTEGER,
+        executed_at TEXT,
+        expense_id TEXT,
+        PRIMARY KEY (ledger_id, key)
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS {config.BUDGETS_COLLECTION} (
+        ledger_id TEXT NOT NULL,
+        category TEXT NOT NULL,
+        amount REAL NOT NULL,
+        PRIMARY KEY (ledger_id, category)
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS {config.CATEGORY_MONTH_TOTALS_COLLECTION} (
+        ledger_id TEXT NOT NULL,
+        year INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        total REAL NOT NULL,
+        PRIMARY KEY (ledger_id, year, month, category)
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS {config.HOLDING_VALUES_COLLECTION} (
+        ledger_id TEXT NOT NULL,
+        category TEXT NOT NULL,
+        description TEXT NOT NULL,
+        value REAL NOT NULL,
+        as_of TEXT NOT NULL,
+        PRIMARY KEY (ledger_id, category, description)
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS {config.LEDGERS_COLLECTION} (
+        _id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        created_at TEXT
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS {config.USERS_COLLECTION} (
+        _id TEXT PRIMARY KEY,
+        password_hash TEXT NOT NULL,
+        created_at TEXT
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS {config.META_COLLECTION} (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )""",
+]
+
+# Every index leads with ledger_id so a tenant's queries only touch its slice
+_INDEXES = [
+    *[
+        stmt
+        for table in _LEDGER_TABLES
+        for stmt in (
+            # _id breaks date ties, so pages of find_entries are index range scans
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_ledger_date_id ON {table} (ledger_id, date DESC, _id DESC)",
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_ledger_category_date_id ON {table} "
+            "(ledger_id, category, date DESC, _id DESC)",
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_ledger_event ON {table} (ledger_id, event_id)",
+            # Duplicate detection: fingerprint probes and one entry per idempotency key
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_ledger_fingerprint ON {table} (ledger_id, fingerprint)",
+            f"CREATE UNIQUE INDEX IF NOT EXISTS ux_{table}_ledger_idempotency_key ON {table} "
+            "(ledger_id, idempotency_key) WHERE idempotency_key IS NOT NULL",
+            # Months changed since the last dashboard snapshot refresh
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_ledger_updated ON {table} (ledger_id, updated_at)",
+        )
+    ],
+    f"CREATE INDEX IF NOT EXISTS ix_events_ledger_active_due ON {config.EVENTS_COLLECTION} "
+    "(ledger_id, is_active, next_due_at)",
+    f"CREATE INDEX IF NOT EXISTS ix_executions_ledger_event ON {config.EXECUTIONS_COLLECTION} "
+    "(ledger_id, event_id, executed_at DESC)",
+    # The ledger list of the signed-in user
+    f"CREATE INDEX IF NOT EXISTS ix_ledgers_user_name ON {config.LEDGERS_COLLECTION} (user_id, name)",
+]
+
+# Columns holding datetimes, stored as ISO-8601 text so range scans stay index-ordered
+_DATETIME_COLUMNS = {"date", "created_at", "updated_at", "executed_at", "next_due_at", "last_executed_at", "as_of"}
+_BOOL_COLUMNS = {"is_active"}
+
+
+def _to_sql(column: str, value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time()).isoformat(sep=" ")
+    if column in _BOOL_COLUMNS and value is not None:
+        return int(bool(value))
+    return value
+
+
+def _from_row(row: sqlite3.Row) -> Dict:
+    doc = {}
+    for column in row.keys():
+        value = row[column]
+        if value is not None and column in _DATETIME_COLUMNS:
+            value = datetime.fromisoformat(value)
+        elif value is not None and column in _BOOL_COLUMNS:
+            value = bool(value)
+        doc[column] = value
+    return doc
+
+
+def _date_where(start_date: Optional[datetime], end_date: Optional[datetime]) -> Tuple[List[str], List]:
+    clauses, params = ["ledger_id = ?"], [current_ledger()]
+    if start_date:
+        clauses.append("date >= ?")
+        params.append(_to_sql("date", start_date))
+    if end_date:
+        clauses.append("date <= ?")
+        params.append(_to_sql("date", end_date))
+    return clauses, params
+
+
+def _insert_sql(table: str, doc: Dict, verb: str = "INSERT") -> Tuple[str, List]:
+    columns = list(doc)
+    return (
+        f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+        [_to_sql(c, doc[c]) for c in columns],
+    )
+
+
+# First day of the period containing `date`, as ISO text ("weekday 0" is the next Sunday)
+_PERIOD_START_SQL = {
+    "day": "substr(date, 1, 10)",
+    "week": "date(date, 'weekday 0', '-6 days')",
+    "month": "substr(date, 1, 7) || '-01'",
+    "quarter": "substr(date, 1, 5) || printf('%02d', (CAST(substr(date, 6, 2) AS INTEGER) - 1) / 3 * 3 + 1) || '-01'",
+}
+
+
+def _where_sql(clauses: List[str]) -> str:
+    return f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+
+class SQLiteBackend(StorageBackend):
+    """Single-file database with one connection per thread (Streamlit runs
+    each session on its own thread) and per process."""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._local = threading.local()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._forget_connections)
+        self.ensure_schema()
+
+    def _forget_connections(self) -> None:
+        # A forked child must not use the parent's connections; it opens its own on first use
+        self._local = threading.local()
+
+    def ensure_schema(self) -> None:
+        with self._conn() as conn:
+            for stmt in _SCHEMA:
+                conn.execute(stmt)
+            for stmt in _INDEXES:
+                conn.execute(stmt)
+            conn.execute(
+                f"INSERT OR IGNORE INTO {config.LEDGERS_COLLECTION} (_id, name, user_id, created_at) VALUES (?, ?, ?, ?)",
+                (
+                    config.DEFAULT_LEDGER_ID,
+                    config.DEFAULT_LEDGER_ID.capitalize(),
+                    config.DEFAULT_USER_ID,
+                    _to_sql("created_at", datetime.now()),
+                ),
+            )
+
+    @staticmethod
+    def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+        return [row["name"] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.create_function("entry_fingerprint", 4, entry_fingerprint, deterministic=True)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _query(self, sql: str, params=()) -> List[Dict]:
+        return [_from_row(row) for row in self._conn().execute(sql, params)]
+
+    def _insert(self, table: str, doc: Dict) -> str:
+        doc = {"_id": uuid.uuid4().hex, **doc, "ledger_id": current_ledger()}
+        with self._conn() as conn:
+            conn.execute(*_insert_sql(table, doc))
+        return doc["_id"]
+
+    def _insert_many(self, table: str, docs: List[Dict]) -> List[str]:
+        if not docs:
+            return []
+        ledger_id = current_ledger()
+        docs = [{"_id": uuid.uuid4().hex, **doc, "ledger_id": ledger_id} for doc in docs]
+        columns = list(dict.fromkeys(column for doc in docs for column in doc))
+        with self._conn() as conn:
+            conn.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                [[_to_sql(c, doc.get(c)) for c in columns] for doc in docs],
+            )
+        return [doc["_id"] for doc in docs]
+
+    def _update(self, table: str, doc_id: str, fields: Dict) -> bool:
+        columns = list(fields)
+        with self._conn() as conn:
+            cursor = conn.execute(
+                f"UPDATE {table} SET {', '.join(f'{c} = ?' for c in columns)} WHERE ledger_id = ? AND _id = ?",
+                [_to_sql(c, fields[c]) for c in columns] + [current_ledger(), doc_id],
+            )
+        return cursor.rowcount > 0
+
+    def _delete(self, table: str, doc_id: str) -> bool:
+        with self._conn() as conn:
+            cursor = conn.execute(f"DELETE FROM {table} WHERE ledger_id = ? AND _id = ?", (current_ledger(), doc_id))
+        return cursor.rowcount > 0
+
+    # ── Ledger entries ────────────────────────────────────────────────────────
+
+    def insert_entry(self, collection: str, doc: Dict) -> Optional[str]:
+        if doc.get("idempotency_key") is None:
+            return self._insert(collection, doc)
+        doc = {"_id": uuid.uuid4().hex, **doc, "ledger_id": current_ledger()}
+        sql, params = _insert_sql(collection, doc)
+        with self._conn() as conn:
+            # Unlike OR IGNORE, this only skips uniqueness conflicts
+            cursor = conn.execute(f"{sql} ON CONFLICT DO NOTHING", params)
+        return doc["_id"] if cursor.rowcount else None
+
+    def insert_entries(self, collection: str, docs: List[Dict]) -> List[Optional[str]]:
+        if all(doc.get("idempotency_key") is None for doc in docs):
+            return self._insert_many(collection, docs)
+        ledger_id = current_ledger()
+        ids = []
+        with self._conn() as conn:
+            for doc in docs:
+                doc = {"_id": uuid.uuid4().hex, **doc, "ledger_id": ledger_id}
+                sql, params = _insert_sql(collection, doc)
+                cursor = conn.execute(f"{sql} ON CONFLICT DO NOTHING", params)
+                ids.append(doc["_id"] if cursor.rowcount else None)
+        return ids
+
+    def find_entries(
+        self, collection, start_date=None, end_date=None, category=None, limit=None, before=None
+    ) -> List[Dict]:
+        clauses, params = _date_where(start_date, end_date)
+        if category:
+            clauses.append("category = ?")
+            params.append(category)
+        if before:
+            clauses.append("(date, _id) < (?, ?)")
+            params.extend([_to_sql("date", before[0]), before[1]])
+        return self._query(
+            f"SELECT * FROM {collection}{_where_sql(clauses)} ORDER BY date DESC, _id DESC LIMIT ?",
+            [*params, limit or -1],
+        )
+
+    def find_entries_by_categories(self, collection: str, categories: List[str]) -> List[Dict]:
+        if not categories:
+            return []
+        placeholders = ", ".join("?" for _ in categories)
+        return self._query(
+            f"SELECT * FROM {collection} WHERE ledger_id = ? AND category COLLATE NOCASE IN ({placeholders}) "
+            "ORDER BY date DESC",
+            [current_ledger(), *categories],
+        )
+
+    def find_entries_by_event(self, collection: str, event_id: str) -> List[Dict]:
+        return self._query(
+            f"SELECT * FROM {collection} WHERE ledger_id = ? AND event_id = ? ORDER BY date DESC",
+            (current_ledger(), event_id),
+        )
+
+    def fingerprint_counts(self, collection: str, fingerprints: List[str]) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        # Chunked to stay under SQLite's bound-parameter limit
+        for i in range(0, len(fingerprints), 500):
+            chunk = fingerprints[i:i + 500]
+            rows = self._conn().execute(
+                f"SELECT fingerprint, COUNT(*) FROM {collection} "
+                f"WHERE ledger_id = ? AND fingerprint IN ({', '.join('?' for _ in chunk)}) GROUP BY fingerprint",
+                [current_ledger(), *chunk],
+            )
+            counts.update(rows)
+        return counts
+
+    def used_idempotency_keys(self, collection: str, keys: List[str]) -> Set[str]:
+        used: Set[str] = set()
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = self._conn().execute(
+                f"SELECT idempotency_key FROM {collection} "
+                f"WHERE ledger_id = ? AND idempotency_key IN ({', '.join('?' for _ in chunk)})",
+                [current_ledger(), *chunk],
+            )
+            used.update(key for key, in rows)
+        return used
+
+    def refresh_fingerprints(self, collection: str, start_date: datetime, end_date: datetime) -> int:
+        fingerprint = "entry_fingerprint(date, category, description, amount)"
+        with self._conn() as conn:
+            cursor = conn.execute(
+                f"UPDATE {collection} SET fingerprint = {fingerprint} "
+                f"WHERE ledger_id = ? AND date >= ? AND date < ? AND fingerprint IS NOT {fingerprint}",
+                (current_ledger(), _to_sql("date", start_date), _to_sql("date", end_date)),
+            )
+            return cursor.rowcount
+
+    def update_entry(self, collection: str, entry_id: str, fields: Dict) -> bool:
+        return self._update(collection, entry_id, fields)
+
+    def delete_entry(self, collection: str, entry_id: str) -> bool:
+        return self._delete(collection, entry_id)
+
+    def find_and_update_entry(self, collection: str, entry_id: str, fields: Dict) -> Optional[Dict]:
+        columns = list(fields)
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = [_from_row(r) for r in conn.execute(
+                f"SELECT * FROM {collection} WHERE ledger_id = ? AND _id = ?", (current_ledger(), entry_id)
+            )]
+            if rows:
+                conn.execute(
+                    f"UPDATE {collection} SET {', '.join(f'{c} = ?' for c in columns)} WHERE _id = ?",
+                    [_to_sql(c, fields[c]) for c in columns] + [entry_id],
+                )
+        return rows[0] if rows else None
+
+    def find_and_delete_entry(self, collection: str, entry_id: str) -> Optional[Dict]:
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = [_from_row(r) for r in conn.execute(
+                f"SELECT * FROM {collection} WHERE ledger_id = ? AND _id = ?", (current_ledger(), entry_id)
+            )]
+            if rows:
+                conn.execute(f"DELETE FROM {collection} WHERE _id = ?", (entry_id,))
+        return rows[0] if rows else None
+
+    def _move(self, source: str, target: str, where: str, params: List) -> int:
+        with self._conn() as conn:
+            columns = ", ".join(self._columns(conn, source))
+            # An entry whose idempotency_key the target already holds is a
+            # duplicate: it isn't copied, and is deleted from the source below
+            conn.execute(
+                f"INSERT INTO {target} ({columns}) SELECT {columns} FROM {source} WHERE {where} "
+                "ON CONFLICT DO NOTHING",
+                params,
+            )
+            cursor = conn.execute(f"DELETE FROM {source} WHERE {where}", params)
+        return cursor.rowcount
+
+    def move_entries(self, source: str, target: str, before: datetime) -> int:
+        return self._move(source, target, "ledger_id = ? AND date < ?", [current_ledger(), _to_sql("date", before)])
+
+    def move_entry(self, source: str, target: str, entry_id: str) -> bool:
+        return self._move(source, target, "ledger_id = ? AND _id = ?", [current_ledger(), entry_id]) > 0
+
+    def total_amount(self, collection, start_date, end_date) -> float:
+        clauses, params = _date_where(start_date, end_date)
+        row = self._conn().execute(
+            f"SELECT COALESCE(SUM(amount), 0) FROM {collection}{_where_sql(clauses)}", params
+        ).fetchone()
+        return float(row[0])
+
+    def category_totals(self, collection, start_date, end_date) -> Dict[str, float]:
+        clauses, params = _date_where(start_date, end_date)
+        rows = self._conn().execute(
+            f"SELECT category, SUM(amount) FROM {collection}{_where_sql(clauses)} GROUP BY category",
+            params,
+        )
+        return {category: float(total) for category, total in rows}
+
+    def daily_totals(self, collection, start_date, end_date) -> List[Tuple[date, float]]:
+        clauses, params = _date_where(start_date, end_date)
+        rows = self._conn().execute(
+            f"SELECT substr(date, 1, 10) AS day, SUM(amount) FROM {collection}{_where_sql(clauses)} "
+            "GROUP BY day ORDER BY day",
+            params,
+        )
+        return [(date.fromisoformat(day), float(total)) for day, total in rows]
+
+    def period_totals(self, collection, start_date, end_date, unit) -> List[Tuple[datetime, float]]:
+        clauses, params = _date_where(start_date, end_date)
+        rows = self._conn().execute(
+            f"SELECT {_PERIOD_START_SQL[unit]} AS period, SUM(amount) FROM {collection}{_where_sql(clauses)} "
+            "GROUP BY period ORDER BY period",
+            params,
+        )
+        return [(datetime.fromisoformat(period), float(total)) for period, total in rows]
+
+    def category_period_totals(self, collection, start_date, end_date, unit) -> List[Tuple[datetime, str, float]]:
+        clauses, params = _date_where(start_date, end_date)
+        rows = self._conn().execute(
+            f"SELECT {_PERIOD_START_SQL[unit]} AS period, category, SUM(amount) "
+            f"FROM {collection}{_where_sql(clauses)} GROUP BY period, category",
+            params,
+        )
+        return [(datetime.fromisoformat(period), category, float(total)) for period, category, total in rows]
+
+    def running_totals(self, sources) -> List[Tuple[date, str, str, float, float, float]]:
+        branches, params = [], []
+        for label, collections in sources.items():
+            for collection in collections:
+                branches.append(
+                    f"SELECT ? AS label, substr(date, 1, 10) AS day, category, amount FROM {collection} WHERE ledger_id = ?"
+                )
+                params += [label, current_ledger()]
+        # The default RANGE frame includes the day's other categories in the label total
+        rows = self._conn().execute(
+            "SELECT day, label, category, SUM(amount), "
+            "SUM(SUM(amount)) OVER (PARTITION BY label, category ORDER BY day), "
+            "SUM(SUM(amount)) OVER (PARTITION BY label ORDER BY day) "
+            f"FROM ({' UNION ALL '.join(branches)}) GROUP BY day, label, category ORDER BY day, label, category",
+            params,
+        )
+        return [
+            (date.fromisoformat(day), label, category, float(amount), float(category_total), float(label_total))
+            for day, label, category, amount, category_total, label_total in rows
+        ]
+
+    def monthly_totals(self, collection: str, year: int) -> Dict[int, float]:
+        clauses, params = _date_where(datetime(year, 1, 1), None)
+        clauses.append("date < ?")
+        params.append(_to_sql("date", datetime(year + 1, 1, 1)))
+        rows = self._conn().execute(
+            f"SELECT CAST(substr(date, 6, 2) AS INTEGER) AS month, SUM(amount) "
+            f"FROM {collection}{_where_sql(clauses)} GROUP BY month",
+            params,
+        )
+        return {month: float(total) for month, total in rows}
+
+    def entry_year_months(self, collection: str) -> List[Tuple[int, int]]:
+        rows = self._conn().execute(
+            f"SELECT DISTINCT substr(date, 1, 7) FROM {collection} WHERE ledger_id = ?", (current_ledger(),)
+        )
+        return [(int(ym[:4]), int(ym[5:7])) for (ym,) in rows]
+
+    def partition_stats(self, collection: str) -> Dict[Tuple[int, int], Tuple]:
+        rows = self._conn().execute(
+            f"SELECT substr(date, 1, 7) AS ym, COUNT(*), SUM(amount), MAX(updated_at) "
+            f"FROM {collection} WHERE ledger_id = ? GROUP BY ym",
+            (current_ledger(),),
+        )
+        return {
+            (int(ym[:4]), int(ym[5:7])): (
+                count, float(total), datetime.fromisoformat(last) if last else None,
+            )
+            for ym, count, total, last in rows
+        }
+
+    def changed_months(self, collection: str, since: datetime) -> List[Tuple[int, int]]:
+        rows = self._conn().execute(
+            f"SELECT DISTINCT substr(date, 1, 7) FROM {collection} WHERE ledger_id = ? AND updated_at >= ?",
+            (current_ledger(), _to_sql("updated_at", since)),
+        )
+        return [(int(ym[:4]), int(ym[5:7])) for (ym,) in rows]
+
+    # ── Custom categories ─────────────────────────────────────────────────────
+
+    def get_custom_categories(self, kind: str) -> List[str]:
+        rows = self._conn().execute(
+            "SELECT name FROM custom_categories WHERE ledger_id = ? AND kind = ? ORDER BY position",
+            (current_ledger(), kind),
+        )
+        return [name for (name,) in rows]
+
+    def add_custom_category(self, kind: str, name: str) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO custom_categories (ledger_id, kind, name, position) "
+                "SELECT ?, ?, ?, COALESCE(MAX(position), 0) + 1 FROM custom_categories "
+                "WHERE ledger_id = ? AND kind = ?",
+                (current_ledger(), kind, name, current_ledger(), kind),
+            )
+
+    def remove_custom_category(self, kind: str, name: str) -> bool:
+        with self._conn() as conn:
+            cursor = conn.execute(
+                "DELETE FROM custom_categories WHERE ledger_id = ? AND kind = ? AND name = ?",
+                (current_ledger(), kind, name),
+            )
+        return cursor.rowcount > 0
+
+    # ── Budgets and per-category month totals ───────────────────────────────
+
+    def get_budgets(self) -> Dict[str, float]:
+        rows = self._conn().execute(
+            f"SELECT category, amount FROM {config.BUDGETS_COLLECTION} WHERE ledger_id = ?", (current_ledger(),)
+        )
+        return {category: float(amount) for category, amount in rows}
+
+    def set_budget(self, category: str, amount: float) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                f"INSERT INTO {config.BUDGETS_COLLECTION} (ledger_id, category, amount) VALUES (?, ?, ?) "
+                "ON CONFLICT (ledger_id, category) DO UPDATE SET amount = excluded.amount",
+                (current_ledger(), category, amount),
+            )
+
+    def remove_budget(self, category: str) -> bool:
+        with self._conn() as conn:
+            cursor = conn.execute(
+                f"DELETE FROM {config.BUDGETS_COLLECTION} WHERE ledger_id = ? AND category = ?",
+                (current_ledger(), category),
+            )
+        return cursor.rowcount > 0
+
+    def increment_category_month(self, year: int, month: int, category: str, delta: float) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                f"INSERT INTO {config.CATEGORY_MONTH_TOTALS_COLLECTION} (ledger_id, year, month, category, total) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (ledger_id, year, month, category) DO UPDATE SET total = total + excluded.total",
+                (current_ledger(), year, month, category, delta),
+            )
+
+    def get_category_month_totals(self, year: int, month: int) -> Dict[str, float]:
+        rows = self._conn().execute(
+            f"SELECT category, total FROM {config.CATEGORY_MONTH_TOTALS_COLLECTION} "
+            "WHERE ledger_id = ? AND year = ? AND month = ?",
+            (current_ledger(), year, month),
+        )
+        return {category: float(total) for category, total in rows}
+
+    def rebuild_category_month_totals(self, collections: List[str], year: Optional[int] = None) -> None:
+        where, params = "ledger_id = ?", [current_ledger()]
+        totals_where, totals_params = where, list(params)
+        if year is not None:
+            where += " AND date >= ? AND date < ?"
+            params += [_to_sql("date", datetime(year, 1, 1)), _to_sql("date", datetime(year + 1, 1, 1))]
+            totals_where += " AND year = ?"
+            totals_params.append(year)
+        entries = " UNION ALL ".join(
+            f"SELECT ledger_id, date, category, amount FROM {collection} WHERE {where}"
+            for collection in collections
+        )
+        with self._conn() as conn:
+            conn.execute(f"DELETE FROM {config.CATEGORY_MONTH_TOTALS_COLLECTION} WHERE {totals_where}", totals_params)
+            conn.execute(
+                f"INSERT INTO {config.CATEGORY_MONTH_TOTALS_COLLECTION} (ledger_id, year, month, category, total) "
+                "SELECT ledger_id, CAST(substr(date, 1, 4) AS INTEGER), CAST(substr(date, 6, 2) AS INTEGER), "
+                f"category, SUM(amount) FROM ({entries}) GROUP BY 1, 2, 3, 4",
+                params * len(collections),
+            )
+
+    # ── Holding values ────────────────────────────────────────────────────────
+
+    def get_holding_values(self) -> List[Dict]:
+        return self._query(
+            f"SELECT category, description, value, as_of FROM {config.HOLDING_VALUES_COLLECTION} WHERE ledger_id = ?",
+            (current_ledger(),),
+        )
+
+    def set_holding_value(self, category: str, description: str, value: float, as_of: datetime) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                f"INSERT INTO {config.HOLDING_VALUES_COLLECTION} (ledger_id, category, description, value, as_of) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (ledger_id, category, description) "
+                "DO UPDATE SET value = excluded.value, as_of = excluded.as_of",
+                (current_ledger(), category, description, value, _to_sql("as_of", as_of)),
+            )
+
+    def remove_holding_value(self, category: str, description: str) -> bool:
+        with self._conn() as conn:
+            cursor = conn.execute(
+                f"DELETE FROM {config.HOLDING_VALUES_COLLECTION} WHERE ledger_id = ? AND category = ? AND description = ?",
+                (current_ledger(), category, description),
+            )
+        return cursor.rowcount > 0
+
+    # ── Ledgers ───────────────────────────────────────────────────────────────
+
+    def find_ledgers(self, user_id: Optional[str] = None) -> List[Dict]:
+        if user_id is None:
+            return self._query(f"SELECT * FROM {config.LEDGERS_COLLECTION} ORDER BY name")
+        return self._query(f"SELECT * FROM {config.LEDGERS_COLLECTION} WHERE user_id = ? ORDER BY name", (user_id,))
+
+    def insert_ledger(self, ledger_id: str, name: str, user_id: str) -> bool:
+        with self._conn() as conn:
+            cursor = conn.execute(
+                f"INSERT OR IGNORE INTO {config.LEDGERS_COLLECTION} (_id, name, user_id, created_at) VALUES (?, ?, ?, ?)",
+                (ledger_id, name, user_id, _to_sql("created_at", datetime.now())),
+            )
+        return cursor.rowcount > 0
+
+    def set_ledger_owner(self, ledger_id: str, user_id: str) -> bool:
+        with self._conn() as conn:
+            cursor = conn.execute(
+                f"UPDATE {config.LEDGERS_COLLECTION} SET user_id = ? WHERE _id = ?", (user_id, ledger_id)
+            )
+        return cursor.rowcount > 0
+
+    # ── Users ─────────────────────────────────────────────────────────────────
+
+    def find_user(self, user_id: str) -> Optional[Dict]:
+        rows = self._query(f"SELECT * FROM {config.USERS_COLLECTION} WHERE _id = ?", (user_id,))
+        return rows[0] if rows else None
+
+    def insert_user(self, user_id: str, password_hash: str) -> bool:
+        with self._conn() as conn:
+            cursor = conn.execute(
+                f"INSERT OR IGNORE INTO {config.USERS_COLLECTION} (_id, password_hash, created_at) VALUES (?, ?, ?)",
+                (user_id, password_hash, _to_sql("created_at", datetime.now())),
+            )
+        return cursor.rowcount > 0
+
+    # ── Metadata ──────────────────────────────────────────────────────────────
+
+    def get_meta(self, key: str):
+        row = self._conn().execute(f"SELECT value FROM {config.META_COLLECTION} WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_meta(self, key: str, value) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                f"INSERT INTO {config.META_COLLECTION} (key, value) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (key, json.dumps(value)),
+            )
+
+    # ── Recurring events ──────────────────────────────────────────────────────
+
+    def insert_event(self, doc: Dict) -> str:
+        return self._insert(config.EVENTS_COLLECTION, doc)
+
+    def find_events(self, active_only: bool = False) -> List[Dict]:
+        active = " AND is_active = 1" if active_only else ""
+        return self._query(
+            f"SELECT * FROM {config.EVENTS_COLLECTION} WHERE ledger_id = ?{active} ORDER BY day_of_month",
+            (current_ledger(),),
+        )
+
+    def find_due_events(self, now: datetime) -> List[Dict]:
+        return self._query(
+            f"SELECT * FROM {config.EVENTS_COLLECTION} WHERE ledger_id = ? AND is_active = 1 AND next_due_at <= ? "
+            "ORDER BY next_due_at",
+            (current_ledger(), _to_sql("next_due_at", now)),
+        )
+
+    def find_events_without_next_due(self) -> List[Dict]:
+        return self._query(
+            f"SELECT * FROM {config.EVENTS_COLLECTION} WHERE ledger_id = ? AND next_due_at IS NULL",
+            (current_ledger(),),
+        )
+
+    def get_event(self, event_id: str) -> Optional[Dict]:
+        rows = self._query(
+            f"SELECT * FROM {config.EVENTS_COLLECTION} WHERE ledger_id = ? AND _id = ?", (current_ledger(), event_id)
+        )
+        return rows[0] if rows else None
+
+    def update_event(self, event_id: str, fields: Dict) -> bool:
+        return self._update(config.EVENTS_COLLECTION, event_id, fields)
+
+    def delete_event(self, event_id: str) -> bool:
+        return self._delete(config.EVENTS_COLLECTION, event_id)
+
+    def advance_event(self, event_id: str, expected_next_due: Optional[datetime], fields: Dict) -> bool:
+        columns = list(fields)
+        with self._conn() as conn:
+            cursor = conn.execute(
+                f"UPDATE {config.EVENTS_COLLECTION} SET {', '.join(f'{c} = ?' for c in columns)} "
+                "WHERE ledger_id = ? AND _id = ? AND next_due_at IS ?",
+                [_to_sql(c, fields[c]) for c in columns]
+                + [current_ledger(), event_id, _to_sql("next_due_at", expected_next_due)],
+            )
+        return cursor.rowcount > 0
+
+    # ── Event executions ──────────────────────────────────────────────────────
+
+    def find_execution(self, key: str) -> Optional[Dict]:
+        rows = self._query(
+            f"SELECT * FROM {config.EXECUTIONS_COLLECTION} WHERE ledger_id = ? AND key = ?", (current_ledger(), key)
+        )
+        return rows[0] if rows else None
+
+    def insert_entry_with_execution(self, collection: str, doc: Dict, key: str, execution: Dict) -> Optional[str]:
+        doc = {"_id": uuid.uuid4().hex, **doc, "ledger_id": current_ledger()}
+        record = {"key": key, **execution, "expense_id": doc["_id"], "ledger_id": current_ledger()}
+        with self._conn() as conn:
+            # Only a taken key means "already claimed"; other constraint failures raise
+            sql, params = _insert_sql(config.EXECUTIONS_COLLECTION, record)
+            cursor = conn.execute(f"{sql} ON CONFLICT(ledger_id, key) DO NOTHING", params)
+            if cursor.rowcount == 0:
+                return None
+            conn.execute(*_insert_sql(collection, doc))
+        return doc["_id"]
+
+    def find_executions(self, event_id: str) -> List[Dict]:
+        return self._query(
+            f"SELECT * FROM {config.EXECUTIONS_COLLECTION} WHERE ledger_id = ? AND event_id = ? "
+            "ORDER BY executed_at DESC",
+            (current_ledger(), event_id),
+        )
+
+    def delete_executions(self, event_id: str) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                f"DELETE FROM {config.EXECUTIONS_COLLECTION} WHERE ledger_id = ? AND event_id = ?",
+                (current_ledger(), event_id),
+            )
@@ -0,0 +1,278 @@
+"""
+Hot and archive tiers of the ledger collections: the archival job, and reads
+and writes that span both tiers
+"""
+from datetime import date, datetime
+from typing import Dict, List, Optional, Set, Tuple
+from database.backend import get_backend
+from database.cache import cached, invalidate
+from database.ledger import current_ledger
+import config
+
+
+# Meta key holding a ledger's archive boundary: entries dated before it may be archived
+_BOUNDARY_KEY = "archive_boundary"
+
+
+def _boundary_key(collection: str) -> str:
+    return f"{_BOUNDARY_KEY}:{current_ledger()}:{collection}"
+
+
+class LedgerTiers:
+    """Closed years of each ledger collection live in its archive collection
+    (config.ARCHIVE_COLLECTIONS), so the hot collection and its indexes only
+    hold the last ARCHIVE_HOT_YEARS years.
+
+    Reads always query the hot tier, which still holds backdated entries until
+    the next archival run, and add the archive tier only when their range
+    starts before the boundary. Mirrors the backend's ledger entry methods.
+    """
+
+    # (ledger, collection, boundary) already archived by this process
+    _archived = set()
+
+    @staticmethod
+    @cached(config.EXPENSES_COLLECTION, config.INVESTMENTS_COLLECTION)
+    def boundary(collection: str) -> Optional[datetime]:
+        value = get_backend().get_meta(_boundary_key(collection))
+        return datetime.fromisoformat(value) if value else None
+
+    @staticmethod
+    def _tiers(collection: str, start_date: Optional[datetime] = None) -> List[str]:
+        boundary = LedgerTiers.boundary(collection)
+        if boundary and (start_date is None or start_date < boundary):
+            return [collection, config.ARCHIVE_COLLECTIONS[collection]]
+        return [collection]
+
+    # ── Archival ──────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def archive_closed_years(today: Optional[date] = None) -> int:
+        """Move the current ledger's entries older than the hot years into the
+        archive tier; returns how many moved"""
+        if not config.ARCHIVE_ENABLED:
+            return 0
+        year = (today or date.today()).year
+        boundary = datetime(year - config.ARCHIVE_HOT_YEARS + 1, 1, 1)
+        backend = get_backend()
+        moved = 0
+        for collection, archive in config.ARCHIVE_COLLECTIONS.items():
+            done = (current_ledger(), collection, boundary)
+            if done in LedgerTiers._archived:
+                continue
+            try:
+                # Publish the boundary before moving so reads already union the
+                # archive; it never moves back, since older entries stay archived
+                current = LedgerTiers.boundary(collection)
+                if current is None or current < boundary:
+                    backend.set_meta(_boundary_key(collection), boundary.isoformat())
+                    invalidate(collection)
+                count = backend.move_entries(collection, archive, boundary)
+                if count:
+                    invalidate(collection)
+                moved += count
+                LedgerTiers._archived.add(done)
+            except Exception as e:
+                print(f"Error archiving {collection}: {e}")
+        return moved
+
+    # ── Reads ─────────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def find_entries(collection, start_date=None, end_date=None, category=None, limit=None, before=None) -> List[Dict]:
+        backend = get_backend()
+        tiers = LedgerTiers._tiers(collection, start_date)
+        entries = [
+            e for tier in tiers for e in backend.find_entries(tier, start_date, end_date, category, limit, before)
+        ]
+        if len(tiers) > 1:
+            entries.sort(key=lambda e: (e["date"], e["_id"]), reverse=True)
+        return entries[:limit]
+
+    @staticmethod
+    def find_entries_by_categories(collection: str, categories: List[str]) -> List[Dict]:
+        backend = get_backend()
+        tiers = LedgerTiers._tiers(collection)
+        entries = [e for tier in tiers for e in backend.find_entries_by_categories(tier, categories)]
+        if len(tiers) > 1:
+            entries.sort(key=lambda e: e["date"], reverse=True)
+        return entries
+
+    @staticmethod
+    def find_entries_by_event(collection: str, event_id: str) -> List[Dict]:
+        backend = get_backend()
+        tiers = LedgerTiers._tiers(collection)
+        entries = [e for tier in tiers for e in backend.find_entries_by_event(tier, event_id)]
+        if len(tiers) > 1:
+            entries.sort(key=lambda e: e["date"], reverse=True)
+        return entries
+
+    @staticmethod
+    def fingerprint_counts(collection: str, fingerprints: List[str], start_date: datetime) -> Dict[str, int]:
+        """Stored entries per fingerprint, for entries dated from `start_date` on"""
+        counts: Dict[str, int] = {}
+        for tier in LedgerTiers._tiers(collection, start_date):
+            for fingerprint, count in get_backend().fingerprint_counts(tier, fingerprints).items():
+                counts[fingerprint] = counts.get(fingerprint, 0) + count
+        return counts
+
+    @staticmethod
+    def _keys_in_archive(collection: str, docs: List[Dict]) -> Set[str]:
+        # Each tier's unique index only covers that tier: a retried key whose
+        # entry has since been archived is caught here
+        keys = [doc["idempotency_key"] for doc in docs if doc.get("idempotency_key")]
+        if not keys or LedgerTiers.boundary(collection) is None:
+            return set()
+        return get_backend().used_idempotency_keys(config.ARCHIVE_COLLECTIONS[collection], keys)
+
+    @staticmethod
+    def without_duplicates(collection: str, docs: List[Dict]) -> List[Dict]:
+        """`docs` minus the ones already stored, matched on fingerprint.
+
+        One index probe per batch, then a hash join in memory: a fingerprint
+        stored n times absorbs n docs, so re-importing a batch adds nothing
+        while identical rows of a new batch are all kept.
+        """
+        if not docs:
+            return []
+        fingerprints = list({doc["fingerprint"] for doc in docs})
+        stored = LedgerTiers.fingerprint_counts(collection, fingerprints, min(doc["date"] for doc in docs))
+        fresh = []
+        for doc in docs:
+            if stored.get(doc["fingerprint"], 0):
+                stored[doc["fingerprint"]] -= 1
+            else:
+                fresh.append(doc)
+        return fresh
+
+    @staticmethod
+    def total_amount(collection, start_date, end_date) -> float:
+        backend = get_backend()
+        return sum(
+            backend.total_amount(tier, start_date, end_date) for tier in LedgerTiers._tiers(collection, start_date)
+        )
+
+    @staticmethod
+    def category_totals(collection, start_date, end_date) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for tier in LedgerTiers._tiers(collection, start_date):
+            for category, total in get_backend().category_totals(tier, start_date, end_date).items():
+                totals[category] = totals.get(category, 0.0) + total
+        return totals
+
+    @staticmethod
+    def daily_totals(collection, start_date, end_date) -> List[Tuple[date, float]]:
+        totals: Dict[date, float] = {}
+        for tier in LedgerTiers._tiers(collection, start_date):
+            for day, total in get_backend().daily_totals(tier, start_date, end_date):
+                totals[day] = totals.get(day, 0.0) + total
+        return sorted(totals.items())
+
+    @staticmethod
+    def period_totals(collection, start_date, end_date, unit) -> List[Tuple[datetime, float]]:
+        totals: Dict[datetime, float] = {}
+        for tier in LedgerTiers._tiers(collection, start_date):
+            for period, total in get_backend().period_totals(tier, start_date, end_date, unit):
+                totals[period] = totals.get(period, 0.0) + total
+        return sorted(totals.items())
+
+    @staticmethod
+    def category_period_totals(collection, start_date, end_date, unit) -> List[Tuple[datetime, str, float]]:
+        # Cells may repeat across tiers; callers sum them
+        backend = get_backend()
+        return [
+            row
+            for tier in LedgerTiers._tiers(collection, start_date)
+            for row in backend.category_period_totals(tier, start_date, end_date, unit)
+        ]
+
+    @staticmethod
+    def running_totals(sources: Dict[str, str]) -> List[Tuple[date, str, str, float, float, float]]:
+        # Every tier joins the one query, so the running sums span both
+        return get_backend().running_totals(
+            {label: LedgerTiers._tiers(collection) for label, collection in sources.items()}
+        )
+
+    @staticmethod
+    def monthly_totals(collection: str, year: int) -> Dict[int, float]:
+        totals: Dict[int, float] = {}
+        for tier in LedgerTiers._tiers(collection, datetime(year, 1, 1)):
+            for month, total in get_backend().monthly_totals(tier, year).items():
+                totals[month] = totals.get(month, 0.0) + total
+        return totals
+
+    @staticmethod
+    def entry_year_months(collection: str) -> List[Tuple[int, int]]:
+        backend = get_backend()
+        return sorted({ym for tier in LedgerTiers._tiers(collection) for ym in backend.entry_year_months(tier)})
+
+    @staticmethod
+    def partition_stats(collection: str) -> Dict[Tuple[int, int], Tuple]:
+        stats: Dict[Tuple[int, int], Tuple] = {}
+        for tier in LedgerTiers._tiers(collection):
+            for ym, (count, total, last) in get_backend().partition_stats(tier).items():
+                if ym in stats:
+                    prev_count, prev_total, prev_last = stats[ym]
+                    count, total = count + prev_count, total + prev_total
+                    last = max(filter(None, (last, prev_last)), default=None)
+                stats[ym] = (count, total, last)
+        return stats
+
+    @staticmethod
+    def changed_months(collection: str, since: datetime) -> List[Tuple[int, int]]:
+        backend = get_backend()
+        return sorted({ym for tier in LedgerTiers._tiers(collection) for ym in backend.changed_months(tier, since)})
+
+    # ── Writes ────────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def insert_entry(collection: str, doc: Dict) -> Optional[str]:
+        """Insert into the hot tier; None if the idempotency_key is used in either tier"""
+        if LedgerTiers._keys_in_archive(collection, [doc]):
+            return None
+        return get_backend().insert_entry(collection, doc)
+
+    @staticmethod
+    def insert_entries(collection: str, docs: List[Dict]) -> List[Optional[str]]:
+        """Insert into the hot tier; None for each doc whose idempotency_key is used in either tier"""
+        archived = LedgerTiers._keys_in_archive(collection, docs)
+        fresh = [doc for doc in docs if doc.get("idempotency_key") not in archived]
+        ids = iter(get_backend().insert_entries(collection, fresh) if fresh else [])
+        return [None if doc.get("idempotency_key") in archived else next(ids) for doc in docs]
+
+    @staticmethod
+    def _restore(collection: str, entry_id: str) -> bool:
+        # Edited archived entries move back to the hot tier; the next archival
+        # run archives them again if they are still old
+        if LedgerTiers.boundary(collection) is None:
+            return False
+        return get_backend().move_entry(config.ARCHIVE_COLLECTIONS[collection], collection, entry_id)
+
+    @staticmethod
+    def update_entry(collection: str, entry_id: str, fields: Dict) -> bool:
+        backend = get_backend()
+        if backend.update_entry(collection, entry_id, fields):
+            return True
+        return LedgerTiers._restore(collection, entry_id) and backend.update_entry(collection, entry_id, fields)
+
+    @staticmethod
+    def find_and_update_entry(collection: str, entry_id: str, fields: Dict) -> Optional[Dict]:
+        backend = get_backend()
+        previous = backend.find_and_update_entry(collection, entry_id, fields)
+        if previous is None and LedgerTiers._restore(collection, entry_id):
+            previous = backend.find_and_update_entry(collection, entry_id, fields)
+        return previous
+
+    @staticmethod
+    def delete_entry(collection: str, entry_id: str) -> bool:
+        backend = get_backend()
+        return any(backend.delete_entry(tier, entry_id) for tier in LedgerTiers._tiers(collection))
+
+    @staticmethod
+    def find_and_delete_entry(collection: str, entry_id: str) -> Optional[Dict]:
+        backend = get_backend()
+        for tier in LedgerTiers._tiers(collection):
+            deleted = backend.find_and_delete_entry(tier, entry_id)
+            if deleted is not None:
+                return deleted
+        return None
@@ -0,0 +1,41 @@
+"""
+Accounts that sign in to the app; each one sees only the ledgers it owns
+"""
+import re
+from database.backend import get_backend
+from utils.passwords import hash_password, verify_password
+
+# Lowercase so "Alice" and "alice" can't become two accounts
+_USER_ID_PATTERN = re.compile(r"^[a-z0-9][a-z0-9._-]{0,63}$")
+
+MIN_PASSWORD_LENGTH = 8
+
+
+class UserModel:
+    """Handle user-related database operations"""
+
+    @staticmethod
+    def valid_user_id(user_id: str) -> bool:
+        return bool(_USER_ID_PATTERN.match(user_id or ""))
+
+    @staticmethod
+    def create_user(user_id: str, password: str) -> bool:
+        """Create an account; False if the name is invalid or taken, or the
+        password too short"""
+        if not UserModel.valid_user_id(user_id) or len(password) < MIN_PASSWORD_LENGTH:
+            return False
+        try:
+            return get_backend().insert_user(user_id, hash_password(password))
+        except Exception as e:
+            print(f"Error creating user: {e}")
+            return False
+
+    @staticmethod
+    def authenticate(user_id: str, password: str) -> bool:
+        """True if the account exists and the password matches"""
+        try:
+            user = get_backend().find_user((user_id or "").strip().lower())
+        except Exception as e:
+            print(f"Error reading user: {e}")
+            return False
+        return user is not None and verify_password(password, user["password_hash"])
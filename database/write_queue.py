@@ -0,0 +1,199 @@
+"""
+Local write-ahead queue for entries created while the database is unavailable
+"""
+import contextlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+import config
+from database.backend import DatabaseUnavailable
+from database.ledger import current_ledger, ledger_scope
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ledger_id TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    date TEXT NOT NULL,
+    category TEXT NOT NULL,
+    description TEXT,
+    amount REAL NOT NULL,
+    idempotency_key TEXT,
+    queued_at TEXT NOT NULL,
+    claimed_until REAL,
+    UNIQUE (ledger_id, collection, idempotency_key)
+)
+"""
+
+# A replayer that dies mid-batch leaves its rows claimed for this long
+_CLAIM_SECONDS = 120
+
+
+@contextlib.contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    # One short-lived connection per call: the queue is touched rarely, from
+    # any thread and by every process sharing the file. The table is ensured
+    # every time, since the file may have been deleted or WRITE_QUEUE_PATH changed.
+    conn = sqlite3.connect(config.WRITE_QUEUE_PATH, timeout=10)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        # A queued entry must survive a crash or power loss
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute(_SCHEMA)
+        yield conn
+    finally:
+        conn.close()
+
+
+def enqueue(
+    collection: str, date: datetime, category: str, description: str, amount: float,
+    idempotency_key: Optional[str] = None,
+) -> bool:
+    """Keep an entry of the current ledger until replay() can save it. A
+    repeated idempotency_key is queued once; without one the entry gets its own."""
+    idempotency_key = idempotency_key or uuid.uuid4().hex
+    try:
+        with _connect() as conn, conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO pending_entries "
+                "(ledger_id, collection, date, category, description, amount, idempotency_key, queued_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (current_ledger(), collection, date.isoformat(), category, description, amount,
+                 idempotency_key, datetime.now().isoformat()),
+            )
+        return True
+    except sqlite3.Error as e:
+        print(f"Error queueing entry: {e}")
+        return False
+
+
+def pending_count() -> int:
+    if not os.path.exists(config.WRITE_QUEUE_PATH):
+        return 0
+    try:
+        with _connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM pending_entries").fetchone()[0]
+    except sqlite3.Error as e:
+        print(f"Error reading write queue: {e}")
+        return 0
+
+
+def _claim(limit: int) -> List[Tuple]:
+    # Concurrent replayers (one per Streamlit process, cron) take disjoint batches
+    now = time.time()
+    with _connect() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        rows = conn.execute(
+            "SELECT id, ledger_id, collection, date, category, description, amount, idempotency_key "
+            "FROM pending_entries "
+            "WHERE claimed_until IS NULL OR claimed_until < ? ORDER BY id LIMIT ?",
+            (now, limit),
+        ).fetchall()
+        conn.executemany(
+            "UPDATE pending_entries SET claimed_until = ? WHERE id = ?",
+            [(now + _CLAIM_SECONDS, row[0]) for row in rows],
+        )
+        conn.commit()
+    return rows
+
+
+def _finish(ids: List[int], saved: bool) -> None:
+    with _connect() as conn, conn:
+        if saved:
+            conn.executemany("DELETE FROM pending_entries WHERE id = ?", [(i,) for i in ids])
+        else:
+            conn.executemany("UPDATE pending_entries SET claimed_until = NULL WHERE id = ?", [(i,) for i in ids])
+
+
+def replay() -> int:
+    """Save queued entries in order, one bulk insert per ledger and collection
+    and batch. Each is saved with its idempotency key, so an entry whose
+    write reached the database before the connection failed, or that
+    another replayer saved, isn't saved twice; identical entries with their
+    own keys are all kept. Stops at the first batch that fails, leaving it
+    queued. Returns how many entries were created."""
+    from database.investment_model import InvestmentModel
+    from database.models import ExpenseModel
+    create = {
+        config.EXPENSES_COLLECTION: ExpenseModel.create_expenses,
+        config.INVESTMENTS_COLLECTION: InvestmentModel.create_investments,
+    }
+    created = 0
+    while True:
+        try:
+            rows = _claim(config.WRITE_QUEUE_BATCH_SIZE)
+        except sqlite3.Error as e:
+            print(f"Error reading write queue: {e}")
+            return created
+        if not rows:
+            return created
+
+        groups: Dict[Tuple[str, str], List[Tuple]] = {}
+        for row in rows:
+            groups.setdefault((row[1], row[2]), []).append(row)
+        failed = []
+        for (ledger_id, collection), group in groups.items():
+            if failed:
+                failed.extend(row[0] for row in group)
+                continue
+            try:
+                with ledger_scope(ledger_id):
+                    saved = create[collection]([
+                        {
+                            "date": datetime.fromisoformat(date),
+                            "category": category,
+                            "description": description,
+                            "amount": amount,
+                            "idempotency_key": idempotency_key,
+                        }
+                        for _, _, _, date, category, description, amount, idempotency_key in group
+                    ])
+            except DatabaseUnavailable:
+                saved = None
+            ids = [row[0] for row in group]
+            if saved is None:
+                failed.extend(ids)
+            else:
+                _finish(ids, saved=True)
+                created += len(saved)
+        if failed:
+            _finish(failed, saved=False)
+            return created
+
+
+class QueueReplayer(threading.Thread):
+    """Daemon thread replaying the queue every WRITE_QUEUE_REPLAY_SECONDS"""
+
+    def __init__(self):
+        super().__init__(name="write-queue-replayer", daemon=True)
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(config.WRITE_QUEUE_REPLAY_SECONDS):
+            if pending_count():
+                replay()
+
+
+_replayer: Optional[QueueReplayer] = None
+_replayer_lock = threading.Lock()
+
+
+def start_queue_replayer() -> Optional[QueueReplayer]:
+    """Start the per-process replayer once; no-op on the embedded SQLite backend,
+    whose writes never find the database unavailable"""
+    global _replayer
+    if config.STORAGE_BACKEND != "mongodb":
+        return None
+    with _replayer_lock:
+        if _replayer is None or not _replayer.is_alive():
+            _replayer = QueueReplayer()
+            _replayer.start()
+    return _replayer
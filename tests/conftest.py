@@ -0,0 +1,75 @@
+"""
+Fixtures running each test once per storage backend: SQLite on a temporary
+file, and MongoDB on mongomock's in-memory server, or on a real server in a
+throwaway database when TEST_MONGO_URI is set
+"""
+import inspect
+import os
+import uuid
+import pytest
+import config
+import database.analytics_engine as analytics_engine
+import database.backend as backend_module
+import database.cache as cache
+import database.connection as connection
+from database.budget_model import BudgetModel
+from database.cache import invalidate_all
+from database.event_model import EventModel
+from database.tiers import LedgerTiers
+
+TEST_MONGO_URI = os.getenv("TEST_MONGO_URI")
+
+
+def _accept_bulk_sort(monkeypatch, mongomock):
+    # pymongo 4.9+ passes sort= to bulk replace/update operations, which
+    # mongomock's bulk builder doesn't take yet
+    builder = mongomock.collection.BulkOperationBuilder
+    for name in ("add_replace", "add_update"):
+        original = getattr(builder, name)
+        if "sort" not in inspect.signature(original).parameters:
+            monkeypatch.setattr(
+                builder, name, lambda self, *args, sort=None, _original=original, **kwargs: _original(self, *args, **kwargs)
+            )
+
+
+@pytest.fixture(params=["sqlite", "mongodb"])
+def backend(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "STORAGE_BACKEND", request.param)
+    monkeypatch.setattr(config, "SQLITE_PATH", str(tmp_path / "budget_tracker.db"))
+    monkeypatch.setattr(config, "WRITE_QUEUE_PATH", str(tmp_path / "pending_writes.db"))
+    monkeypatch.setattr(config, "ANALYTICS_DIR", str(tmp_path / "analytics_snapshots"))
+    if request.param == "mongodb":
+        if TEST_MONGO_URI:
+            monkeypatch.setattr(config, "MONGO_URI", TEST_MONGO_URI)
+            monkeypatch.setattr(config, "DATABASE_NAME", f"budget_tracker_test_{uuid.uuid4().hex[:8]}")
+        else:
+            mongomock = pytest.importorskip("mongomock")
+            monkeypatch.setattr(connection, "MongoClient", mongomock.MongoClient)
+            _accept_bulk_sort(monkeypatch, mongomock)
+        monkeypatch.setattr(connection.DatabaseConnection, "_instance", None)
+    monkeypatch.setattr(backend_module, "_backend", None)
+    monkeypatch.setattr(backend_module, "_breaker", None)
+    monkeypatch.setattr(LedgerTiers, "_archived", set())
+    monkeypatch.setattr(BudgetModel, "_totals_built", set())
+    monkeypatch.setattr(EventModel, "_next_due_backfilled", set())
+    # A fresh analytics engine on this test's ANALYTICS_DIR, whose
+    # invalidation listener goes away with the test
+    monkeypatch.setattr(analytics_engine, "_engine", None)
+    monkeypatch.setattr(analytics_engine, "_engine_checked", False)
+    monkeypatch.setattr(cache, "_listeners", list(cache._listeners))
+    # Cached reads are keyed by ledger, not by backend
+    invalidate_all()
+    yield backend_module.get_backend()
+    invalidate_all()
+    if request.param == "mongodb" and TEST_MONGO_URI:
+        client = connection.get_db().client
+        client.drop_database(config.DATABASE_NAME)
+        client.close()
+
+
+@pytest.fixture
+def server_backend(backend):
+    """`backend`, skipped on mongomock, which lacks $dateTrunc and $setWindowFields"""
+    if config.STORAGE_BACKEND == "mongodb" and not TEST_MONGO_URI:
+        pytest.skip("needs a MongoDB server; set TEST_MONGO_URI")
+    return backend
@@ -0,0 +1,108 @@
+"""
+Period, category x period and running-total aggregations on every storage
+backend. MongoDB computes them with $dateTrunc and $setWindowFields, which
+mongomock lacks, so its runs need a server (TEST_MONGO_URI).
+"""
+from datetime import date, datetime
+import pandas as pd
+import config
+from database.investment_model import InvestmentModel
+from database.models import ExpenseModel
+from database.tiers import LedgerTiers
+from utils.helpers import period_starts, truncate_period
+
+_RANGE = (datetime(2025, 3, 1), datetime(2025, 5, 31, 23, 59, 59))
+
+
+def _seed():
+    ExpenseModel.create_expenses([
+        {"date": datetime(2025, 3, 2), "category": "Food", "description": "Sunday", "amount": 10.0},
+        {"date": datetime(2025, 3, 3), "category": "Transport", "description": "Monday", "amount": 5.0},
+        {"date": datetime(2025, 3, 17, 23, 30), "category": "Food", "description": "Late", "amount": 20.0},
+        {"date": datetime(2025, 5, 20), "category": "Food", "description": "May", "amount": 7.0},
+        {"date": datetime(2025, 6, 1), "category": "Food", "description": "Outside", "amount": 99.0},
+    ])
+
+
+def _nonzero(frame: pd.DataFrame) -> dict:
+    return {row.period.to_pydatetime(): row.amount for row in frame.itertuples() if row.amount}
+
+
+def test_period_boundaries():
+    sunday = datetime(2025, 3, 2, 18, 0)
+    assert truncate_period(sunday, "day") == datetime(2025, 3, 2)
+    assert truncate_period(sunday, "week") == datetime(2025, 2, 24)
+    assert truncate_period(sunday, "month") == datetime(2025, 3, 1)
+    assert truncate_period(datetime(2025, 6, 30), "quarter") == datetime(2025, 4, 1)
+    assert list(period_starts(*_RANGE, "quarter")) == [pd.Timestamp(2025, 1, 1), pd.Timestamp(2025, 4, 1)]
+
+
+def test_period_totals(server_backend):
+    _seed()
+    weeks = ExpenseModel.get_period_totals(*_RANGE, "week")
+    assert weeks["period"].iloc[0] == pd.Timestamp(2025, 2, 24)
+    assert (weeks["period"].dt.dayofweek == 0).all()
+    assert _nonzero(weeks) == {
+        datetime(2025, 2, 24): 10.0, datetime(2025, 3, 3): 5.0, datetime(2025, 3, 17): 20.0, datetime(2025, 5, 19): 7.0,
+    }
+
+    months = ExpenseModel.get_period_totals(*_RANGE, "month")
+    assert months["amount"].tolist() == [35.0, 0.0, 7.0]
+    quarters = ExpenseModel.get_period_totals(*_RANGE, "quarter")
+    assert quarters["amount"].tolist() == [35.0, 7.0]
+
+    days = ExpenseModel.get_period_totals(*_RANGE, "day")
+    assert len(days) == 92
+    assert _nonzero(days)[datetime(2025, 3, 17)] == 20.0
+    assert days["amount"].sum() == 42.0
+
+
+def test_category_period_matrix(server_backend):
+    _seed()
+    categories, periods, matrix = ExpenseModel.get_category_period_matrix(*_RANGE, "month")
+    assert categories == ["Food", "Transport"]
+    assert list(periods) == [pd.Timestamp(2025, 3, 1), pd.Timestamp(2025, 4, 1), pd.Timestamp(2025, 5, 1)]
+    assert matrix.tolist() == [[30.0, 0.0, 7.0], [5.0, 0.0, 0.0]]
+
+    categories, periods, matrix = ExpenseModel.get_category_period_matrix(*_RANGE, "week")
+    assert matrix.shape == (2, len(periods))
+    assert matrix.sum() == 42.0
+    assert matrix[0, list(periods).index(pd.Timestamp(2025, 2, 24))] == 10.0
+
+
+def test_empty_matrix(server_backend):
+    categories, periods, matrix = ExpenseModel.get_category_period_matrix(*_RANGE, "month")
+    assert categories == [] and len(periods) == 3
+    assert matrix.shape == (0, 3)
+
+
+def test_cumulative_timeline_spans_kinds_and_tiers(server_backend):
+    old = datetime(date.today().year - config.ARCHIVE_HOT_YEARS, 6, 1)
+    ExpenseModel.create_expenses([
+        {"date": old, "category": "Food", "description": "Archived", "amount": 1.0},
+        {"date": datetime(2025, 3, 1), "category": "Food", "description": "Lunch", "amount": 10.0},
+        {"date": datetime(2025, 3, 1, 20, 0), "category": "Transport", "description": "Taxi", "amount": 5.0},
+        {"date": datetime(2025, 3, 3), "category": "Food", "description": "Dinner", "amount": 20.0},
+    ])
+    InvestmentModel.create_investment(datetime(2025, 3, 2), "SIP", "Index fund", 100.0)
+    LedgerTiers.archive_closed_years()
+
+    timeline = InvestmentModel.get_cumulative_timeline()
+    rows = sorted(
+        (row.date, row.kind, row.category, row.amount, row.category_total, row.kind_total)
+        for row in timeline.itertuples()
+    )
+    assert rows == sorted([
+        (old.date(), "expense", "Food", 1.0, 1.0, 1.0),
+        (date(2025, 3, 1), "expense", "Food", 10.0, 11.0, 16.0),
+        (date(2025, 3, 1), "expense", "Transport", 5.0, 5.0, 16.0),
+        (date(2025, 3, 2), "investment", "SIP", 100.0, 100.0, 100.0),
+        (date(2025, 3, 3), "expense", "Food", 20.0, 31.0, 36.0),
+    ])
+
+
+def test_empty_timeline(server_backend):
+    assert list(InvestmentModel.get_cumulative_timeline().columns) == [
+        "date", "kind", "category", "amount", "category_total", "kind_total",
+    ]
+    assert InvestmentModel.get_cumulative_timeline().empty
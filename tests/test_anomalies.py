@@ -0,0 +1,61 @@
+"""
+Rolling z-score spending anomalies (utils/anomalies.py)
+"""
+import numpy as np
+import pandas as pd
+from utils.anomalies import daily_category_totals, score_days, score_transactions
+
+
+def _entries(rows):
+    return pd.DataFrame(rows, columns=["date", "category", "amount"]).assign(date=lambda f: pd.to_datetime(f["date"]))
+
+
+def _history(days: int = 30):
+    """A month of food around 10 a day, and rent of exactly 500 every day"""
+    rng = np.random.default_rng(1)
+    start = pd.Timestamp(2025, 3, 1)
+    rows = [(start + pd.Timedelta(days=d, hours=12), "Food", round(10 + rng.normal(0, 1), 2)) for d in range(days)]
+    rows += [(start + pd.Timedelta(days=d), "Rent", 500.0) for d in range(days)]
+    return rows
+
+
+def test_daily_category_totals():
+    daily = daily_category_totals(_entries([
+        ("2025-03-01 09:00", "Food", 4.0),
+        ("2025-03-01 19:00", "Food", 6.0),
+        ("2025-03-02 08:00", "Transport", 3.0),
+    ]))
+    assert list(daily.index) == [pd.Timestamp(2025, 3, 1), pd.Timestamp(2025, 3, 2)]
+    assert daily.loc["2025-03-01", "Food"] == 10.0
+    assert np.isnan(daily.loc["2025-03-01", "Transport"])
+    assert daily_category_totals(_entries([])).empty
+
+
+def test_spike_days_are_flagged():
+    rows = _history() + [("2025-03-31 12:00", "Food", 60.0), ("2025-03-31", "Rent", 560.0)]
+    flagged = score_days(daily_category_totals(_entries(rows)), window_days=30, min_history=5, threshold=3.0)
+    assert flagged[["date", "category"]].values.tolist() == [[pd.Timestamp(2025, 3, 31), "Food"]]
+    [food] = flagged.itertuples()
+    assert food.amount == 60.0 and 9 < food.baseline < 11 and food.z >= 3.0
+
+
+def test_fixed_costs_need_a_real_change():
+    # Rent never varied; a 12% rise stays within MIN_STD_RATIO of its mean
+    rows = _history() + [("2025-03-31", "Rent", 560.0), ("2025-04-01", "Rent", 1200.0)]
+    flagged = score_days(daily_category_totals(_entries(rows)), window_days=30, min_history=5, threshold=3.0)
+    assert flagged["date"].tolist() == [pd.Timestamp(2025, 4, 1)]
+
+
+def test_short_history_is_not_scored():
+    rows = [("2025-03-01", "Food", 10.0), ("2025-03-02", "Food", 11.0), ("2025-03-03", "Food", 500.0)]
+    daily = daily_category_totals(_entries(rows))
+    assert score_days(daily, window_days=30, min_history=5, threshold=3.0).empty
+    assert score_transactions(_entries(rows), window=20, min_history=5, threshold=3.0).empty
+
+
+def test_unusual_transactions_are_flagged():
+    rows = _history() + [("2025-03-31 09:00", "Food", 9.5), ("2025-03-31 10:00", "Food", 75.0)]
+    flagged = score_transactions(_entries(rows), window=20, min_history=5, threshold=3.0)
+    assert flagged[["category", "amount"]].values.tolist() == [["Food", 75.0]]
+    assert flagged["z"].iloc[0] >= 3.0
+    assert score_transactions(_entries([]), window=20, min_history=5, threshold=3.0).empty
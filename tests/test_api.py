@@ -0,0 +1,137 @@
+"""
+The headless JSON API (api.py): routes on every storage backend, and the
+HTTP layer on a server bound to a free local port
+"""
+import http.client
+import json
+import threading
+from http import HTTPStatus
+from http.server import ThreadingHTTPServer
+import pytest
+import api
+import config
+from api import ApiError, route
+from database.backend import DatabaseUnavailable
+from database.ledger_model import LedgerModel
+
+
+def _entry(day: str, amount: float, description: str = "Lunch", **extra):
+    return {"date": day, "category": "Food", "description": description, "amount": amount, **extra}
+
+
+def test_batch_is_all_or_nothing(backend):
+    with pytest.raises(ApiError) as error:
+        route("POST", "/expenses", {}, {"entries": [_entry("2025-03-10", 5), _entry("2025-03-11", "5"), {"date": "2025-03-12"}]})
+    assert error.value.status == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert error.value.body["errors"] == ["Row 2: Amount must be a number"]
+
+    # A row with only a date isn't a blank grid row here: it fails
+    with pytest.raises(ApiError) as error:
+        route("POST", "/expenses", {}, {"entries": [_entry("2025-03-10", 5), {"date": "2025-03-12"}]})
+    assert error.value.body["errors"] == ["Row 2: Category is required", "Row 2: Amount is required"]
+    assert route("GET", "/expenses", {}, None)[1]["items"] == []
+
+
+def test_retried_batches_count_duplicates(backend):
+    body = {"entries": [_entry("2025-03-10", 5, idempotency_key="a"), _entry("2025-03-11", 7, idempotency_key="b")]}
+    assert route("POST", "/expenses", {}, body) == (HTTPStatus.CREATED, {"created": 2, "duplicates": 0})
+    assert route("POST", "/expenses", {}, body) == (HTTPStatus.CREATED, {"created": 0, "duplicates": 2})
+
+
+def test_cursor_pagination(backend):
+    route("POST", "/expenses", {}, {"entries": [_entry(f"2025-03-{d:02d}", d, f"Day {d}") for d in range(1, 8)]})
+    seen, cursor = [], None
+    while True:
+        _, page = route("GET", "/expenses", {"limit": "3", **({"cursor": cursor} if cursor else {})}, None)
+        seen += [item["description"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [f"Day {d}" for d in range(7, 0, -1)]
+
+    _, page = route("GET", "/expenses", {"start": "2025-03-02", "end": "2025-03-03"}, None)
+    assert [item["amount"] for item in page["items"]] == [3.0, 2.0]
+    for query in ({"limit": "0"}, {"cursor": "not-a-cursor"}, {"start": "2025-03-05", "end": "2025-03-01"}):
+        with pytest.raises(ApiError) as error:
+            route("GET", "/expenses", query, None)
+        assert error.value.status == HTTPStatus.BAD_REQUEST
+
+
+def test_totals_and_categories(backend):
+    route("POST", "/expenses", {}, {"entries": [_entry("2025-03-10", 5), _entry("2025-04-02", 7)]})
+    _, totals = route("GET", "/expenses/categories", {"start": "2025-03-01", "end": "2025-04-30"}, None)
+    assert totals["totals"]["Food"] == 12.0
+
+    assert route("POST", "/categories", {}, {"kind": "expenses", "name": "Pets"})[0] == HTTPStatus.CREATED
+    assert "Pets" in route("GET", "/categories", {}, None)[1]["expenses"]
+    with pytest.raises(ApiError) as error:
+        route("GET", "/nowhere", {}, None)
+    assert error.value.status == HTTPStatus.NOT_FOUND
+
+
+def test_period_totals(server_backend):
+    route("POST", "/expenses", {}, {"entries": [_entry("2025-03-10", 5), _entry("2025-04-02", 7)]})
+    _, periods = route("GET", "/expenses/totals", {"start": "2025-03-01", "end": "2025-04-30", "unit": "month"}, None)
+    assert [(p["period"].isoformat(), p["amount"]) for p in periods["totals"]] == [("2025-03-01", 5.0), ("2025-04-01", 7.0)]
+    with pytest.raises(ApiError) as error:
+        route("GET", "/expenses/totals", {"start": "2025-03-01", "end": "2025-04-30", "unit": "year"}, None)
+    assert error.value.status == HTTPStatus.BAD_REQUEST
+
+
+def test_oversized_batch(backend, monkeypatch):
+    monkeypatch.setattr(config, "API_MAX_BATCH", 2)
+    with pytest.raises(ApiError) as error:
+        route("POST", "/expenses", {}, {"entries": [_entry("2025-03-10", 5)] * 3})
+    assert error.value.status == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+
+
+@pytest.fixture
+def server(backend, monkeypatch):
+    monkeypatch.setattr(config, "API_TOKEN", "s3cret")
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), api.ApiHandler)
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _request(port: int, method: str, path: str, body=None, token: str = "s3cret", **headers):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    data = body if isinstance(body, bytes) else json.dumps(body).encode() if body is not None else None
+    conn.request(method, path, body=data, headers=headers)
+    response = conn.getresponse()
+    payload = json.loads(response.read())
+    conn.close()
+    return response.status, payload
+
+
+def test_http_auth_and_ledgers(server):
+    assert _request(server, "GET", "/health", token=None)[0] == HTTPStatus.UNAUTHORIZED
+    assert _request(server, "GET", "/health", token="wrong")[0] == HTTPStatus.UNAUTHORIZED
+    assert _request(server, "GET", "/health") == (HTTPStatus.OK, {"status": "ok"})
+
+    LedgerModel.create_ledger("Household", config.DEFAULT_USER_ID)
+    body = {"entries": [_entry("2025-03-10", 5)]}
+    assert _request(server, "POST", "/expenses", body, **{"X-Ledger": "household"})[0] == HTTPStatus.CREATED
+    assert len(_request(server, "GET", "/expenses?ledger=household")[1]["items"]) == 1
+    assert _request(server, "GET", "/expenses")[1]["items"] == []
+    assert _request(server, "GET", "/expenses?ledger=missing")[0] == HTTPStatus.NOT_FOUND
+
+
+def test_http_rejects_bad_bodies(server, monkeypatch):
+    assert _request(server, "POST", "/expenses", b"{not json")[0] == HTTPStatus.BAD_REQUEST
+    monkeypatch.setattr(config, "API_MAX_BODY_BYTES", 10)
+    assert _request(server, "POST", "/expenses", {"entries": [_entry("2025-03-10", 5)]})[0] == (
+        HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    )
+
+
+def test_http_outage_is_503(server, monkeypatch):
+    def unavailable(entries):
+        raise DatabaseUnavailable("connection refused")
+    monkeypatch.setitem(api._KINDS["expenses"], "create", unavailable)
+    status, payload = _request(server, "POST", "/expenses", {"entries": [_entry("2025-03-10", 5)]})
+    assert (status, payload) == (HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Database unavailable"})
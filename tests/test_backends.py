@@ -0,0 +1,135 @@
+"""
+The model layer against every storage backend; each test runs once on
+SQLite and once on MongoDB
+"""
+from datetime import date, datetime
+import config
+from database.event_model import EventModel
+from database.ledger import ledger_scope
+from database.ledger_model import LedgerModel
+from database.models import ExpenseModel
+from database.tiers import LedgerTiers
+
+
+def _expense(day: datetime, amount: float, description: str = "Coffee", **extra):
+    return {"date": day, "category": "Food", "description": description, "amount": amount, **extra}
+
+
+def test_create_update_delete_expense(backend):
+    day = datetime(2025, 3, 10)
+    assert ExpenseModel.create_expense(day, "Food", "Lunch", 12.5)
+    [stored] = ExpenseModel.get_expenses()
+    assert (stored["date"], stored["category"], stored["description"], stored["amount"]) == (day, "Food", "Lunch", 12.5)
+    assert backend.get_category_month_totals(2025, 3) == {"Food": 12.5}
+
+    assert ExpenseModel.update_expense(str(stored["_id"]), datetime(2025, 4, 1), "Transport", "Bus", 3.0)
+    [updated] = ExpenseModel.get_expenses()
+    assert (updated["date"], updated["category"], updated["amount"]) == (datetime(2025, 4, 1), "Transport", 3.0)
+    assert backend.get_category_month_totals(2025, 3).get("Food", 0) == 0
+    assert backend.get_category_month_totals(2025, 4) == {"Transport": 3.0}
+
+    assert ExpenseModel.delete_expense(str(stored["_id"]))
+    assert ExpenseModel.get_expenses() == []
+    assert not ExpenseModel.delete_expense(str(stored["_id"]))
+
+
+def test_entries_stay_in_their_ledger(backend):
+    ExpenseModel.create_expense(datetime(2025, 3, 10), "Food", "Lunch", 12.5)
+    with ledger_scope("other"):
+        assert ExpenseModel.get_expenses() == []
+        ExpenseModel.create_expense(datetime(2025, 3, 11), "Food", "Dinner", 20.0)
+    assert [e["description"] for e in ExpenseModel.get_expenses()] == ["Lunch"]
+
+
+def test_repeated_idempotency_key_creates_once(backend):
+    day = datetime(2025, 3, 10)
+    assert ExpenseModel.create_expense(day, "Food", "Coffee", 3.0, idempotency_key="form-1")
+    assert ExpenseModel.create_expense(day, "Food", "Coffee", 3.0, idempotency_key="form-1")
+    # Identical content under its own key is a second coffee, not a duplicate
+    assert ExpenseModel.create_expense(day, "Food", "Coffee", 3.0, idempotency_key="form-2")
+    assert len(ExpenseModel.get_expenses()) == 2
+    assert backend.get_category_month_totals(2025, 3) == {"Food": 6.0}
+
+
+def test_batch_insert_skips_used_keys(backend):
+    day = datetime(2025, 3, 10)
+    first = ExpenseModel.create_expenses([_expense(day, 3.0, idempotency_key="a"), _expense(day, 3.0)])
+    assert len(first) == 2
+    again = ExpenseModel.create_expenses([
+        _expense(day, 3.0, idempotency_key="a"),
+        _expense(day, 3.0, idempotency_key="b"),
+        _expense(day, 3.0),
+    ])
+    assert [e.get("idempotency_key") for e in again] == ["b", None]
+    assert len(ExpenseModel.get_expenses()) == 4
+
+    ids = backend.insert_entries(config.EXPENSES_COLLECTION, [
+        {**_expense(day, 1.0), "idempotency_key": "b"},
+        {**_expense(day, 1.0), "idempotency_key": "c"},
+    ])
+    assert ids[0] is None and ids[1] is not None
+
+
+def test_statement_import_skips_stored_entries(backend):
+    rows = [_expense(datetime(2025, 3, 10), 3.0), _expense(datetime(2025, 3, 10), 3.0)]
+    assert len(ExpenseModel.create_expenses(rows, skip_duplicates=True)) == 2
+    assert ExpenseModel.create_expenses(rows, skip_duplicates=True) == []
+    assert len(ExpenseModel.get_expenses()) == 2
+
+
+def test_reads_span_hot_and_archive_tiers(backend):
+    old_year = date.today().year - config.ARCHIVE_HOT_YEARS
+    old, recent = datetime(old_year, 6, 1), datetime(date.today().year, 1, 2)
+    ExpenseModel.create_expenses([_expense(old, 10.0, "Old"), _expense(recent, 5.0, "Recent")])
+    assert LedgerTiers.archive_closed_years() == 1
+
+    assert [e["description"] for e in backend.find_entries(config.EXPENSES_COLLECTION)] == ["Recent"]
+    archive = config.ARCHIVE_COLLECTIONS[config.EXPENSES_COLLECTION]
+    assert [e["description"] for e in backend.find_entries(archive)] == ["Old"]
+    assert [e["description"] for e in ExpenseModel.get_expenses()] == ["Recent", "Old"]
+    assert [e["description"] for e in ExpenseModel.get_expenses(start_date=datetime(old_year + 1, 1, 1))] == ["Recent"]
+    assert LedgerTiers.total_amount(config.EXPENSES_COLLECTION, datetime(old_year, 1, 1), datetime.now()) == 15.0
+
+    # Keyset pagination walks from the hot tier into the archive
+    [first] = ExpenseModel.get_expenses(limit=1)
+    [second] = ExpenseModel.get_expenses(limit=1, before=(first["date"], str(first["_id"])))
+    assert second["description"] == "Old"
+
+    # An edited archived entry moves back to the hot tier
+    assert ExpenseModel.update_expense(str(second["_id"]), old, "Food", "Older", 11.0)
+    assert backend.find_entries(archive) == []
+    assert [e["description"] for e in ExpenseModel.get_expenses()] == ["Recent", "Older"]
+    assert ExpenseModel.delete_expense(str(second["_id"]))
+    assert [e["description"] for e in ExpenseModel.get_expenses()] == ["Recent"]
+
+
+def test_due_event_is_posted_once(backend):
+    assert EventModel.create_event("Rent", "Housing", 900.0, day_of_month=1, frequency="daily")
+    [result] = EventModel.run_due_events()
+    assert result["status"] == "executed"
+    # Not due again until tomorrow
+    assert EventModel.run_due_events() == []
+    # A forced run restores missing entries only
+    [forced] = EventModel.run_due_events(force=True)
+    assert forced["status"] == "skipped"
+
+    [entry] = ExpenseModel.get_expenses()
+    event_id = str(result["event"]["_id"])
+    assert (entry["category"], entry["amount"], entry["event_id"]) == ("Housing", 900.0, event_id)
+    assert len(EventModel.get_execution_history(event_id)) == 1
+
+    # Manual runs are recorded each time
+    assert EventModel.execute_single_event(event_id)
+    assert len(ExpenseModel.get_expenses()) == 2
+    assert len(EventModel.get_execution_history(event_id)) == 2
+
+
+def test_ledgers_are_listed_per_user(backend):
+    assert LedgerModel.create_ledger("Alice home", "alice") == "alice-home"
+    assert LedgerModel.create_ledger("Alice Home", "bob") is None
+    assert [l["_id"] for l in LedgerModel.get_ledgers("alice")] == ["alice-home"]
+    assert [l["_id"] for l in LedgerModel.get_ledgers(config.DEFAULT_USER_ID)] == [config.DEFAULT_LEDGER_ID]
+
+    assert LedgerModel.set_owner("alice-home", "bob")
+    assert LedgerModel.get_ledgers("alice") == []
+    assert [l["_id"] for l in LedgerModel.get_ledgers("bob")] == ["alice-home"]
@@ -0,0 +1,68 @@
+"""
+Category budgets and the running month totals they are evaluated from
+(database/budget_model.py) on every storage backend
+"""
+from datetime import datetime
+import config
+from database.budget_model import BudgetModel
+from database.ledger import ledger_scope
+from database.models import ExpenseModel
+
+
+def test_expense_writes_keep_month_totals(backend):
+    assert ExpenseModel.create_expense(datetime(2025, 3, 1), "Food", "Lunch", 12.5)
+    assert ExpenseModel.create_expense(datetime(2025, 3, 2), "Food", "Dinner", 20.0)
+    [lunch] = [e for e in ExpenseModel.get_expenses() if e["description"] == "Lunch"]
+
+    assert ExpenseModel.update_expense(str(lunch["_id"]), datetime(2025, 3, 1), "Food", "Lunch", 15.0)
+    assert backend.get_category_month_totals(2025, 3) == {"Food": 35.0}
+    assert ExpenseModel.update_expense(str(lunch["_id"]), datetime(2025, 3, 1), "Transport", "Taxi", 15.0)
+    assert backend.get_category_month_totals(2025, 3) == {"Food": 20.0, "Transport": 15.0}
+    assert ExpenseModel.delete_expense(str(lunch["_id"]))
+    assert backend.get_category_month_totals(2025, 3).get("Transport", 0) == 0
+
+
+def test_budget_status(backend):
+    assert BudgetModel.get_budget_status(2025, 3) == []
+    assert BudgetModel.set_budget("Food", 100)
+    assert BudgetModel.set_budget("Transport", 50)
+    assert BudgetModel.set_budget("Rent", 1000)
+    ExpenseModel.create_expense(datetime(2025, 3, 1), "Food", "Groceries", 85.0)
+    ExpenseModel.create_expense(datetime(2025, 3, 2), "Transport", "Train", 60.0)
+    ExpenseModel.create_expense(datetime(2025, 4, 1), "Rent", "April", 1000.0)
+
+    status = {s["category"]: s for s in BudgetModel.get_budget_status(2025, 3)}
+    assert [s["category"] for s in BudgetModel.get_budget_status(2025, 3)] == ["Transport", "Food", "Rent"]
+    assert (status["Food"]["spent"], status["Food"]["remaining"]) == (85.0, 15.0)
+    assert status["Food"]["warning"] and not status["Food"]["over_budget"]
+    assert status["Transport"]["over_budget"] and not status["Transport"]["warning"]
+    assert status["Rent"]["spent"] == 0.0
+
+    assert BudgetModel.remove_budget("Rent")
+    assert set(BudgetModel.get_budgets()) == {"Food", "Transport"}
+
+
+def test_totals_are_built_for_expenses_older_than_budgets(backend):
+    # Entries stored without going through the model have no running totals
+    with ledger_scope("imported"):
+        backend.insert_entries(config.EXPENSES_COLLECTION, [
+            {"date": datetime(2025, 3, 1), "category": "Food", "description": "Old", "amount": 40.0},
+        ])
+        BudgetModel.set_budget("Food", 100)
+        [food] = BudgetModel.get_budget_status(2025, 3)
+        assert food["spent"] == 40.0
+
+
+def test_rebuild_replaces_totals(backend):
+    ExpenseModel.create_expense(datetime(2025, 3, 1), "Food", "Lunch", 5.0)
+    ExpenseModel.create_expense(datetime(2025, 4, 1), "Rent", "April", 7.0)
+    backend.increment_category_month(2025, 3, "Ghost", 3.0)
+    backend.increment_category_month(2025, 3, "Food", 100.0)
+
+    assert BudgetModel.rebuild_totals(2025)
+    assert backend.get_category_month_totals(2025, 3) == {"Food": 5.0}
+    assert backend.get_category_month_totals(2025, 4) == {"Rent": 7.0}
+    backend.increment_category_month(2024, 1, "Ghost", 3.0)
+    assert BudgetModel.rebuild_totals()
+    assert backend.get_category_month_totals(2024, 1) == {}
+    assert backend.get_category_month_totals(2025, 3) == {"Food": 5.0}
@@ -0,0 +1,170 @@
+"""
+The in-process read cache (database/cache.py) and the change-stream watcher
+feeding it invalidations (database/change_watcher.py)
+"""
+from datetime import datetime
+import config
+import database.cache as cache
+import database.change_watcher as change_watcher
+from database.cache import add_invalidation_listener, cached, invalidate, invalidate_all, rerun_scope
+from database.category_model import CategoryModel
+from database.ledger import ledger_scope
+from database.models import ExpenseModel
+
+
+def _counting_read(*collections):
+    # Every read made here shares one qualname, so start from an empty cache
+    invalidate_all()
+    calls = []
+
+    @cached(*collections)
+    def read(value):
+        calls.append(value)
+        return {"value": value}
+    return read, calls
+
+
+def test_reads_are_cached_until_invalidated():
+    read, calls = _counting_read(config.EXPENSES_COLLECTION)
+    assert read(1) == read(1) == {"value": 1}
+    read(2)
+    assert calls == [1, 2]
+
+    invalidate(config.CATEGORIES_COLLECTION)
+    read(1)
+    assert calls == [1, 2]
+    invalidate(config.EXPENSES_COLLECTION)
+    read(1)
+    assert calls == [1, 2, 1]
+
+
+def test_cached_values_are_copies():
+    read, _ = _counting_read(config.EXPENSES_COLLECTION)
+    read(1)["value"] = "changed"
+    assert read(1) == {"value": 1}
+
+
+def test_reads_are_kept_per_ledger():
+    read, calls = _counting_read(config.EXPENSES_COLLECTION)
+    read(1)
+    with ledger_scope("other"):
+        read(1)
+    read(1)
+    assert calls == [1, 1]
+
+
+def test_entries_expire(monkeypatch):
+    monkeypatch.setattr(config, "CACHE_TTL_SECONDS", 0)
+    read, calls = _counting_read(config.EXPENSES_COLLECTION)
+    read(1)
+    read(1)
+    assert calls == [1, 1]
+
+
+def test_model_writes_invalidate_with_their_months(backend, monkeypatch):
+    monkeypatch.setattr(cache, "_listeners", [])
+    seen = []
+    add_invalidation_listener(lambda collection, months: seen.append((collection, sorted(months or []))))
+
+    assert ExpenseModel.create_expense(datetime(2025, 3, 10), "Food", "Lunch", 12.5)
+    [stored] = ExpenseModel.get_expenses()
+    assert ExpenseModel.update_expense(str(stored["_id"]), datetime(2025, 4, 1), "Food", "Lunch", 12.5)
+    assert (config.EXPENSES_COLLECTION, [(2025, 3)]) in seen
+    assert (config.EXPENSES_COLLECTION, [(2025, 3), (2025, 4)]) in seen
+
+    assert "Pets" not in CategoryModel.get_custom_categories()
+    CategoryModel.add_category("Pets")
+    assert "Pets" in CategoryModel.get_custom_categories()
+
+
+class _Stream:
+    """One change, then the watcher is asked to stop"""
+
+    def __init__(self, watcher, collection):
+        self._watcher = watcher
+        self._changes = [{"ns": {"coll": collection}}]
+        self.alive = True
+        self.resume_token = {"_data": "token"}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def try_next(self):
+        if self._changes:
+            return self._changes.pop()
+        self._watcher.stop()
+        return None
+
+
+class _Database:
+    def __init__(self, watcher, collection):
+        self._watcher = watcher
+        self._collection = collection
+        self.resumed_after = []
+
+    def watch(self, pipeline, resume_after=None, max_await_time_ms=None):
+        self.resumed_after.append(resume_after)
+        return _Stream(self._watcher, self._collection)
+
+
+def test_watcher_invalidates_changed_collections(monkeypatch):
+    monkeypatch.setattr(cache, "_listeners", [])
+    seen = []
+    add_invalidation_listener(lambda collection, months: seen.append(collection))
+    watcher = change_watcher.ChangeStreamWatcher()
+    db = _Database(watcher, config.EXPENSES_COLLECTION)
+    monkeypatch.setattr(change_watcher, "get_db", lambda: db)
+
+    watcher.run()
+    assert seen == [config.EXPENSES_COLLECTION]
+    assert watcher._resume_token == {"_data": "token"}
+
+
+def test_watcher_only_starts_on_mongodb(monkeypatch):
+    monkeypatch.setattr(config, "CHANGE_STREAM_WATCHER", True)
+    monkeypatch.setattr(config, "STORAGE_BACKEND", "sqlite")
+    assert change_watcher.start_change_watcher() is None
+    monkeypatch.setattr(config, "CHANGE_STREAM_WATCHER", False)
+    monkeypatch.setattr(config, "STORAGE_BACKEND", "mongodb")
+    assert change_watcher.start_change_watcher() is None
+
+
+def test_rerun_scope_reads_once(monkeypatch):
+    # Expired entries are still reused within one script run
+    monkeypatch.setattr(config, "CACHE_TTL_SECONDS", 0)
+    read, calls = _counting_read(config.EXPENSES_COLLECTION, config.CATEGORIES_COLLECTION)
+    with rerun_scope():
+        assert read(1) == read(1) == {"value": 1}
+        read(2)
+        read(1)["value"] = "changed"
+        assert read(1) == {"value": 1}
+    assert calls == [1, 2]
+    read(1)
+    assert calls == [1, 2, 1]
+
+
+def test_writes_inside_a_rerun_drop_its_reads():
+    read, calls = _counting_read(config.EXPENSES_COLLECTION)
+    categories, category_calls = _counting_read(config.CATEGORIES_COLLECTION)
+    with rerun_scope():
+        read(1)
+        # Both reads share a qualname; the argument keeps them apart
+        categories(2)
+        invalidate(config.EXPENSES_COLLECTION)
+        read(1)
+        categories(2)
+    assert calls == [1, 1]
+    assert category_calls == [2]
+
+
+def test_reruns_do_not_share_reads(monkeypatch):
+    monkeypatch.setattr(config, "CACHE_TTL_SECONDS", 0)
+    read, calls = _counting_read(config.EXPENSES_COLLECTION)
+    with rerun_scope():
+        read(1)
+    with rerun_scope():
+        read(1)
+    assert calls == [1, 1]
@@ -0,0 +1,143 @@
+"""
+The circuit breaker in front of database servers (database/backend.py) and
+the cache's last known-good values served while it is open
+(database/cache.py)
+"""
+from collections import OrderedDict
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+import config
+import database.backend as backend_module
+import database.cache as cache
+from database.backend import CircuitBreaker, DatabaseUnavailable, _GuardedBackend, database_available
+from database.cache import cached, clear_served_stale, invalidate, served_stale
+from database.category_model import CategoryModel
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(backend_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(threshold=3, reset_seconds=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert not breaker.is_open
+    breaker.record_failure()
+    assert breaker.is_open
+    with pytest.raises(DatabaseUnavailable):
+        breaker.before_call()
+
+
+def test_one_trial_call_after_the_reset_time(clock):
+    breaker = CircuitBreaker(threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock[0] += 31
+    breaker.before_call()
+    # Only one caller gets to try
+    with pytest.raises(DatabaseUnavailable):
+        breaker.before_call()
+    breaker.record_failure()
+    with pytest.raises(DatabaseUnavailable):
+        breaker.before_call()
+
+    clock[0] += 31
+    breaker.before_call()
+    breaker.record_success()
+    assert not breaker.is_open
+    breaker.before_call()
+
+
+class _FlakyBackend:
+    connection_errors = (ConnectionError,)
+
+    def __init__(self):
+        self.down = False
+
+    def read(self):
+        if self.down:
+            raise ConnectionError("refused")
+        return "ok"
+
+    def reject(self):
+        raise ValueError("bad input")
+
+
+def test_guarded_backend_counts_connection_errors_only(clock):
+    inner, breaker = _FlakyBackend(), CircuitBreaker(threshold=2, reset_seconds=30)
+    guarded = _GuardedBackend(inner, breaker)
+    assert guarded.read() == "ok"
+    assert guarded.connection_errors == (ConnectionError,)
+
+    inner.down = True
+    for _ in range(2):
+        with pytest.raises(DatabaseUnavailable):
+            guarded.read()
+    assert breaker.is_open
+
+    clock[0] += 31
+    with pytest.raises(ValueError):
+        guarded.reject()
+    # The database answered, even if only to reject the call
+    assert not breaker.is_open
+
+
+@pytest.fixture
+def fresh_stale_cache(monkeypatch):
+    monkeypatch.setattr(cache, "_last_good", OrderedDict())
+    clear_served_stale()
+    yield
+    clear_served_stale()
+
+
+def test_reads_fall_back_to_the_last_good_value(fresh_stale_cache):
+    state = {"down": True, "value": 1}
+
+    @cached(config.EXPENSES_COLLECTION)
+    def read():
+        if state["down"]:
+            raise DatabaseUnavailable("down")
+        return {"value": state["value"]}
+
+    # Nothing to fall back to yet
+    with pytest.raises(DatabaseUnavailable):
+        read()
+    state["down"] = False
+    assert read() == {"value": 1}
+
+    state.update(down=True, value=2)
+    invalidate(config.EXPENSES_COLLECTION)
+    assert not served_stale()
+    assert read() == {"value": 1}
+    assert served_stale()
+
+    clear_served_stale()
+    state["down"] = False
+    assert read() == {"value": 2}
+    assert not served_stale()
+
+
+def test_mongodb_outage_serves_stale_categories(backend, monkeypatch, fresh_stale_cache):
+    if config.STORAGE_BACKEND != "mongodb":
+        pytest.skip("SQLite is a local file with no circuit breaker")
+    import database.mongo_backend as mongo_backend
+    monkeypatch.setattr(config, "CIRCUIT_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(backend_module, "_backend", None)
+    CategoryModel.add_category("Pets")
+    assert "Pets" in CategoryModel.get_custom_categories()
+
+    def unreachable():
+        raise ServerSelectionTimeoutError("no servers")
+    monkeypatch.setattr(mongo_backend, "get_db", unreachable)
+    for _ in range(2):
+        invalidate(config.CATEGORIES_COLLECTION)
+        assert "Pets" in CategoryModel.get_custom_categories()
+    assert served_stale()
+    assert not database_available()
+    assert not CategoryModel.add_category("Birds")
@@ -0,0 +1,92 @@
+"""
+The batch command line (budget_tracker.py) on every storage backend
+"""
+from datetime import datetime
+import pytest
+import config
+from budget_tracker import main
+from database.event_model import EventModel
+from database.investment_model import InvestmentModel
+from database.ledger import ledger_scope
+from database.ledger_model import LedgerModel
+from database.models import ExpenseModel
+
+
+def _seed():
+    ExpenseModel.create_expenses([
+        {"date": datetime(2025, 3, 10), "category": "Food", "description": "Lunch, with tip", "amount": 12.5},
+        {"date": datetime(2025, 4, 2), "category": "Transport", "description": "", "amount": 3.0},
+    ])
+
+
+def test_export_import_round_trip(backend, tmp_path, capsys):
+    _seed()
+    csv = tmp_path / "expenses.csv"
+    assert main(["export", "expenses", "-o", str(csv)]) == 0
+    assert csv.read_text().splitlines() == [
+        "Date,Category,Description,Amount",
+        "2025-04-02,Transport,,3.0",
+        '2025-03-10,Food,"Lunch, with tip",12.5',
+    ]
+
+    LedgerModel.create_ledger("Copy", config.DEFAULT_USER_ID)
+    assert main(["--ledger", "copy", "import", "expenses", str(csv)]) == 0
+    assert main(["--ledger", "copy", "import", "expenses", str(csv)]) == 0
+    assert "Imported 0 expenses, skipped 2 duplicate(s)" in capsys.readouterr().out
+    with ledger_scope("copy"):
+        assert [(e["description"], e["amount"]) for e in ExpenseModel.get_expenses()] == [
+            ("", 3.0), ("Lunch, with tip", 12.5),
+        ]
+
+    assert main(["export", "expenses", "--start", "2025-04-01", "-o", str(csv)]) == 0
+    assert len(csv.read_text().splitlines()) == 2
+
+
+def test_invalid_files_import_nothing(backend, tmp_path, capsys):
+    csv = tmp_path / "bad.csv"
+    csv.write_text("date,category,description,amount\n2025-03-10,Food,Lunch,12.5\n2025-03-11,Pets,Food,abc\n")
+    assert main(["import", "expenses", str(csv)]) == 1
+    err = capsys.readouterr().err
+    assert "Row 2: Invalid category" in err and "Row 2: Amount is required" in err
+    assert ExpenseModel.get_expenses() == []
+
+    csv.write_text("Date,Amount\n2025-03-10,12.5\n")
+    assert main(["import", "expenses", str(csv)]) == 1
+    assert "missing column(s) Category, Description" in capsys.readouterr().err
+
+
+def test_unknown_ledger(backend):
+    with pytest.raises(SystemExit):
+        main(["--ledger", "missing", "export", "expenses"])
+
+
+def test_run_scheduler(backend, capsys):
+    LedgerModel.create_ledger("Household", config.DEFAULT_USER_ID)
+    with ledger_scope("household"):
+        EventModel.create_event("Coffee", "Food", 3.0, day_of_month=1, frequency="daily")
+
+    assert main(["run-scheduler"]) == 0
+    assert "[default] No payments due" in capsys.readouterr().out
+    assert main(["run-scheduler", "--all-ledgers"]) == 0
+    assert "[household] executed   Coffee" in capsys.readouterr().out
+    with ledger_scope("household"):
+        assert len(ExpenseModel.get_expenses()) == 1
+
+
+def test_migrate_categories(backend, capsys):
+    ExpenseModel.create_expenses([
+        {"date": datetime(2025, 3, 1), "category": "SIP", "description": "Index fund", "amount": 5000.0},
+        {"date": datetime(2025, 3, 2), "category": "Food", "description": "Lunch", "amount": 12.5},
+    ])
+    assert main(["migrate-categories", "--dry-run"]) == 0
+    assert "Found 1 expense(s)" in capsys.readouterr().out
+    assert len(ExpenseModel.get_expenses()) == 2
+
+    assert main(["migrate-categories"]) == 0
+    assert [e["category"] for e in ExpenseModel.get_expenses()] == ["Food"]
+    assert [e["description"] for e in InvestmentModel.get_investments()] == ["Index fund"]
+
+
+def test_rebuild_indexes(backend, capsys):
+    assert main(["rebuild-indexes"]) == 0
+    assert "Indexes are up to date" in capsys.readouterr().out
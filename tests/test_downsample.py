@@ -0,0 +1,37 @@
+"""
+Largest-Triangle-Three-Buckets downsampling of trend charts (utils/downsample.py)
+"""
+import numpy as np
+from utils.downsample import lttb
+
+
+def test_short_series_are_kept_whole():
+    x = np.arange(10)
+    assert lttb(x, x * 2.0, 10).tolist() == list(range(10))
+    assert lttb(x, x * 2.0, 50).tolist() == list(range(10))
+    assert lttb(x, x * 2.0, 2).tolist() == list(range(10))
+
+
+def test_keeps_threshold_points_in_order():
+    rng = np.random.default_rng(7)
+    x = np.arange(1000)
+    keep = lttb(x, rng.normal(50, 10, 1000), 100)
+    assert len(keep) == 100
+    assert keep[0] == 0 and keep[-1] == 999
+    assert (np.diff(keep) > 0).all()
+
+
+def test_peaks_and_dips_survive():
+    y = np.full(3650, 20.0)
+    y[1234], y[2900] = 5000.0, -800.0
+    keep = lttb(np.arange(3650), y, 200)
+    assert 1234 in keep and 2900 in keep
+
+
+def test_uneven_x_spacing():
+    # Days with no spending are missing from the series
+    x = np.array([0, 1, 2, 10, 11, 40, 41, 42, 90, 91], dtype=float)
+    y = np.array([1, 1, 9, 1, 1, 1, 30, 1, 1, 1], dtype=float)
+    keep = lttb(x, y, 5)
+    assert keep.tolist()[0] == 0 and keep.tolist()[-1] == 9
+    assert 6 in keep
@@ -0,0 +1,60 @@
+"""
+Content fingerprints of entries (utils/fingerprint.py) and the duplicate
+detection built on them, on every storage backend
+"""
+from datetime import date, datetime
+import config
+from database.investment_model import InvestmentModel
+from database.models import ExpenseModel
+from utils.fingerprint import entry_fingerprint, normalize_description
+
+
+def test_normalize_description():
+    assert normalize_description("  Coffee   at\tthe  Corner ") == "coffee at the corner"
+    assert normalize_description(None) == ""
+
+
+def test_fingerprint_ignores_time_spelling_and_amount_format():
+    base = entry_fingerprint(datetime(2025, 3, 10, 9, 30), "Food", "Coffee", 3)
+    assert entry_fingerprint(date(2025, 3, 10), "Food", "  COFFEE ", 3.0) == base
+    assert entry_fingerprint("2025-03-10T00:00:00", "Food", "coffee", "3.00") == base
+
+    assert entry_fingerprint(date(2025, 3, 11), "Food", "Coffee", 3) != base
+    assert entry_fingerprint(date(2025, 3, 10), "Drinks", "Coffee", 3) != base
+    assert entry_fingerprint(date(2025, 3, 10), "Food", "Tea", 3) != base
+    assert entry_fingerprint(date(2025, 3, 10), "Food", "Coffee", 3.01) != base
+
+
+def _expense(description: str, amount: float = 3.0):
+    return {"date": datetime(2025, 3, 10), "category": "Food", "description": description, "amount": amount}
+
+
+def test_reimport_matches_differently_spelled_rows(backend):
+    assert len(ExpenseModel.create_expenses([_expense("Coffee"), _expense("Bagel", 4.0)], skip_duplicates=True)) == 2
+    created = ExpenseModel.create_expenses(
+        [_expense("  COFFEE"), _expense("bagel", 4.0), _expense("Bagel", 4.5)], skip_duplicates=True
+    )
+    assert [(e["description"], e["amount"]) for e in created] == [("Bagel", 4.5)]
+    # Entered by hand, the same content is a second purchase
+    assert len(ExpenseModel.create_expenses([_expense("Coffee")])) == 1
+    assert len(ExpenseModel.get_expenses()) == 4
+
+
+def test_edits_refresh_the_fingerprint(backend):
+    ExpenseModel.create_expense(datetime(2025, 3, 10), "Food", "Coffee", 3.0)
+    [stored] = ExpenseModel.get_expenses()
+    assert ExpenseModel.update_expense(str(stored["_id"]), datetime(2025, 3, 12), "Food", "Tea", 2.0)
+
+    coffee = entry_fingerprint(datetime(2025, 3, 10), "Food", "Coffee", 3.0)
+    tea = entry_fingerprint(datetime(2025, 3, 12), "Food", "Tea", 2.0)
+    assert backend.fingerprint_counts(config.EXPENSES_COLLECTION, [coffee, tea]) == {tea: 1}
+    assert ExpenseModel.create_expenses(
+        [{"date": datetime(2025, 3, 12), "category": "Food", "description": "tea", "amount": 2.0}],
+        skip_duplicates=True,
+    ) == []
+
+
+def test_investments_are_matched_too(backend):
+    row = {"date": datetime(2025, 3, 1), "category": "SIP", "description": "Index fund", "amount": 5000.0}
+    assert len(InvestmentModel.create_investments([row], skip_duplicates=True)) == 1
+    assert InvestmentModel.create_investments([row], skip_duplicates=True) == []
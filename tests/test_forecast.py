@@ -0,0 +1,74 @@
+"""
+Month-end and quarter-end spend projections (utils/forecast.py)
+"""
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+from utils.forecast import occurrence_matrix, period_end, project_totals, quarter_start, scheduled_per_day
+
+
+def _days(start: str, end: str) -> np.ndarray:
+    return np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+
+
+def test_monthly_events_fall_on_the_last_day_of_short_months():
+    days = _days("2024-02-01", "2024-04-30")
+    occurs = occurrence_matrix(
+        days,
+        schedule_day=np.array([31, 15]),
+        is_daily=np.array([False, False]),
+        active_from=np.array(["1970-01-01", "2024-03-20"], dtype="datetime64[D]"),
+    )
+    assert [str(d) for d in days[occurs[0]]] == ["2024-02-29", "2024-03-31", "2024-04-30"]
+    # Not active yet on March 15th
+    assert [str(d) for d in days[occurs[1]]] == ["2024-04-15"]
+
+
+def test_scheduled_per_day():
+    days = _days("2025-05-30", "2025-06-01")
+    events = [
+        {"frequency": "monthly", "day_of_month": 31, "amount": 1000},
+        {"frequency": "daily", "amount": 2.5, "created_at": datetime(2025, 5, 31, 9, 0)},
+    ]
+    assert scheduled_per_day(days, events).tolist() == [0.0, 1002.5, 2.5]
+    assert scheduled_per_day(days, []).tolist() == [0.0, 0.0, 0.0]
+
+
+def test_periods():
+    assert quarter_start(date(2025, 5, 17)) == date(2025, 4, 1)
+    assert period_end(date(2025, 5, 17), 1) == date(2025, 5, 31)
+    assert period_end(date(2025, 5, 17), 3) == date(2025, 6, 30)
+    assert period_end(date(2024, 12, 1), 3) == date(2024, 12, 31)
+
+
+def test_projection_adds_run_rate_and_remaining_occurrences():
+    entries = pd.DataFrame({
+        "date": [datetime(2025, 4, d) for d in range(1, 11)] + [datetime(2025, 4, 5), datetime(2025, 3, 1)],
+        "amount": [10.0] * 10 + [500.0, 999.0],
+        # The rent the scheduler posted doesn't count towards the run rate
+        "scheduled": [False] * 10 + [True, False],
+    })
+    events = [
+        {"frequency": "monthly", "day_of_month": 31, "amount": 1000, "created_at": datetime(2025, 1, 1)},
+        {"frequency": "daily", "amount": 1.0, "created_at": datetime(2025, 5, 1)},
+    ]
+    forecast = project_totals(entries, events, today=date(2025, 4, 10), lookback_days=10)
+
+    month = forecast["month"]
+    assert month["end"] == date(2025, 4, 30)
+    assert (month["to_date"], month["run_rate"]) == (600.0, 10.0)
+    # 20 days left, rent on the 30th
+    assert (month["unscheduled"], month["scheduled"], month["projected"]) == (200.0, 1000.0, 1800.0)
+
+    quarter = forecast["quarter"]
+    assert quarter["end"] == date(2025, 6, 30)
+    # 81 days left; rent three times and the daily event from May 1st
+    assert (quarter["unscheduled"], quarter["scheduled"]) == (810.0, 3061.0)
+    assert quarter["projected"] == 600.0 + 810.0 + 3061.0
+
+
+def test_projection_without_history():
+    empty = pd.DataFrame(columns=["date", "amount", "scheduled"])
+    forecast = project_totals(empty, [], today=date(2025, 4, 30), lookback_days=30)
+    assert forecast["month"]["projected"] == 0.0
+    assert forecast["quarter"]["unscheduled"] == 0.0
@@ -0,0 +1,75 @@
+"""
+Due dates of recurring events (utils/occurrences.py) and the next_due_at
+they are scheduled by (database/event_model.py)
+"""
+from datetime import date, datetime, timedelta
+from database.event_model import EventModel
+from utils.occurrences import due_in_month, next_occurrence, occurrence_on_or_after, period_due_date, same_period
+
+
+def test_due_day_is_clamped_to_the_month():
+    assert due_in_month(31, 2025, 4) == date(2025, 4, 30)
+    assert due_in_month(30, 2024, 2) == date(2024, 2, 29)
+    assert due_in_month(30, 2025, 2) == date(2025, 2, 28)
+    assert due_in_month(15, 2025, 2) == date(2025, 2, 15)
+
+
+def test_occurrences():
+    assert period_due_date("monthly", 31, date(2025, 4, 2)) == date(2025, 4, 30)
+    assert period_due_date("daily", 31, date(2025, 4, 2)) == date(2025, 4, 2)
+
+    assert occurrence_on_or_after("monthly", 15, date(2025, 4, 15)) == date(2025, 4, 15)
+    assert occurrence_on_or_after("monthly", 15, date(2025, 4, 16)) == date(2025, 5, 15)
+    assert occurrence_on_or_after("monthly", 31, date(2025, 12, 31)) == date(2025, 12, 31)
+    assert next_occurrence("monthly", 31, date(2025, 12, 31)) == date(2026, 1, 31)
+    assert next_occurrence("monthly", 31, date(2025, 1, 31)) == date(2025, 2, 28)
+    assert next_occurrence("daily", 1, date(2025, 12, 31)) == date(2026, 1, 1)
+
+
+def test_same_period():
+    assert same_period("monthly", date(2025, 4, 1), date(2025, 4, 30))
+    assert not same_period("monthly", date(2025, 4, 30), date(2026, 4, 30))
+    assert not same_period("daily", date(2025, 4, 1), date(2025, 4, 2))
+
+
+def test_next_due_skips_the_executed_period():
+    today = date(2025, 4, 10)
+    assert EventModel._next_due_at("monthly", 20, None, today) == datetime(2025, 4, 20)
+    assert EventModel._next_due_at("monthly", 20, datetime(2025, 4, 2, 9, 0), today) == datetime(2025, 5, 20)
+    assert EventModel._next_due_at("monthly", 20, datetime(2025, 3, 20, 9, 0), today) == datetime(2025, 4, 20)
+    assert EventModel._next_due_at("daily", 1, datetime(2025, 4, 10, 9, 0), today) == datetime(2025, 4, 11)
+
+
+def _not_today() -> int:
+    return date.today().day % 28 + 1
+
+
+def test_only_due_events_are_read(backend):
+    today = date.today()
+    assert EventModel.create_event("Rent", "Housing", 900.0, day_of_month=today.day)
+    assert EventModel.create_event("Gym", "Health", 30.0, day_of_month=_not_today())
+    assert EventModel.create_event("Paused", "Health", 30.0, day_of_month=today.day, is_active=False)
+
+    assert [e["title"] for e in backend.find_due_events(datetime.now())] == ["Rent"]
+    [gym] = [e for e in EventModel.get_all_events() if e["title"] == "Gym"]
+    assert gym["next_due_at"] == datetime.combine(
+        occurrence_on_or_after("monthly", _not_today(), today), datetime.min.time()
+    )
+    assert [r["event"]["title"] for r in EventModel.run_due_events()] == ["Rent"]
+    assert backend.find_due_events(datetime.now()) == []
+
+
+def test_events_without_next_due_are_backfilled(backend):
+    today = date.today()
+    backend.insert_event({
+        "title": "Legacy", "category": "Housing", "amount": 900.0, "day_of_month": today.day,
+        "description": "", "is_active": True, "event_type": "expense", "frequency": "monthly",
+        "created_at": datetime.now() - timedelta(days=60), "updated_at": datetime.now() - timedelta(days=60),
+    })
+    assert backend.find_due_events(datetime.now()) == []
+
+    [result] = EventModel.run_due_events()
+    assert result["status"] == "executed"
+    assert backend.find_events_without_next_due() == []
+    [event] = backend.find_events()
+    assert event["next_due_at"] == datetime.combine(next_occurrence("monthly", today.day, today), datetime.min.time())
@@ -0,0 +1,63 @@
+"""
+Routing of analytical reads to secondaries (database/read_routing.py)
+"""
+from datetime import datetime
+import pytest
+import config
+import database.read_routing as read_routing
+from database.cache import invalidate
+from database.read_routing import analytics_reads, reads_from_secondary
+from database.models import ExpenseModel
+
+_EXPENSES = config.EXPENSES_COLLECTION
+_ARCHIVE = config.ARCHIVE_COLLECTIONS[_EXPENSES]
+
+
+@pytest.fixture(autouse=True)
+def _no_recent_writes(monkeypatch):
+    monkeypatch.setattr(read_routing, "_last_write", {})
+    monkeypatch.setattr(config, "ANALYTICS_READS_FROM_SECONDARIES", True)
+
+
+def test_only_analytical_reads_go_to_secondaries(monkeypatch):
+    assert not reads_from_secondary(_EXPENSES)
+    with analytics_reads():
+        assert reads_from_secondary(_EXPENSES, config.INVESTMENTS_COLLECTION)
+    assert not reads_from_secondary(_EXPENSES)
+
+    monkeypatch.setattr(config, "ANALYTICS_READS_FROM_SECONDARIES", False)
+    with analytics_reads():
+        assert not reads_from_secondary(_EXPENSES)
+
+
+def test_recent_writes_are_read_from_the_primary(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(read_routing.time, "monotonic", lambda: clock[0])
+    invalidate(_EXPENSES, [(2025, 3)])
+    with analytics_reads():
+        assert not reads_from_secondary(_EXPENSES)
+        # The archive tier is written through its hot collection
+        assert not reads_from_secondary(_ARCHIVE)
+        assert not reads_from_secondary(config.INVESTMENTS_COLLECTION, _EXPENSES)
+        assert reads_from_secondary(config.INVESTMENTS_COLLECTION)
+
+        clock[0] += config.ANALYTICS_MAX_STALENESS_SECONDS + 1
+        assert reads_from_secondary(_EXPENSES, _ARCHIVE)
+
+
+def test_mongodb_analytical_reads_use_the_secondary_database(backend, monkeypatch):
+    if config.STORAGE_BACKEND != "mongodb":
+        pytest.skip("SQLite has no replicas")
+    import database.mongo_backend as mongo_backend
+    ExpenseModel.create_expense(datetime(2025, 3, 10), "Food", "Lunch", 12.5)
+    used = []
+    get_analytics_db = mongo_backend.get_analytics_db
+    monkeypatch.setattr(mongo_backend, "get_analytics_db", lambda: used.append(True) or get_analytics_db())
+
+    with analytics_reads():
+        # Just written by this process: read its own write from the primary
+        assert backend.total_amount(_EXPENSES, datetime(2025, 3, 1), datetime(2025, 3, 31)) == 12.5
+        assert used == []
+        monkeypatch.setattr(read_routing, "_last_write", {})
+        assert backend.total_amount(_EXPENSES, datetime(2025, 3, 1), datetime(2025, 3, 31)) == 12.5
+        assert used == [True]
@@ -0,0 +1,64 @@
+"""
+Full rebuilds of derived data (database/rebuild.py), in this process and on
+a process pool
+"""
+import os
+from datetime import date, datetime
+import pytest
+import config
+from database.analytics_engine import get_analytics_engine
+from database.budget_model import _totals_built_key
+from database.models import ExpenseModel
+from database.rebuild import rebuild_ledger, rebuild_ledgers
+
+
+def _seed(backend):
+    old_year = date.today().year - config.ARCHIVE_HOT_YEARS
+    # Stored without going through the model: no fingerprints, no month totals
+    backend.insert_entries(config.EXPENSES_COLLECTION, [
+        {"date": datetime(old_year, 6, 1), "category": "Food", "description": "Old", "amount": 4.0},
+        {"date": datetime(2025, 3, 10), "category": "Food", "description": "Lunch", "amount": 12.5},
+        {"date": datetime(2025, 4, 2), "category": "Rent", "description": "April", "amount": 900.0},
+    ])
+    backend.increment_category_month(2025, 3, "Ghost", 50.0)
+    return old_year
+
+
+def _check_rebuilt(backend, old_year):
+    assert backend.get_category_month_totals(2025, 3) == {"Food": 12.5}
+    assert backend.get_category_month_totals(old_year, 6) == {"Food": 4.0}
+    assert get_analytics_engine().monthly_totals(config.EXPENSES_COLLECTION, 2025, 2025) == {
+        (2025, 3): 12.5, (2025, 4): 900.0,
+    }
+    # Fingerprinted now, so a statement import recognises them
+    assert ExpenseModel.create_expenses(
+        [{"date": datetime(2025, 3, 10), "category": "Food", "description": "lunch", "amount": 12.5}],
+        skip_duplicates=True,
+    ) == []
+
+
+def test_rebuild_in_process(backend):
+    old_year = _seed(backend)
+    result = rebuild_ledger(config.DEFAULT_LEDGER_ID)
+    assert result == {
+        "archived": 1,
+        "years": 2,
+        "fingerprints": 3,
+        "snapshot_months": 3,
+        "failed_years": 0,
+    }
+    assert backend.get_meta(_totals_built_key())
+    _check_rebuilt(backend, old_year)
+
+    # Nothing left to change
+    assert rebuild_ledger(config.DEFAULT_LEDGER_ID)["fingerprints"] == 0
+
+
+def test_rebuild_on_worker_processes(backend):
+    if config.STORAGE_BACKEND == "mongodb" and not os.getenv("TEST_MONGO_URI"):
+        pytest.skip("workers can't reach mongomock's in-process server")
+    old_year = _seed(backend)
+    [(ledger, result)] = rebuild_ledgers([config.DEFAULT_LEDGER_ID], workers=2).items()
+    assert ledger == config.DEFAULT_LEDGER_ID
+    assert (result["years"], result["fingerprints"], result["failed_years"]) == (2, 3, 0)
+    _check_rebuilt(backend, old_year)
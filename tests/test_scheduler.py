@@ -0,0 +1,129 @@
+"""
+Claim-before-post execution of recurring events (database/event_model.py)
+on every storage backend
+"""
+import threading
+from datetime import date, datetime
+import pytest
+import config
+from database.event_model import EventModel
+from database.ledger import current_ledger, ledger_scope
+from database.models import ExpenseModel
+
+
+def _daily_event() -> str:
+    assert EventModel.create_event("Coffee", "Food", 3.0, day_of_month=1, frequency="daily")
+    [event] = EventModel.get_all_events()
+    return str(event["_id"])
+
+
+def _entry(description: str) -> dict:
+    return {"date": datetime.combine(date.today(), datetime.min.time()), "category": "Food",
+            "description": description, "amount": 3.0}
+
+
+def test_period_claimed_elsewhere_is_not_posted(backend):
+    event_id = _daily_event()
+    # Another session claimed today's period and posted its entry
+    key, execution = EventModel._execution_record(event_id, "daily", date.today())
+    assert backend.insert_entry_with_execution(config.EXPENSES_COLLECTION, _entry("Elsewhere"), key, execution)
+
+    [result] = EventModel.run_due_events()
+    assert result["status"] == "skipped"
+    assert [e["description"] for e in ExpenseModel.get_expenses()] == ["Elsewhere"]
+    # The schedule still moves on, so the event isn't read again today
+    assert backend.find_due_events(datetime.now()) == []
+
+
+def test_claims_are_taken_once(backend):
+    key, execution = EventModel._execution_record("event-1", "monthly", date(2025, 3, 1))
+    assert backend.insert_entry_with_execution(config.EXPENSES_COLLECTION, _entry("First"), key, execution)
+    assert backend.insert_entry_with_execution(config.EXPENSES_COLLECTION, _entry("Second"), key, execution) is None
+    assert [e["description"] for e in backend.find_entries(config.EXPENSES_COLLECTION)] == ["First"]
+    # Each ledger claims its own periods
+    with ledger_scope("other"):
+        assert backend.insert_entry_with_execution(config.EXPENSES_COLLECTION, _entry("Other"), key, execution)
+
+
+def test_concurrent_runs_post_once(backend):
+    _daily_event()
+    barrier = threading.Barrier(4)
+    results = []
+
+    def run():
+        barrier.wait()
+        results.extend(r["status"] for r in EventModel.run_due_events())
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count("executed") == 1
+    assert len(ExpenseModel.get_expenses()) == 1
+
+
+def test_entry_and_execution_record_are_linked(backend):
+    event_id = _daily_event()
+    [result] = EventModel.run_due_events()
+    assert result["status"] == "executed"
+
+    [entry] = ExpenseModel.get_expenses_by_event(event_id)
+    [record] = EventModel.get_execution_history(event_id)
+    assert record["expense_id"] == str(entry["_id"])
+    assert entry["execution_key"] == EventModel._daily_execution_key(event_id, date.today())
+    assert EventModel.has_been_executed_today(event_id, date.today())
+
+
+def test_failed_entry_write_leaves_no_claim(backend, monkeypatch):
+    key, execution = EventModel._execution_record("event-1", "monthly", date(2025, 3, 1))
+    if config.STORAGE_BACKEND == "sqlite":
+        # amount is NOT NULL: the entry insert fails inside the claim's transaction
+        broken = {**_entry("Broken"), "amount": None}
+    else:
+        from database.connection import get_db
+        collection_class = type(get_db()[config.EXPENSES_COLLECTION])
+        insert_one = collection_class.insert_one
+
+        def failing_insert(self, document, *args, **kwargs):
+            if self.name == config.EXPENSES_COLLECTION:
+                raise RuntimeError("insert failed")
+            return insert_one(self, document, *args, **kwargs)
+        monkeypatch.setattr(collection_class, "insert_one", failing_insert)
+        broken = _entry("Broken")
+
+    # A failure raises instead of reading as an already-claimed period
+    with pytest.raises(Exception):
+        backend.insert_entry_with_execution(config.EXPENSES_COLLECTION, broken, key, execution)
+    assert backend.find_execution(key) is None
+
+
+def test_transient_conflict_with_a_winner_reads_as_claimed(backend, monkeypatch):
+    if config.STORAGE_BACKEND != "mongodb":
+        pytest.skip("multi-document transactions are MongoDB only")
+    from pymongo.errors import OperationFailure
+    from database.connection import get_db
+    from database.mongo_backend import MongoBackend
+
+    class _ConflictingSession:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def with_transaction(self, callback):
+            raise OperationFailure(
+                "Write conflict", code=112, details={"errorLabels": ["TransientTransactionError"]}
+            )
+
+    monkeypatch.setattr(MongoBackend, "_supports_transactions", lambda self: True)
+    monkeypatch.setattr(type(get_db().client), "start_session", lambda self, *a, **k: _ConflictingSession(), raising=False)
+    key, execution = EventModel._execution_record("event-1", "monthly", date(2025, 3, 1))
+
+    # Nobody holds the key: the conflict is a real failure
+    with pytest.raises(OperationFailure):
+        backend.insert_entry_with_execution(config.EXPENSES_COLLECTION, _entry("Mine"), key, execution)
+    # The other transaction committed its claim
+    get_db()[config.EXECUTIONS_COLLECTION].insert_one({"key": key, **execution, "ledger_id": current_ledger()})
+    assert backend.insert_entry_with_execution(config.EXPENSES_COLLECTION, _entry("Mine"), key, execution) is None
@@ -0,0 +1,66 @@
+"""
+Accounts (database/user_model.py, utils/passwords.py) and the ledgers they
+own, on every storage backend
+"""
+import io
+import sys
+import pytest
+import config
+import budget_tracker
+from database.ledger_model import LedgerModel
+from database.user_model import UserModel
+from utils.passwords import hash_password, verify_password
+
+
+@pytest.fixture(autouse=True)
+def _fast_hashing(monkeypatch):
+    monkeypatch.setattr(config, "PASSWORD_HASH_ITERATIONS", 1000)
+
+
+def test_password_hashes_are_salted():
+    first, second = hash_password("correct horse"), hash_password("correct horse")
+    assert first != second
+    assert first.startswith("pbkdf2_sha256$1000$")
+    assert verify_password("correct horse", first) and verify_password("correct horse", second)
+    assert not verify_password("wrong horse", first)
+    assert not verify_password("correct horse", "plaintext")
+
+
+def test_create_and_authenticate(backend):
+    assert UserModel.create_user("alice", "s3cret-pass")
+    assert not UserModel.create_user("alice", "another-pass")
+    assert not UserModel.create_user("Bob", "s3cret-pass")
+    assert not UserModel.create_user("bob", "short")
+
+    assert UserModel.authenticate("alice", "s3cret-pass")
+    assert UserModel.authenticate(" Alice ", "s3cret-pass")
+    assert not UserModel.authenticate("alice", "wrong-pass")
+    assert not UserModel.authenticate("bob", "s3cret-pass")
+
+
+def test_personal_ledgers_get_unique_ids(backend):
+    assert LedgerModel.create_personal_ledger("alice") == "alice"
+    # Someone else already holds a ledger named "alice"
+    LedgerModel.set_owner("alice", "bob")
+    suffixed = LedgerModel.create_personal_ledger("alice")
+    assert suffixed.startswith("alice-") and suffixed != "alice"
+    assert [l["_id"] for l in LedgerModel.get_ledgers("alice")] == [suffixed]
+
+
+def _add_user(monkeypatch, password: str, *args: str) -> int:
+    monkeypatch.setattr(sys, "stdin", io.StringIO(f"{password}\n"))
+    return budget_tracker.main(["add-user", *args])
+
+
+def test_cli_add_user(backend, monkeypatch, capsys):
+    LedgerModel.create_ledger("Household", config.DEFAULT_USER_ID)
+    assert _add_user(monkeypatch, "s3cret-pass", "Carol", "--owns", "household") == 0
+    assert "Created carol, owner of household" in capsys.readouterr().out
+    assert UserModel.authenticate("carol", "s3cret-pass")
+    assert [l["_id"] for l in LedgerModel.get_ledgers("carol")] == ["household"]
+
+    assert _add_user(monkeypatch, "s3cret-pass", "carol") == 1
+    assert _add_user(monkeypatch, "short", "dave") == 1
+    assert _add_user(monkeypatch, "s3cret-pass", "dave", "--owns", "missing") == 1
+    assert "unknown ledger(s) missing" in capsys.readouterr().err
+    assert not UserModel.authenticate("dave", "s3cret-pass")
@@ -0,0 +1,69 @@
+"""
+Row validation of the bulk entry grid, the JSON API and CLI imports
+(utils/validators.py)
+"""
+from datetime import date, datetime
+from database.investment_model import InvestmentModel
+from database.models import ExpenseModel
+from utils.validators import validate_entry_rows
+
+_CATEGORIES = ["Food", "Transport"]
+
+
+def _row(**values):
+    row = {"date": date(2025, 3, 10), "category": "Food", "description": "Lunch", "amount": 12.5}
+    row.update(values)
+    return row
+
+
+def test_valid_rows_become_entries():
+    entries, errors = validate_entry_rows(
+        [_row(), _row(date=datetime(2025, 3, 11, 18, 30), description="  Bus  ", category="Transport", amount=3)],
+        _CATEGORIES,
+    )
+    assert errors == []
+    assert entries == [
+        {"date": datetime(2025, 3, 10), "category": "Food", "description": "Lunch", "amount": 12.5},
+        {"date": datetime(2025, 3, 11), "category": "Transport", "description": "Bus", "amount": 3.0},
+    ]
+
+
+def test_errors_name_their_row():
+    entries, errors = validate_entry_rows(
+        [_row(), _row(category="Rent", amount=0), _row(date=None)],
+        _CATEGORIES,
+    )
+    assert len(entries) == 1
+    assert errors == [
+        "Row 2: Invalid category. Must be one of: Food, Transport",
+        "Row 2: Amount must be greater than 0",
+        "Row 3: Date is required",
+    ]
+
+
+def test_blank_grid_rows_are_skipped():
+    # A fresh grid row carries today's date and NaN for the empty amount
+    blank = {"date": date.today(), "category": None, "description": "", "amount": float("nan")}
+    assert validate_entry_rows([blank, _row()], _CATEGORIES) == (
+        [{"date": datetime(2025, 3, 10), "category": "Food", "description": "Lunch", "amount": 12.5}],
+        [],
+    )
+
+    entries, errors = validate_entry_rows([blank], _CATEGORIES, skip_blank=False)
+    assert entries == []
+    assert errors == ["Row 1: Category is required", "Row 1: Amount is required"]
+
+
+def test_idempotency_key_is_kept():
+    [entry], _ = validate_entry_rows([_row(idempotency_key="row-1")], _CATEGORIES)
+    assert entry["idempotency_key"] == "row-1"
+
+
+def test_batch_insert_of_validated_rows(backend):
+    entries, _ = validate_entry_rows([_row(), _row(description="Dinner", amount=20)], _CATEGORIES)
+    assert len(ExpenseModel.create_expenses(entries)) == 2
+    assert sorted(e["description"] for e in ExpenseModel.get_expenses()) == ["Dinner", "Lunch"]
+
+    assert len(InvestmentModel.create_investments(entries)) == 2
+    assert len(InvestmentModel.get_investments()) == 2
+    assert backend.get_category_month_totals(2025, 3) == {"Food": 32.5}
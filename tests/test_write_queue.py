@@ -0,0 +1,75 @@
+"""
+The local write-ahead queue for entries made during outages
+(database/write_queue.py), replayed into every storage backend
+"""
+import os
+from datetime import datetime
+import config
+from database.backend import DatabaseUnavailable
+from database.investment_model import InvestmentModel
+from database.ledger import ledger_scope
+from database.models import ExpenseModel
+from database.write_queue import enqueue, pending_count, replay
+
+_DAY = datetime(2025, 3, 10)
+
+
+def test_replay_saves_each_ledger_once(backend):
+    assert pending_count() == 0
+    assert enqueue(config.EXPENSES_COLLECTION, _DAY, "Food", "Lunch", 12.5, idempotency_key="form-1")
+    assert enqueue(config.EXPENSES_COLLECTION, _DAY, "Food", "Lunch", 12.5, idempotency_key="form-1")
+    # Identical, but entered twice
+    assert enqueue(config.EXPENSES_COLLECTION, _DAY, "Food", "Coffee", 3.0)
+    assert enqueue(config.EXPENSES_COLLECTION, _DAY, "Food", "Coffee", 3.0)
+    with ledger_scope("household"):
+        assert enqueue(config.INVESTMENTS_COLLECTION, _DAY, "SIP", "Index fund", 5000.0)
+    assert pending_count() == 4
+
+    assert replay() == 4
+    assert pending_count() == 0
+    assert sorted(e["description"] for e in ExpenseModel.get_expenses()) == ["Coffee", "Coffee", "Lunch"]
+    with ledger_scope("household"):
+        assert [e["amount"] for e in InvestmentModel.get_investments()] == [5000.0]
+    assert replay() == 0
+
+
+def test_entries_that_reached_the_database_are_not_saved_twice(backend):
+    # The write landed, but the connection failed before it was acknowledged
+    assert ExpenseModel.create_expense(_DAY, "Food", "Lunch", 12.5, idempotency_key="form-1")
+    enqueue(config.EXPENSES_COLLECTION, _DAY, "Food", "Lunch", 12.5, idempotency_key="form-1")
+    assert replay() == 0
+    assert pending_count() == 0
+    assert len(ExpenseModel.get_expenses()) == 1
+
+
+def test_outage_leaves_entries_queued(backend, monkeypatch):
+    monkeypatch.setattr(config, "WRITE_QUEUE_BATCH_SIZE", 2)
+    for amount in range(1, 6):
+        enqueue(config.EXPENSES_COLLECTION, _DAY, "Food", f"Entry {amount}", float(amount))
+    create_expenses = ExpenseModel.create_expenses
+    calls = []
+
+    def flaky(entries, *args, **kwargs):
+        calls.append(len(entries))
+        if len(calls) == 2:
+            raise DatabaseUnavailable("connection refused")
+        return create_expenses(entries, *args, **kwargs)
+    monkeypatch.setattr(ExpenseModel, "create_expenses", staticmethod(flaky))
+
+    # The first batch is saved, the second fails and stops the replay
+    assert replay() == 2
+    assert pending_count() == 3
+    assert replay() == 3
+    assert calls == [2, 2, 2, 1]
+    assert sorted(e["amount"] for e in ExpenseModel.get_expenses()) == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_queue_file_is_recreated(backend):
+    enqueue(config.EXPENSES_COLLECTION, _DAY, "Food", "Lunch", 12.5)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(config.WRITE_QUEUE_PATH + suffix):
+            os.remove(config.WRITE_QUEUE_PATH + suffix)
+    assert pending_count() == 0
+    assert enqueue(config.EXPENSES_COLLECTION, _DAY, "Food", "Dinner", 20.0)
+    assert pending_count() == 1
+    assert replay() == 1
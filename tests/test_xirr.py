@@ -0,0 +1,69 @@
+"""
+Vectorized XIRR (utils/xirr.py) and holding returns (database/holding_model.py)
+"""
+from datetime import datetime
+import numpy as np
+from database.holding_model import HoldingModel
+from database.investment_model import InvestmentModel
+from utils.xirr import xirr_by_series, xirr_matrix
+
+
+def _npv(rate: float, years: np.ndarray, amounts: np.ndarray) -> float:
+    return float((amounts / (1 + rate) ** years).sum())
+
+
+def test_rows_are_solved_together():
+    years = np.array([[0.0, 1.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.5, 2.0], [0.0, 1.0, 0.0]])
+    amounts = np.array([
+        [-1000.0, 1100.0, 0.0],
+        [-1000.0, 500.0, 0.0],
+        [-1000.0, -1000.0, 2500.0],
+        # Never changes sign: no rate solves it
+        [-1000.0, -500.0, 0.0],
+    ])
+    rates = xirr_matrix(years, amounts)
+    assert np.allclose(rates[:2], [0.10, -0.50])
+    assert abs(_npv(rates[2], years[2], amounts[2])) < 1e-6
+    assert np.isnan(rates[3])
+
+
+def test_monthly_sip_matches_its_npv_root():
+    days = np.arange(np.datetime64("2023-01-05"), np.datetime64("2025-01-05"), 30)
+    years = ((days - days[0]).astype(int) / 365.0)
+    amounts = np.append(np.full(len(days) - 1, -5000.0), 5000.0 * (len(days) - 1) * 1.15)
+    [rate] = xirr_matrix(years[None, :], amounts[None, :])
+    assert 0.10 < rate < 0.20
+    assert abs(_npv(rate, years, amounts)) < 1e-4
+
+
+def test_flat_series_in_any_order():
+    series = np.array([1, 0, 1, 0])
+    days = np.array(["2025-01-01", "2024-01-01", "2024-01-01", "2025-01-01"], dtype="datetime64[D]")
+    amounts = np.array([1210.0, -1000.0, -1000.0, 1100.0])
+    rates = xirr_by_series(series, days, amounts, 3)
+    # 2024 is a leap year: 366 days are 366/365 years
+    assert np.allclose(rates[:2], [1.10 ** (365 / 366) - 1, 1.21 ** (365 / 366) - 1])
+    assert np.isnan(rates[2])
+    assert np.isnan(xirr_by_series(np.array([], int), np.array([], "datetime64[D]"), np.array([]), 2)).all()
+
+
+def test_holding_returns(backend):
+    InvestmentModel.create_investment(datetime(2024, 1, 1), "SIP", "Fund A", 1000.0)
+    InvestmentModel.create_investment(datetime(2025, 2, 1), "SIP", "Fund A", 400.0)
+    InvestmentModel.create_investment(datetime(2024, 6, 1), "SIP", "Fund B", 300.0)
+    assert HoldingModel.set_value("SIP", "Fund A", 1500.0, as_of=datetime(2025, 1, 1))
+
+    holdings, categories = HoldingModel.get_returns()
+    fund_a = holdings.set_index("description").loc["Fund A"]
+    # The contribution after the value's date counts as invested but not in the XIRR
+    assert (fund_a["invested"], fund_a["value"], fund_a["gain"]) == (1400.0, 1500.0, 100.0)
+    assert np.isclose(fund_a["xirr"], 1.5 ** (365 / 366) - 1)
+    assert np.isnan(holdings.set_index("description").loc["Fund B", "xirr"])
+
+    [sip] = categories.itertuples()
+    assert (sip.category, sip.invested, sip.value) == ("SIP", 1400.0, 1500.0)
+    assert np.isclose(sip.xirr, fund_a["xirr"])
+
+    assert HoldingModel.remove_value("SIP", "Fund A")
+    holdings, categories = HoldingModel.get_returns()
+    assert holdings["xirr"].isna().all() and categories.empty
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+
+# Deviations are measured against at least this share of the baseline mean, so
+# a category that always costs the same isn't flagged for a small change
+MIN_STD_RATIO = 0.25
+
+
+def _z_scores(values, mean, std):
+    return (values - mean) / np.maximum(std, mean * MIN_STD_RATIO)
+
+
+def daily_category_totals(entries: pd.DataFrame) -> pd.DataFrame:
+    """Days x categories spend; NaN where a category had no entries that day"""
+    if entries.empty:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name="date"))
+    days = entries["date"].dt.normalize()
+    return entries.groupby([days, "category"])["amount"].sum().unstack("category").sort_index()
+
+
+def score_days(daily: pd.DataFrame, window_days: int, min_history: int, threshold: float) -> pd.DataFrame:
+    """Category-days that spent `threshold` deviations above the category's baseline.
+
+    The baseline is the mean and standard deviation of the category's spend on
+    the days it had any, over the previous `window_days` days (the day itself
+    excluded). One rolling pass covers every category at once.
+    """
+    if daily.empty:
+        return pd.DataFrame(columns=["date", "category", "amount", "baseline", "z"])
+    rolling = daily.rolling(f"{window_days}D", closed="left", min_periods=min_history)
+    mean, std = rolling.mean(), rolling.std()
+    scored = pd.DataFrame({
+        "amount": daily.stack(),
+        "baseline": mean.stack(),
+        "z": _z_scores(daily, mean, std).stack(),
+    }).dropna()
+    flagged = scored[scored["z"] >= threshold].rename_axis(["date", "category"]).reset_index()
+    return flagged.sort_values("z", ascending=False, ignore_index=True)
+
+
+def score_transactions(entries: pd.DataFrame, window: int, min_history: int, threshold: float) -> pd.DataFrame:
+    """Entries `threshold` deviations above the mean of the previous `window`
+    entries in their category"""
+    if entries.empty:
+        return entries.assign(baseline=pd.Series(dtype=float), z=pd.Series(dtype=float))
+    entries = entries.sort_values("date", kind="stable").reset_index(drop=True)
+    rolling = entries.groupby("category")["amount"].rolling(window, min_periods=min_history, closed="left")
+    mean = rolling.mean().droplevel(0).sort_index()
+    std = rolling.std().droplevel(0).sort_index()
+    scored = entries.assign(baseline=mean, z=_z_scores(entries["amount"], mean, std))
+    flagged = scored[scored["z"] >= threshold]
+    return flagged.sort_values("z", ascending=False, ignore_index=True)
@@ -0,0 +1,29 @@
+import numpy as np
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    Keeps the first and last point and, from each of `threshold - 2` equal
+    buckets in between, the point forming the largest triangle with the point
+    kept from the previous bucket and the mean of the next one. Peaks and dips
+    survive, unlike with plain averaging. `x` must be sorted ascending.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # Bucket i covers [edges[i], edges[i + 1]); the last point is its own bucket
+    edges = np.append(np.linspace(1, n - 1, threshold - 1).astype(int), n)
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi, next_hi = edges[i], edges[i + 1], edges[i + 2]
+        avg_x, avg_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
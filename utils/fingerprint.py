@@ -0,0 +1,16 @@
+import hashlib
+
+
+def normalize_description(description) -> str:
+    """Lowercased with whitespace collapsed, so trivially different spellings match"""
+    return " ".join((description or "").lower().split())
+
+
+def entry_fingerprint(day, category: str, description, amount: float) -> str:
+    """Content hash of an entry: its day, category, normalized description and amount.
+
+    `day` may be a date, a datetime or ISO text (as the SQLite backend stores it).
+    """
+    day = day if isinstance(day, str) else day.isoformat()
+    key = "|".join((day[:10], category, normalize_description(description), f"{float(amount):.2f}"))
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
@@ -0,0 +1,113 @@
+from datetime import date
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+
+
+def _days(start: date, end: date) -> np.ndarray:
+    """Inclusive datetime64[D] range"""
+    return np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+
+
+def _day_parts(days: np.ndarray):
+    months = days.astype("datetime64[M]")
+    day_of_month = (days - months).astype(int) + 1
+    days_in_month = ((months + 1).astype("datetime64[D]") - months.astype("datetime64[D]")).astype(int)
+    return day_of_month, days_in_month
+
+
+def occurrence_matrix(
+    days: np.ndarray,
+    schedule_day: np.ndarray,
+    is_daily: np.ndarray,
+    active_from: np.ndarray,
+) -> np.ndarray:
+    """Boolean (events x days) matrix of scheduled occurrences.
+
+    Daily events occur every day; monthly events on `schedule_day`, clamped to
+    the month's last day (the 31st runs on the 30th in April, like the
+    scheduler). Nothing occurs before an event's `active_from` day.
+    """
+    day_of_month, days_in_month = _day_parts(days)
+    due_day = np.minimum(schedule_day[:, None], days_in_month[None, :])
+    occurs = is_daily[:, None] | (due_day == day_of_month[None, :])
+    return occurs & (days[None, :] >= active_from[:, None])
+
+
+def _event_arrays(events: List[Dict]):
+    schedule_day = np.array([e.get("day_of_month") or 1 for e in events], dtype=int)
+    is_daily = np.array([e.get("frequency", "monthly") == "daily" for e in events], dtype=bool)
+    amount = np.array([float(e["amount"]) for e in events], dtype=float)
+    active_from = np.array(
+        [np.datetime64(e["created_at"].date(), "D") if e.get("created_at") else np.datetime64("1970-01-01", "D")
+         for e in events],
+        dtype="datetime64[D]",
+    )
+    return schedule_day, is_daily, amount, active_from
+
+
+def scheduled_per_day(days: np.ndarray, events: List[Dict]) -> np.ndarray:
+    """Total scheduled amount on each day across all events"""
+    if not events or not len(days):
+        return np.zeros(len(days))
+    schedule_day, is_daily, amount, active_from = _event_arrays(events)
+    return amount @ occurrence_matrix(days, schedule_day, is_daily, active_from)
+
+
+def quarter_start(d: date) -> date:
+    return date(d.year, 3 * ((d.month - 1) // 3) + 1, 1)
+
+
+def period_end(d: date, months: int) -> date:
+    """Last day of the `months`-long period (month or quarter) containing d"""
+    start_month = d.month if months == 1 else quarter_start(d).month
+    end = np.datetime64(f"{d.year}-{start_month:02d}", "M") + months
+    return (end.astype("datetime64[D]") - 1).astype(date)
+
+
+def project_totals(entries: pd.DataFrame, events: List[Dict], today: date, lookback_days: int) -> Dict[str, Dict]:
+    """Month-end and quarter-end projections for one ledger.
+
+    `entries` (date, amount and scheduled columns, as ExpenseModel.get_expense_frame)
+    must cover the quarter so far and the lookback window. The run rate is
+    the average unscheduled spend per day over the lookback: actuals minus
+    the entries events actually posted, so missed occurrences aren't taken
+    off. The projection adds that rate for every remaining day plus each
+    remaining scheduled occurrence.
+    """
+    history_start = np.datetime64(today, "D") - lookback_days + 1
+    first = min(history_start, np.datetime64(quarter_start(today), "D"))
+    history = _days(first.astype(date), today)
+    actual = np.zeros(len(history))
+    posted = np.zeros(len(history))
+    if not entries.empty:
+        idx = (pd.to_datetime(entries["date"]).values.astype("datetime64[D]") - first).astype(int)
+        keep = (idx >= 0) & (idx < len(history))
+        amounts = entries["amount"].to_numpy(dtype=float)
+        np.add.at(actual, idx[keep], amounts[keep])
+        scheduled_rows = keep & entries["scheduled"].to_numpy(dtype=bool)
+        np.add.at(posted, idx[scheduled_rows], amounts[scheduled_rows])
+
+    lookback = history >= history_start
+    run_rate = max(actual[lookback].sum() - posted[lookback].sum(), 0.0) / lookback_days
+
+    horizon_end = period_end(today, 3)
+    future = _days(today, horizon_end)[1:]
+    scheduled = scheduled_per_day(future, events)
+
+    result = {}
+    for label, months in (("month", 1), ("quarter", 3)):
+        end = np.datetime64(period_end(today, months), "D")
+        start = np.datetime64(today.replace(day=1) if months == 1 else quarter_start(today), "D")
+        to_date = actual[history >= start].sum()
+        in_period = future <= end
+        remaining_days = int(in_period.sum())
+        result[label] = {
+            "end": end.astype(date),
+            "to_date": float(to_date),
+            "run_rate": float(run_rate),
+            "unscheduled": float(run_rate * remaining_days),
+            "scheduled": float(scheduled[in_period].sum()),
+            "projected": float(to_date + run_rate * remaining_days + scheduled[in_period].sum()),
+        }
+    return result
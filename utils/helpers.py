@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+import pandas as pd
 import config
 
 
@@ -15,6 +16,44 @@ def get_month_start_end(year: int, month: int) -> tuple:
     return start_date, end_date
 
 
+# Granularities of the period aggregations; weeks start on Monday
+PERIOD_UNITS = ("day", "week", "month", "quarter")
+_PERIOD_FREQ = {"day": "D", "week": "W-MON", "month": "MS", "quarter": "QS"}
+
+
+def truncate_period(d: datetime, unit: str) -> datetime:
+    """Start of the day, week, month or quarter containing d"""
+    d = datetime(d.year, d.month, d.day)
+    if unit == "week":
+        return d - timedelta(days=d.weekday())
+    if unit == "month":
+        return d.replace(day=1)
+    if unit == "quarter":
+        return d.replace(month=3 * ((d.month - 1) // 3) + 1, day=1)
+    return d
+
+
+def period_starts(start_date: datetime, end_date: datetime, unit: str) -> pd.DatetimeIndex:
+    """Start of every period overlapping the date range"""
+    return pd.date_range(truncate_period(start_date, unit), end_date, freq=_PERIOD_FREQ[unit])
+
+
+def normalize_investment_category(raw: str) -> str:
+    mapping = {
+        "mutual fund": "Mutual Fund",
+        "fd": "Fixed Deposit",
+        "fixed deposit": "Fixed Deposit",
+        "fixed fd": "Fixed Deposit",
+        "sip": "SIP",
+        "stocks": "Stocks",
+        "ppf": "PPF",
+        "nps": "NPS",
+        "gold": "Gold",
+        "other investment": "Other Investment",
+    }
+    return mapping.get(raw.strip().lower(), raw.strip())
+
+
 def get_current_month_range() -> tuple:
     now = datetime.now()
     return get_month_start_end(now.year, now.month)
@@ -0,0 +1,37 @@
+import calendar
+from datetime import date, timedelta
+
+
+def due_in_month(day_of_month: int, year: int, month: int) -> date:
+    """The scheduled day in a month, clamped to the month's last day"""
+    return date(year, month, min(day_of_month, calendar.monthrange(year, month)[1]))
+
+
+def period_due_date(frequency: str, day_of_month: int, today: date) -> date:
+    """Occurrence belonging to today's period (today for daily, this month's day for monthly)"""
+    if frequency == "daily":
+        return today
+    return due_in_month(day_of_month, today.year, today.month)
+
+
+def occurrence_on_or_after(frequency: str, day_of_month: int, d: date) -> date:
+    """First scheduled occurrence on or after d"""
+    if frequency == "daily":
+        return d
+    due = due_in_month(day_of_month, d.year, d.month)
+    if due >= d:
+        return due
+    year, month = (d.year + 1, 1) if d.month == 12 else (d.year, d.month + 1)
+    return due_in_month(day_of_month, year, month)
+
+
+def next_occurrence(frequency: str, day_of_month: int, d: date) -> date:
+    """First scheduled occurrence strictly after d"""
+    return occurrence_on_or_after(frequency, day_of_month, d + timedelta(days=1))
+
+
+def same_period(frequency: str, a: date, b: date) -> bool:
+    """Whether two dates fall in the same scheduling period (day or month)"""
+    if frequency == "daily":
+        return a == b
+    return (a.year, a.month) == (b.year, b.month)
@@ -0,0 +1,22 @@
+import hashlib
+import hmac
+import os
+import config
+
+
+def hash_password(password: str) -> str:
+    """Salted PBKDF2-SHA256 hash, stored as "pbkdf2_sha256$iterations$salt$hash" """
+    salt = os.urandom(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, config.PASSWORD_HASH_ITERATIONS)
+    return f"pbkdf2_sha256${config.PASSWORD_HASH_ITERATIONS}${salt.hex()}${digest.hex()}"
+
+
+def verify_password(password: str, stored: str) -> bool:
+    try:
+        algorithm, iterations, salt, digest = stored.split("$")
+    except ValueError:
+        return False
+    if algorithm != "pbkdf2_sha256":
+        return False
+    candidate = hashlib.pbkdf2_hmac("sha256", password.encode(), bytes.fromhex(salt), int(iterations))
+    return hmac.compare_digest(candidate.hex(), digest)
@@ -1,10 +1,13 @@
+import math
 from datetime import datetime
-from typing import Tuple
+from typing import Dict, List, Tuple
 
 
 def validate_amount(amount: float) -> Tuple[bool, str]:
     if amount is None:
         return False, "Amount is required"
+    if not math.isfinite(amount):
+        return False, "Amount must be a finite number"
     if amount <= 0:
         return False, "Amount must be greater than 0"
     return True, ""
@@ -30,3 +33,48 @@ def validate_category(category: str, valid_categories: list) -> Tuple[bool, str]
     if category not in valid_categories:
         return False, f"Invalid category. Must be one of: {', '.join(valid_categories)}"
     return True, ""
+
+
+def validate_entry_rows(
+    rows: List[Dict], valid_categories: list, skip_blank: bool = True
+) -> Tuple[List[Dict], List[str]]:
+    # Errors are prefixed with the 1-based row number. Blank rows are left out
+    # with skip_blank (the grid), and otherwise fail like any incomplete row.
+    entries, errors = [], []
+    for row_no, row in enumerate(rows, start=1):
+        entry_date = row.get("date")
+        category = row.get("category")
+        description = (row.get("description") or "").strip()
+        amount = row.get("amount")
+        if amount is not None and amount != amount:  # NaN from an empty grid cell
+            amount = None
+        # Date alone doesn't count: new grid rows are pre-filled with today
+        if skip_blank and not category and not description and amount is None:
+            continue
+
+        if entry_date is not None:
+            if isinstance(entry_date, datetime):
+                entry_date = entry_date.date()
+            entry_date = datetime.combine(entry_date, datetime.min.time())
+        row_errors = [
+            msg for ok, msg in [
+                validate_date(entry_date),
+                validate_category(category, valid_categories),
+                validate_description(description),
+                validate_amount(amount),
+            ]
+            if not ok
+        ]
+        if row_errors:
+            errors.extend(f"Row {row_no}: {msg}" for msg in row_errors)
+        else:
+            entry = {
+                "date": entry_date,
+                "category": category,
+                "description": description,
+                "amount": float(amount),
+            }
+            if row.get("idempotency_key"):
+                entry["idempotency_key"] = row["idempotency_key"]
+            entries.append(entry)
+    return entries, errors
@@ -0,0 +1,66 @@
+import numpy as np
+
+# Solved for x = ln(1 + rate); this bracket spans rates of about -99.995% to +2.2e6%
+_LOG_RATE_BOUNDS = (-10.0, 10.0)
+
+
+def _npv_scaled(x: np.ndarray, span: np.ndarray, amounts: np.ndarray):
+    """Net value of each series at its last flow for log rates x, with the derivative.
+
+    Compounding every flow forward to the series' last date keeps the
+    exponents non-negative and, for the usual pattern of contributions
+    followed by a final value, makes the function monotonic in x.
+    """
+    growth = np.exp(np.clip(x[:, None] * span, None, 700.0))
+    return (amounts * growth).sum(axis=1), (amounts * span * growth).sum(axis=1)
+
+
+def xirr_matrix(years: np.ndarray, amounts: np.ndarray, tol: float = 1e-10, max_iter: int = 100) -> np.ndarray:
+    """Annualized internal rate of return of every row at once.
+
+    `years` holds each flow's time in years and `amounts` its signed amount
+    (contributions negative, the current value positive); shorter series are
+    padded with zero amounts. Newton steps are taken while they stay inside a
+    bracket around the root, bisection otherwise, so every row converges.
+    Rows whose flows never change sign are NaN.
+    """
+    n = len(amounts)
+    span = years.max(axis=1, keepdims=True) - years
+    lo, hi = np.full(n, _LOG_RATE_BOUNDS[0]), np.full(n, _LOG_RATE_BOUNDS[1])
+    f_lo, _ = _npv_scaled(lo, span, amounts)
+    f_hi, _ = _npv_scaled(hi, span, amounts)
+    solvable = np.sign(f_lo) * np.sign(f_hi) < 0
+
+    x = np.zeros(n)
+    for _ in range(max_iter):
+        f, df = _npv_scaled(x, span, amounts)
+        below = np.sign(f) == np.sign(f_lo)
+        lo, f_lo = np.where(below, x, lo), np.where(below, f, f_lo)
+        hi = np.where(below, hi, x)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = x - f / df
+        step = np.where(np.isfinite(newton) & (newton >= lo) & (newton <= hi), newton, (lo + hi) / 2)
+        step = np.where(f == 0, x, step)
+        converged = np.abs(step - x) <= tol * (1 + np.abs(x))
+        x = step
+        if converged[solvable].all():
+            break
+    return np.where(solvable, np.expm1(x), np.nan)
+
+
+def xirr_by_series(series: np.ndarray, days: np.ndarray, amounts: np.ndarray, count: int) -> np.ndarray:
+    """XIRR of `count` cash-flow series given as flat rows (series index,
+    datetime64[D] day, signed amount), NaN where undefined"""
+    if not len(series):
+        return np.full(count, np.nan)
+    order = np.argsort(series, kind="stable")
+    series, days, amounts = series[order], days[order].astype("int64"), amounts[order]
+    position = np.arange(len(series)) - np.searchsorted(series, np.arange(count))[series]
+    first = np.full(count, np.iinfo(np.int64).max)
+    np.minimum.at(first, series, days)
+
+    years = np.zeros((count, int(position.max()) + 1))
+    padded = np.zeros_like(years)
+    years[series, position] = (days - first[series]) / 365.0
+    padded[series, position] = amounts
+    return xirr_matrix(years, padded)